@@ -1,12 +1,14 @@
 import streamlit as st
 import pandas as pd
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
 from datetime import datetime
-import yfinance as yf
 
-from stock_analyzer import StockAnalyzer
+from stock_analyzer import StockAnalyzer, ANALYSIS_COLUMNS
 from portfolio_manager import PortfolioManager
+from market_hours import data_version
+from scan_scheduler import ScanScheduler, format_age
+from compact_frame import compact_frame
+from quote_service import QuoteService
+from charts import build_price_figure, FigureCache
 
 # ตั้งค่าหน้า
 st.set_page_config(
@@ -30,9 +32,70 @@ st.title("📊 วิเคราะห์หุ้นไทย แบบละ
 st.markdown("พิมพ์รหัสหุ้นหรือชื่อหุ้นที่ต้องการวิเคราะห์")
 st.markdown("---")
 
-# โหลดคลาส
-analyzer = StockAnalyzer()
-portfolio = PortfolioManager()
+# โหลดคลาส (สร้างครั้งเดียวต่อ process ไม่สร้างใหม่ทุกครั้งที่ script rerun)
+@st.cache_resource
+def get_analyzer():
+    return StockAnalyzer()
+
+
+@st.cache_resource
+def get_portfolio():
+    return PortfolioManager()
+
+
+@st.cache_resource
+def get_quote_service():
+    return QuoteService()
+
+
+@st.cache_resource
+def get_figure_cache():
+    return FigureCache()
+
+
+@st.cache_resource
+def get_scan_scheduler():
+    # สแกนอัตโนมัติใน thread แยก (หรือรัน python scan_scheduler.py เป็น worker ต่างหาก)
+    scheduler = ScanScheduler(get_analyzer())
+    scheduler.start()
+    return scheduler
+
+
+analyzer = get_analyzer()
+portfolio = get_portfolio()
+quote_service = get_quote_service()
+figure_cache = get_figure_cache()
+scan_store = get_scan_scheduler().store
+
+
+# ข้อมูลที่โหลดแล้วแคชตาม symbol, period และรุ่นข้อมูล (version) จาก market_hours.data_version
+# การขยับ widget หรือสลับแท็บจึงไม่ดึงข้อมูลหรือคำนวณตัวชี้วัดใหม่จนกว่าจะมีข้อมูลรุ่นใหม่
+# version เปลี่ยนทุก intraday_ttl ระหว่างตลาดเปิด จึงจำกัดจำนวนรายการ (ประมาณ 10 หุ้น x 6 ช่วงเวลา)
+# ให้รุ่นเก่าถูกลบออกไป ไม่สะสมอยู่ในหน่วยความจำของเซิร์ฟเวอร์
+FRAME_CACHE_ENTRIES = 60
+INFO_CACHE_ENTRIES = 20
+
+
+@st.cache_data(show_spinner=False, max_entries=FRAME_CACHE_ENTRIES)
+def load_history(symbol, period, version):
+    return analyzer.get_stock_history(symbol, period)
+
+
+@st.cache_data(show_spinner=False, max_entries=INFO_CACHE_ENTRIES)
+def load_info(symbol, version):
+    return analyzer.get_stock_info_from_yahoo(symbol)
+
+
+@st.cache_data(show_spinner=False, max_entries=FRAME_CACHE_ENTRIES)
+def load_indicators(symbol, period, version, columns=None):
+    df = load_history(symbol, period, version)
+    if df is None or df.empty:
+        return None
+    # เก็บในแคชแบบ float32 ตัวชี้วัดรวมเป็น block เดียว
+    return compact_frame(analyzer.calculate_indicators(df, list(columns) if columns else None))
+
+
+version = data_version(intraday_ttl=analyzer.price_cache.intraday_ttl)
 
 # ตรวจสอบว่ามีการเลือกหุ้นหรือไม่
 if 'selected_stock' not in st.session_state:
@@ -64,9 +127,17 @@ with tab1:
                 if selected_display:
                     st.session_state.selected_stock = selected_display.split('(')[-1].split(')')[0]
             else:
-                # ถ้าไม่พบ ให้ลองใช้รหัสที่พิมพ์โดยตรง
+                # ถ้าไม่พบ ให้ลองใช้รหัสที่พิมพ์โดยตรง (ตรวจกับ Yahoo เมื่อกดปุ่มเท่านั้น)
                 custom_symbol = analyzer.validate_stock_symbol(search_query)
-                st.info(f"ลองใช้รหัส: {custom_symbol}")
+                st.info(f"ไม่พบในรายชื่อ ลองใช้รหัส: {custom_symbol}")
+                if st.button(f"🔎 ตรวจสอบ {custom_symbol} กับ Yahoo"):
+                    with st.spinner('กำลังตรวจสอบรหัส...'):
+                        found = analyzer.lookup_symbol(custom_symbol)
+                    if found:
+                        st.success(f"พบ {found[1]} ({found[0]})")
+                        st.session_state.selected_stock = found[0]
+                    else:
+                        st.error(f"ไม่พบรหัส {custom_symbol}")
                 if st.button(f"✅ วิเคราะห์ {custom_symbol}"):
                     st.session_state.selected_stock = custom_symbol
         else:
@@ -141,16 +212,19 @@ with tab1:
         st.markdown("---")
         if st.button("🔄 โหลดข้อมูลใหม่"):
             st.cache_data.clear()
+            analyzer.price_cache.invalidate(st.session_state.selected_stock)
+            quote_service.invalidate()
+            figure_cache.clear()
+            analyzer.refresh_stock_info(st.session_state.selected_stock)
             st.rerun()
 
     # Main content
     with st.spinner('กำลังโหลดข้อมูล...'):
-        df, info = analyzer.get_stock_data(st.session_state.selected_stock, period)
+        # คำนวณ indicators (แคชไว้พร้อมกับข้อมูลราคา)
+        df = load_indicators(st.session_state.selected_stock, period, version)
+        info = load_info(st.session_state.selected_stock, version) if df is not None else None
 
     if df is not None and not df.empty:
-        # คำนวณ indicators
-        df = analyzer.calculate_indicators(df)
-        
         # ข้อมูลล่าสุด
         latest = df.iloc[-1]
         prev = df.iloc[-2] if len(df) > 1 else latest
@@ -208,92 +282,12 @@ with tab1:
         
         st.markdown("---")
         
-        # สร้างกราฟ 3 แถว
-        fig = make_subplots(
-            rows=3, cols=1,
-            shared_xaxes=True,
-            vertical_spacing=0.08,
-            row_heights=[0.5, 0.25, 0.25],
-            subplot_titles=('กราฟราคาและปริมาณ', 'RSI (14)', 'MACD')
-        )
-        
-        # กราฟแท่งเทียน
-        fig.add_trace(
-            go.Candlestick(
-                x=df.index,
-                open=df['Open'],
-                high=df['High'],
-                low=df['Low'],
-                close=df['Close'],
-                name='ราคา',
-                showlegend=False
-            ),
-            row=1, col=1
+        # กราฟราคา (สร้างครั้งเดียวต่อหุ้น/ช่วงเวลา/รุ่นข้อมูล)
+        fig = figure_cache.get(
+            (st.session_state.selected_stock, period, version, 'detail'),
+            lambda: build_price_figure(df)
         )
         
-        # เพิ่ม SMA
-        if 'SMA_20' in df.columns:
-            fig.add_trace(
-                go.Scatter(x=df.index, y=df['SMA_20'], name='SMA 20', line=dict(color='orange', width=1)),
-                row=1, col=1
-            )
-        
-        if 'SMA_50' in df.columns:
-            fig.add_trace(
-                go.Scatter(x=df.index, y=df['SMA_50'], name='SMA 50', line=dict(color='blue', width=1)),
-                row=1, col=1
-            )
-        
-        if 'SMA_200' in df.columns:
-            fig.add_trace(
-                go.Scatter(x=df.index, y=df['SMA_200'], name='SMA 200', line=dict(color='red', width=1)),
-                row=1, col=1
-            )
-        
-        # เพิ่มปริมาณการซื้อขาย
-        colors = ['green' if df['Close'].iloc[i] >= df['Open'].iloc[i] else 'red' for i in range(len(df))]
-        fig.add_trace(
-            go.Bar(x=df.index, y=df['Volume'], name='ปริมาณ', marker_color=colors, opacity=0.3),
-            row=1, col=1
-        )
-        
-        # RSI
-        if 'RSI_14' in df.columns:
-            fig.add_trace(
-                go.Scatter(x=df.index, y=df['RSI_14'], name='RSI 14', line=dict(color='purple', width=2)),
-                row=2, col=1
-            )
-            fig.add_hline(y=70, line_dash="dash", line_color="red", opacity=0.5, row=2, col=1)
-            fig.add_hline(y=30, line_dash="dash", line_color="green", opacity=0.5, row=2, col=1)
-            fig.add_hline(y=50, line_dash="dot", line_color="gray", opacity=0.3, row=2, col=1)
-        
-        # MACD
-        if 'MACD' in df.columns and 'MACD_Signal' in df.columns:
-            fig.add_trace(
-                go.Scatter(x=df.index, y=df['MACD'], name='MACD', line=dict(color='blue', width=1.5)),
-                row=3, col=1
-            )
-            fig.add_trace(
-                go.Scatter(x=df.index, y=df['MACD_Signal'], name='Signal', line=dict(color='red', width=1.5)),
-                row=3, col=1
-            )
-            
-            # เพิ่ม histogram
-            if 'MACD_Histogram' in df.columns:
-                colors_macd = ['green' if val >= 0 else 'red' for val in df['MACD_Histogram']]
-                fig.add_trace(
-                    go.Bar(x=df.index, y=df['MACD_Histogram'], name='Histogram', marker_color=colors_macd, opacity=0.5),
-                    row=3, col=1
-                )
-        
-        fig.update_layout(
-            height=800, 
-            xaxis_rangeslider_visible=False,
-            showlegend=True,
-            legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1)
-        )
-        fig.update_xaxes(title_text="วันที่", row=3, col=1)
-        
         st.plotly_chart(fig, use_container_width=True)
         
         st.markdown("---")
@@ -494,18 +488,8 @@ with tab1:
         
         # แสดงพอร์ตทั้งหมด
         with st.expander("📊 ดูพอร์ตทั้งหมด"):
-            # หาราคาปัจจุบันของหุ้นในพอร์ต
-            current_prices = {}
-            for sym in portfolio.portfolio.keys():
-                try:
-                    stock = yf.Ticker(sym)
-                    hist = stock.history(period="1d")
-                    if not hist.empty:
-                        current_prices[sym] = hist['Close'].iloc[-1]
-                    else:
-                        current_prices[sym] = 0
-                except:
-                    current_prices[sym] = 0
+            # หาราคาปัจจุบันเฉพาะหุ้นที่ยังถืออยู่ (ดึงพร้อมกันครั้งเดียว และแคชไว้ช่วงสั้นๆ)
+            current_prices = quote_service.get_prices(portfolio.get_held_symbols())
             
             summary, total_value, total_cost = portfolio.get_portfolio_summary(current_prices)
             
@@ -576,8 +560,12 @@ with tab2:
             progress_bar = st.progress(0)
             status_text = st.empty()
             
+            def update_progress(done, total, message):
+                progress_bar.progress(done / total)
+                status_text.text(message)
+            
             # เรียกใช้ฟังก์ชันสแกน
-            momentum_stocks = analyzer.scan_momentum_stocks(limit=limit)
+            momentum_stocks = analyzer.scan_momentum_stocks(limit=limit, progress_callback=update_progress)
             
             progress_bar.empty()
             status_text.empty()
@@ -590,10 +578,13 @@ with tab2:
             else:
                 st.warning("⚠️ ไม่พบหุ้นที่มีโมเมนตัมในขณะนี้")
     
-    # แสดงผลการสแกน (ถ้ามี)
-    if st.session_state.scan_results:
-        momentum_stocks = st.session_state.scan_results
-        
+    # แสดงผลการสแกน (ถ้ายังไม่ได้กดสแกน ใช้ผลจากการสแกนอัตโนมัติล่าสุด)
+    momentum_stocks = st.session_state.scan_results
+    if momentum_stocks is None and scan_store.get('momentum'):
+        momentum_stocks = scan_store.get('momentum')[:limit]
+        st.caption(f"🕒 ผลสแกนอัตโนมัติ {format_age(scan_store.age())}")
+    
+    if momentum_stocks:
         # สร้าง DataFrame
         df_momentum = pd.DataFrame(momentum_stocks)
         
@@ -650,89 +641,18 @@ with tab2:
             
             # โหลดข้อมูลหุ้น
             with st.spinner("กำลังโหลดข้อมูลกราฟ..."):
-                df_selected, info_selected = analyzer.get_stock_data(stock_code, period='3mo')
+                df_selected = load_indicators(stock_code, '3mo', version, tuple(ANALYSIS_COLUMNS))
                 
                 if df_selected is not None and not df_selected.empty:
-                    # คำนวณ indicators
-                    df_selected = analyzer.calculate_indicators(df_selected)
                     
-                    # สร้างกราฟ 3 แถว (เหมือนใน Tab1)
-                    fig = make_subplots(
-                        rows=3, cols=1,
-                        shared_xaxes=True,
-                        vertical_spacing=0.08,
-                        row_heights=[0.5, 0.25, 0.25],
-                        subplot_titles=('กราฟราคาและปริมาณ', 'RSI (14)', 'MACD')
-                    )
-                    
-                    # กราฟแท่งเทียน
-                    fig.add_trace(
-                        go.Candlestick(
-                            x=df_selected.index,
-                            open=df_selected['Open'],
-                            high=df_selected['High'],
-                            low=df_selected['Low'],
-                            close=df_selected['Close'],
-                            name='ราคา',
-                            showlegend=False
-                        ),
-                        row=1, col=1
-                    )
-                    
-                    # เพิ่ม SMA
-                    if 'SMA_20' in df_selected.columns:
-                        fig.add_trace(
-                            go.Scatter(x=df_selected.index, y=df_selected['SMA_20'], name='SMA 20', line=dict(color='orange', width=1)),
-                            row=1, col=1
-                        )
-                    
-                    if 'SMA_50' in df_selected.columns:
-                        fig.add_trace(
-                            go.Scatter(x=df_selected.index, y=df_selected['SMA_50'], name='SMA 50', line=dict(color='blue', width=1)),
-                            row=1, col=1
+                    # กราฟแบบเดียวกับ Tab1 (ย่อขนาด ไม่มี SMA 200)
+                    fig = figure_cache.get(
+                        (stock_code, '3mo', version, 'scan'),
+                        lambda: build_price_figure(
+                            df_selected, height=600, show_legend=False, sma_windows=(20, 50), rsi_midline=False
                         )
-                    
-                    # เพิ่มปริมาณ
-                    colors = ['green' if df_selected['Close'].iloc[i] >= df_selected['Open'].iloc[i] else 'red' for i in range(len(df_selected))]
-                    fig.add_trace(
-                        go.Bar(x=df_selected.index, y=df_selected['Volume'], name='ปริมาณ', marker_color=colors, opacity=0.3),
-                        row=1, col=1
                     )
                     
-                    # RSI
-                    if 'RSI_14' in df_selected.columns:
-                        fig.add_trace(
-                            go.Scatter(x=df_selected.index, y=df_selected['RSI_14'], name='RSI 14', line=dict(color='purple', width=2)),
-                            row=2, col=1
-                        )
-                        fig.add_hline(y=70, line_dash="dash", line_color="red", opacity=0.5, row=2, col=1)
-                        fig.add_hline(y=30, line_dash="dash", line_color="green", opacity=0.5, row=2, col=1)
-                    
-                    # MACD
-                    if 'MACD' in df_selected.columns and 'MACD_Signal' in df_selected.columns:
-                        fig.add_trace(
-                            go.Scatter(x=df_selected.index, y=df_selected['MACD'], name='MACD', line=dict(color='blue', width=1.5)),
-                            row=3, col=1
-                        )
-                        fig.add_trace(
-                            go.Scatter(x=df_selected.index, y=df_selected['MACD_Signal'], name='Signal', line=dict(color='red', width=1.5)),
-                            row=3, col=1
-                        )
-                        
-                        if 'MACD_Histogram' in df_selected.columns:
-                            colors_macd = ['green' if val >= 0 else 'red' for val in df_selected['MACD_Histogram']]
-                            fig.add_trace(
-                                go.Bar(x=df_selected.index, y=df_selected['MACD_Histogram'], name='Histogram', marker_color=colors_macd, opacity=0.5),
-                                row=3, col=1
-                            )
-                    
-                    fig.update_layout(
-                        height=600,
-                        xaxis_rangeslider_visible=False,
-                        showlegend=False
-                    )
-                    fig.update_xaxes(title_text="วันที่", row=3, col=1)
-                    
                     st.plotly_chart(fig, use_container_width=True)
                     
                     # สรุปสัญญาณสั้นๆ
@@ -775,68 +695,82 @@ with tab3:
     st.header("💥 สแกนหุ้น breakout")
     st.markdown("หาหุ้นที่กำลังจะทะลุแนวต้าน มีโอกาสปรับตัวขึ้นแรง")
     
+    breakout_stocks = None
     if st.button("🔍 สแกนหุ้น breakout", key="scan_breakout"):
         with st.spinner("กำลังสแกนหุ้น..."):
             breakout_stocks = analyzer.scan_breakout_stocks(limit=20)
-            
-            if breakout_stocks:
-                st.success(f"พบ {len(breakout_stocks)} หุ้นที่กำลังจะ breakout")
-                
-                df_breakout = pd.DataFrame(breakout_stocks)
-                st.dataframe(
-                    df_breakout,
-                    column_config={
-                        'symbol': 'หุ้น',
-                        'code': 'รหัส',
-                        'price': st.column_config.NumberColumn('ราคา', format="฿%.2f"),
-                        'resistance_20': st.column_config.NumberColumn('แนวต้าน', format="฿%.2f"),
-                        'dist_to_resistance': st.column_config.NumberColumn('ระยะห่าง', format="%.2f%%"),
-                        'volume_ratio': st.column_config.NumberColumn('ปริมาณ', format="%.2f"),
-                        'probability': 'โอกาส',
-                        'breakout_type': 'ประเภท',
-                        'target_1': st.column_config.NumberColumn('เป้า 1', format="฿%.2f"),
-                        'target_2': st.column_config.NumberColumn('เป้า 2', format="฿%.2f"),
-                        'stop_loss': st.column_config.NumberColumn('Cut loss', format="฿%.2f")
-                    },
-                    use_container_width=True,
-                    hide_index=True
-                )
-            else:
-                st.warning("ไม่พบหุ้นที่กำลังจะ breakout ในขณะนี้")
+        if breakout_stocks:
+            st.success(f"พบ {len(breakout_stocks)} หุ้นที่กำลังจะ breakout")
+        else:
+            st.warning("ไม่พบหุ้นที่กำลังจะ breakout ในขณะนี้")
+    elif scan_store.get('breakout') is not None:
+        # ผลจากการสแกนอัตโนมัติล่าสุด
+        breakout_stocks = scan_store.get('breakout')[:20]
+        st.caption(f"🕒 ผลสแกนอัตโนมัติ {format_age(scan_store.age())}")
+        if not breakout_stocks:
+            st.warning("ไม่พบหุ้นที่กำลังจะ breakout ในขณะนี้")
+    
+    if breakout_stocks:
+        df_breakout = pd.DataFrame(breakout_stocks)
+        st.dataframe(
+            df_breakout,
+            column_config={
+                'symbol': 'หุ้น',
+                'code': 'รหัส',
+                'price': st.column_config.NumberColumn('ราคา', format="฿%.2f"),
+                'resistance_20': st.column_config.NumberColumn('แนวต้าน', format="฿%.2f"),
+                'dist_to_resistance': st.column_config.NumberColumn('ระยะห่าง', format="%.2f%%"),
+                'volume_ratio': st.column_config.NumberColumn('ปริมาณ', format="%.2f"),
+                'probability': 'โอกาส',
+                'breakout_type': 'ประเภท',
+                'target_1': st.column_config.NumberColumn('เป้า 1', format="฿%.2f"),
+                'target_2': st.column_config.NumberColumn('เป้า 2', format="฿%.2f"),
+                'stop_loss': st.column_config.NumberColumn('Cut loss', format="฿%.2f")
+            },
+            use_container_width=True,
+            hide_index=True
+        )
 
 with tab4:
     st.header("📉 สแกนหุ้น oversold รอรีบาวด์")
     st.markdown("หาหุ้นที่ถูกขายมากเกินไป มีโอกาสรีบาวด์ทางเทคนิค")
     
+    rebound_stocks = None
     if st.button("🔍 สแกนหุ้นรีบาวด์", key="scan_rebound"):
         with st.spinner("กำลังสแกนหุ้น..."):
             rebound_stocks = analyzer.scan_oversold_rebound(limit=20)
-            
-            if rebound_stocks:
-                st.success(f"พบ {len(rebound_stocks)} หุ้นที่ oversold และมีโอกาสรีบาวด์")
-                
-                df_rebound = pd.DataFrame(rebound_stocks)
-                st.dataframe(
-                    df_rebound,
-                    column_config={
-                        'symbol': 'หุ้น',
-                        'code': 'รหัส',
-                        'price': st.column_config.NumberColumn('ราคา', format="฿%.2f"),
-                        'rsi_14': st.column_config.NumberColumn('RSI 14', format="%.2f"),
-                        'rsi_7': st.column_config.NumberColumn('RSI 7', format="%.2f"),
-                        'support': st.column_config.NumberColumn('แนวรับ', format="฿%.2f"),
-                        'dist_to_support': st.column_config.NumberColumn('ระยะห่าง', format="%.2f%%"),
-                        'probability': 'โอกาส',
-                        'rebound_score': 'คะแนน',
-                        'target_1': st.column_config.NumberColumn('เป้า 1', format="฿%.2f"),
-                        'target_2': st.column_config.NumberColumn('เป้า 2', format="฿%.2f"),
-                        'stop_loss': st.column_config.NumberColumn('Cut loss', format="฿%.2f")
-                    },
-                    use_container_width=True,
-                    hide_index=True
-                )
-            else:
-                st.warning("ไม่พบหุ้นที่ oversold ในขณะนี้")
+        if rebound_stocks:
+            st.success(f"พบ {len(rebound_stocks)} หุ้นที่ oversold และมีโอกาสรีบาวด์")
+        else:
+            st.warning("ไม่พบหุ้นที่ oversold ในขณะนี้")
+    elif scan_store.get('rebound') is not None:
+        # ผลจากการสแกนอัตโนมัติล่าสุด
+        rebound_stocks = scan_store.get('rebound')[:20]
+        st.caption(f"🕒 ผลสแกนอัตโนมัติ {format_age(scan_store.age())}")
+        if not rebound_stocks:
+            st.warning("ไม่พบหุ้นที่ oversold ในขณะนี้")
+    
+    if rebound_stocks:
+        df_rebound = pd.DataFrame(rebound_stocks)
+        st.dataframe(
+            df_rebound,
+            column_config={
+                'symbol': 'หุ้น',
+                'code': 'รหัส',
+                'price': st.column_config.NumberColumn('ราคา', format="฿%.2f"),
+                'rsi_14': st.column_config.NumberColumn('RSI 14', format="%.2f"),
+                'rsi_7': st.column_config.NumberColumn('RSI 7', format="%.2f"),
+                'support': st.column_config.NumberColumn('แนวรับ', format="฿%.2f"),
+                'dist_to_support': st.column_config.NumberColumn('ระยะห่าง', format="%.2f%%"),
+                'probability': 'โอกาส',
+                'rebound_score': 'คะแนน',
+                'target_1': st.column_config.NumberColumn('เป้า 1', format="฿%.2f"),
+                'target_2': st.column_config.NumberColumn('เป้า 2', format="฿%.2f"),
+                'stop_loss': st.column_config.NumberColumn('Cut loss', format="฿%.2f")
+            },
+            use_container_width=True,
+            hide_index=True
+        )
 
 st.markdown("---")
 st.caption("⚠️ ข้อมูลเพื่อการศึกษาเท่านั้น ไม่ใช่คำแนะนำในการลงทุน ควรศึกษาข้อมูลเพิ่มเติมก่อนตัดสินใจลงทุน")
@@ -0,0 +1,257 @@
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+import scanner_rules
+
+# ทดสอบย้อนหลังเงื่อนไขของสแกนเนอร์: ใช้ mask เดียวกับ scanner_rules บนทุกแท่งของทุกหุ้นใน panel
+# เข้าซื้อที่ราคาปิดของวันที่มีสัญญาณ (สแกนหลังตลาดปิด) แล้วออกเมื่อถึงเป้า ชน stop loss หรือถือครบกำหนด
+# - ถ้าราคาเปิดกระโดดข้ามเป้า/stop ใช้ราคาเปิดเป็นราคาออก
+# - ถ้าแท่งเดียวกันแตะทั้งเป้าและ stop ถือว่าโดน stop ก่อน (ประเมินแบบระมัดระวัง)
+# - ถือได้ครั้งละหนึ่งสถานะต่อหุ้น สัญญาณที่เกิดซ้ำระหว่างที่ยังถืออยู่ไม่นับเป็นการเทรดใหม่
+
+# ระยะถือสูงสุด (วันทำการ) ของสัญญาณโมเมนตัมตามความผันผวน ตรงกับข้อความ holding_period ของสแกนเนอร์
+MOMENTUM_HOLD = {'high': 3, 'mid': 7, 'low': 10}
+BREAKOUT_HOLD = 10
+REBOUND_HOLD = 10
+
+EXIT_TARGET = 1
+EXIT_STOP = 2
+EXIT_TIME = 3
+EXIT_REASONS = {EXIT_TARGET: 'target', EXIT_STOP: 'stop', EXIT_TIME: 'time'}
+
+
+def _bars_seen(panel):
+    """จำนวนแท่งที่มีข้อมูลถึงแต่ละวัน (เทียบกับ bar_count ที่สแกนเนอร์ใช้กับแท่งล่าสุด)"""
+    return np.cumsum(~np.isnan(panel.fields['Close']), axis=1)
+
+
+def momentum_entries(panel, params=None):
+    """สัญญาณโมเมนตัม (คะแนน >= min_pct) เป้า +5% stop -3%"""
+    p = {**scanner_rules.MOMENTUM_PARAMS, **(params or {})}
+    ind = panel.compute(scanner_rules.MOMENTUM_COLUMNS)
+    with np.errstate(invalid='ignore'):
+        score = scanner_rules.momentum_score(ind, p)
+        entry = (_bars_seen(panel) > 20) & (score / 10 * 100 >= p['min_pct'])
+        atr_pct = ind['ATR_Pct']
+        hold = np.where(atr_pct > 3, MOMENTUM_HOLD['high'],
+                        np.where(atr_pct > 2, MOMENTUM_HOLD['mid'], MOMENTUM_HOLD['low']))
+    close = ind['Close']
+    return entry, close * 1.05, close * 0.97, hold
+
+
+def breakout_entries(panel, params=None):
+    """สัญญาณ breakout: แนวต้านระยะสั้น (เป้า R20 +3%, stop -3%) หรือแนวต้านหลัก (เป้า R50 +5%, stop -5%)"""
+    ind = panel.compute(scanner_rules.BREAKOUT_COLUMNS)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        masks = scanner_rules.breakout_masks(ind, params)
+    short_term, major = masks['short_term'], masks['major']
+    close = ind['Close']
+    entry = (_bars_seen(panel) > 50) & (short_term | major)
+    target = np.where(short_term, ind['Resistance_20'] * 1.03, ind['Resistance_50'] * 1.05)
+    stop = np.where(short_term, close * 0.97, close * 0.95)
+    return entry, target, stop, np.full(close.shape, BREAKOUT_HOLD)
+
+
+def rebound_entries(panel, params=None):
+    """สัญญาณ oversold รอรีบาวด์ เป้า +3% stop -5%"""
+    ind = panel.compute(scanner_rules.REBOUND_COLUMNS)
+    prev = {column: panel.shift(ind[column]) for column in ['MACD', 'MACD_Signal']}
+    with np.errstate(invalid='ignore'):
+        masks = scanner_rules.rebound_masks(ind, prev, params)
+    close = ind['Close']
+    entry = (_bars_seen(panel) > 20) & masks['signal']
+    return entry, close * 1.03, close * 0.95, np.full(close.shape, REBOUND_HOLD)
+
+
+STRATEGIES = {
+    'momentum': momentum_entries,
+    'breakout': breakout_entries,
+    'rebound': rebound_entries,
+}
+# ตัวชี้วัดที่สัญญาณของแต่ละแบบใช้
+STRATEGY_COLUMNS = {
+    'momentum': scanner_rules.MOMENTUM_COLUMNS,
+    'breakout': scanner_rules.BREAKOUT_COLUMNS,
+    'rebound': scanner_rules.REBOUND_COLUMNS,
+}
+
+
+def _one_at_a_time(rows, entry_index, exit_index):
+    """เลือกเฉพาะสัญญาณที่เกิดหลังการเทรดก่อนหน้าของหุ้นเดียวกันปิดแล้ว (rows เรียงตามหุ้นแล้วตามวันที่)"""
+    keep = np.zeros(len(rows), dtype=bool)
+    last_row, free_at = -1, -1
+    for i, (row, start, end) in enumerate(zip(rows.tolist(), entry_index.tolist(), exit_index.tolist())):
+        if row != last_row:
+            last_row, free_at = row, -1
+        if start >= free_at:
+            keep[i] = True
+            free_at = end
+    return keep
+
+
+def simulate(panel, entry, target, stop, hold, overlap=False):
+    """จำลองการเทรดของทุกสัญญาณพร้อมกัน คืน dict ของ array (หนึ่งแถวต่อการเทรดที่ปิดแล้ว)
+
+    overlap=False: ถือได้ครั้งละหนึ่งสถานะต่อหุ้น สัญญาณซ้ำระหว่างที่ยังถืออยู่จะไม่นับเป็นการเทรดใหม่
+    การเทรดที่ข้อมูลหมดก่อนถึงเป้า/stop/กำหนดถือ จะไม่ถูกนับ
+    'daily_return' คือผลตอบแทนรายวัน (%) ของพอร์ตที่แบ่งเงินเท่ากันทุกสถานะที่เปิดอยู่ในวันนั้น
+    """
+    rows, cols = np.nonzero(entry & ~np.isnan(target) & ~np.isnan(stop))
+    n_dates = panel.fields['Close'].shape[1]
+    entry_price = panel.fields['Close'][rows, cols]
+    target = target[rows, cols]
+    stop = stop[rows, cols]
+    hold = hold[rows, cols].astype(np.int64)
+    max_hold = int(hold.max()) if len(hold) else 0
+
+    # ราคาของแท่งจริงถัดไป 1..max_hold ของแต่ละการเทรด (การเทรด x แท่งที่ถือ ข้ามวันที่หุ้นไม่มีซื้อขาย)
+    steps = np.arange(1, max_hold + 1)
+    position = panel.bar_position[rows, cols][:, None] + steps[None, :]
+    inside = position < n_dates
+    index = panel.bar_dates[rows[:, None], np.minimum(position, n_dates - 1)]
+    forward = {}
+    for field in ['Open', 'High', 'Low', 'Close']:
+        values = panel.fields[field][rows[:, None], index]
+        forward[field] = np.where(inside, values, np.nan)
+
+    within = steps[None, :] <= hold[:, None]
+    with np.errstate(invalid='ignore'):
+        stop_hit = within & (forward['Low'] <= stop[:, None])
+        target_hit = within & (forward['High'] >= target[:, None])
+    hit = stop_hit | target_hit
+    any_hit = hit.any(axis=1)
+    first = np.argmax(hit, axis=1)
+
+    picked = np.arange(len(rows))
+    open_at_hit = forward['Open'][picked, first]
+    is_stop = stop_hit[picked, first]
+    hit_price = np.where(
+        is_stop,
+        np.fmin(open_at_hit, stop),
+        np.fmax(open_at_hit, target)
+    )
+
+    # ไม่ถึงเป้าหรือ stop: ขายที่ราคาปิดของวันสุดท้ายที่ถือ
+    last = np.clip(hold - 1, 0, max(max_hold - 1, 0))
+    time_price = forward['Close'][picked, last] if max_hold else np.full(len(rows), np.nan)
+
+    exit_price = np.where(any_hit, hit_price, time_price)
+    exit_step = np.where(any_hit, first, last)
+    reason = np.where(any_hit, np.where(is_stop, EXIT_STOP, EXIT_TARGET), EXIT_TIME)
+
+    closed = ~np.isnan(exit_price)
+    if overlap:
+        keep = closed
+    else:
+        # การเทรดที่ยังไม่ปิดถือสถานะไว้จนข้อมูลหมด
+        exit_index = np.where(closed, index[picked, exit_step], n_dates)
+        keep = _one_at_a_time(rows, cols, exit_index) & closed
+    exit_step = exit_step[keep]
+    exit_index = index[keep][np.arange(len(exit_step)), exit_step] if max_hold else cols[keep]
+
+    # ผลตอบแทนรายวันของแต่ละสถานะ: ราคาปิดเทียบวันก่อน และวันสุดท้ายใช้ราคาออก
+    path = forward['Close'][keep]
+    held = steps[None, :] <= exit_step[:, None] + 1
+    path = np.where(steps[None, :] == exit_step[:, None] + 1, exit_price[keep][:, None], path)
+    previous = np.concatenate([entry_price[keep][:, None], path[:, :-1]], axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        position_return = path / previous - 1
+    day = index[keep][held]
+    total = np.bincount(day, weights=position_return[held], minlength=n_dates)
+    count = np.bincount(day, minlength=n_dates)
+    daily_return = np.divide(total, count, out=np.zeros(n_dates), where=count > 0) * 100
+
+    return {
+        'row': rows[keep],
+        'entry_index': cols[keep],
+        'exit_index': exit_index,
+        'bars_held': exit_step + 1,
+        'entry_price': entry_price[keep],
+        'exit_price': exit_price[keep],
+        'return_pct': (exit_price[keep] / entry_price[keep] - 1) * 100,
+        'reason': reason[keep],
+        'open_trades': int((~closed).sum()),
+        'daily_return': daily_return,
+    }
+
+
+def summarize(trades):
+    """สรุปผล: อัตราถึงเป้า อัตราชนะ ผลตอบแทนคาดหวังต่อการเทรด และ drawdown สูงสุด
+
+    ผลตอบแทนรวมและ drawdown (% ของเงินทุน) คิดจากมูลค่าพอร์ตรายวันแบบทบต้น
+    ที่แบ่งเงินเท่ากันทุกสถานะที่เปิดอยู่ (ไม่มีสถานะในวันใดถือเป็นเงินสด)
+    """
+    returns = trades['return_pct']
+    count = len(returns)
+    if count == 0:
+        return {
+            'trades': 0, 'open_trades': trades['open_trades'], 'hit_rate': 0.0, 'win_rate': 0.0,
+            'avg_win': 0.0, 'avg_loss': 0.0, 'expectancy': 0.0, 'total_return': 0.0,
+            'max_drawdown': 0.0, 'avg_bars_held': 0.0, 'exits': {name: 0 for name in EXIT_REASONS.values()},
+        }
+
+    wins = returns[returns > 0]
+    losses = returns[returns <= 0]
+    equity = np.cumprod(1 + trades['daily_return'] / 100)
+    drawdown = 1 - equity / np.maximum.accumulate(np.maximum(equity, 1))
+
+    return {
+        'trades': count,
+        'open_trades': trades['open_trades'],
+        'hit_rate': float((trades['reason'] == EXIT_TARGET).mean() * 100),
+        'win_rate': float(len(wins) / count * 100),
+        'avg_win': float(wins.mean()) if len(wins) else 0.0,
+        'avg_loss': float(losses.mean()) if len(losses) else 0.0,
+        'expectancy': float(returns.mean()),
+        'total_return': float((equity[-1] - 1) * 100),
+        'max_drawdown': float(drawdown.max() * 100),
+        'avg_bars_held': float(trades['bars_held'].mean()),
+        'exits': {name: int((trades['reason'] == code).sum()) for code, name in EXIT_REASONS.items()},
+    }
+
+
+def backtest(panel, strategy, params=None, overlap=False):
+    """ทดสอบย้อนหลังสแกนเนอร์หนึ่งแบบ คืน (สรุปผล, DataFrame ของการเทรด)"""
+    trades = simulate(panel, *STRATEGIES[strategy](panel, params), overlap=overlap)
+    frame = pd.DataFrame({
+        'symbol': [panel.symbols[row] for row in trades['row']],
+        'entry_date': panel.dates[trades['entry_index']],
+        'exit_date': panel.dates[trades['exit_index']],
+        'entry_price': trades['entry_price'],
+        'exit_price': trades['exit_price'],
+        'return_pct': trades['return_pct'],
+        'reason': [EXIT_REASONS[code] for code in trades['reason']],
+    })
+    return summarize(trades), frame
+
+
+def backtest_all(panel):
+    """ทดสอบย้อนหลังทุกสแกนเนอร์ คืน {ชื่อ: สรุปผล}"""
+    return {name: summarize(simulate(panel, *entries(panel))) for name, entries in STRATEGIES.items()}
+
+
+def format_report(results):
+    """ตารางสรุปผลแบบข้อความ"""
+    lines = [f"{'สแกนเนอร์':<10} {'เทรด':>7} {'ถึงเป้า%':>9} {'ชนะ%':>7} {'คาดหวัง%':>9} {'รวม%':>8} {'DD%':>8} {'ถือ(วัน)':>8}"]
+    for name, stats in results.items():
+        lines.append(
+            f"{name:<10} {stats['trades']:>7} {stats['hit_rate']:>9.1f} {stats['win_rate']:>7.1f} "
+            f"{stats['expectancy']:>9.2f} {stats['total_return']:>8.1f} {stats['max_drawdown']:>8.1f} {stats['avg_bars_held']:>8.1f}"
+        )
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    # รันจากข้อมูลในแคช: python backtest.py [ช่วงเวลา เช่น 2y]
+    from stock_analyzer import StockAnalyzer
+
+    period = sys.argv[1] if len(sys.argv) > 1 else '2y'
+    analyzer = StockAnalyzer()
+    panel = analyzer.load_panel(period=period)
+    start = time.perf_counter()
+    results = backtest_all(panel)
+    print(format_report(results))
+    print(f"{len(panel)} หุ้น {len(panel.dates)} วัน ใช้เวลา {time.perf_counter() - start:.2f} s")
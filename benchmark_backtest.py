@@ -0,0 +1,68 @@
+import os
+import sys
+import tempfile
+
+import numpy as np
+
+import backtest
+import param_sweep
+import scanner_rules
+from benchmark_scan import fill_cache, make_universe, timed
+from price_cache import PriceCache
+from stock_analyzer import StockAnalyzer
+from universe import Universe
+
+# จับเวลาทดสอบย้อนหลังทุกสแกนเนอร์บนข้อมูลจำลองหลายปี (ประมาณ 800 หุ้น x 5 ปี) โดยไม่ใช้อินเทอร์เน็ต
+# และตรวจว่าสัญญาณที่แท่งล่าสุดตรงกับผลของสแกนเนอร์จริง และ param_sweep ให้ผลเท่ากับการรันทีละชุด
+# รัน: python benchmark_backtest.py [จำนวนหุ้น] [จำนวนแท่ง]
+
+
+def main(count=800, bars=1250):
+    with tempfile.TemporaryDirectory() as directory:
+        universe = Universe(make_universe(directory, count), local_filename=None)
+        db_path = os.path.join(directory, "prices.db")
+        symbols = universe.symbols()
+
+        elapsed, _ = timed(lambda: fill_cache(PriceCache(db_path), symbols, bars, period='5y'))
+        print(f"เตรียมแคช {len(symbols)} หุ้น x {bars} แท่ง: {elapsed:.1f} s")
+
+        analyzer = StockAnalyzer(price_cache=PriceCache(db_path), universe=universe)
+        elapsed, panel = timed(lambda: analyzer.load_panel(period='5y'))
+        print(f"load_panel: {elapsed:.2f} s ({len(panel)} หุ้น x {len(panel.dates)} วัน)")
+
+        elapsed, results = timed(lambda: backtest.backtest_all(panel))
+        print(f"backtest_all: {elapsed:.2f} s")
+        print(backtest.format_report(results))
+
+        # สัญญาณที่แท่งล่าสุดของ backtest ต้องเป็นหุ้นชุดเดียวกับที่สแกนเนอร์เลือก
+        names = analyzer.thai_stocks
+        scanners = {
+            'momentum': scanner_rules.scan_momentum,
+            'breakout': scanner_rules.scan_breakout,
+            'rebound': scanner_rules.scan_rebound,
+        }
+        rows = np.arange(len(panel))
+        ok = True
+        for name, scan in scanners.items():
+            entry = backtest.STRATEGIES[name](panel)[0]
+            flagged = {names.get(panel.symbols[row], panel.symbols[row]) for row in rows[entry[rows, panel.last_index]]}
+            scanned = {result['symbol'] for result in scan(panel, names)}
+            if flagged != scanned:
+                print(f"{name}: สัญญาณไม่ตรงกับสแกนเนอร์ ({len(flagged)} / {len(scanned)})")
+                ok = False
+
+        elapsed, table = timed(lambda: param_sweep.sweep(panel, 'rebound'))
+        print(f"param_sweep rebound: {elapsed:.2f} s ({len(table)} ชุดเกณฑ์)")
+        print(table.head(5).to_string(index=False))
+        defaults = scanner_rules.REBOUND_PARAMS
+        row = table[(table['rsi_14'] == defaults['rsi_14']) & (table['rsi_7'] == defaults['rsi_7'])
+                    & (table['dist_support'] == defaults['dist_support'])].iloc[0]
+        if row['trades'] != results['rebound']['trades'] or row['expectancy'] != results['rebound']['expectancy']:
+            print("param_sweep: ผลของเกณฑ์เดิมไม่ตรงกับ backtest_all")
+            ok = False
+    return ok
+
+
+if __name__ == "__main__":
+    args = [int(arg) for arg in sys.argv[1:3]]
+    sys.exit(0 if main(*args) else 1)
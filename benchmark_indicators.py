@@ -0,0 +1,232 @@
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+import ta
+
+from incremental_indicators import IncrementalIndicators
+from indicators import ALL_COLUMNS, compute_indicators
+from panel import PricePanel
+
+# ตรวจว่า kernel NumPy ให้ผลเท่ากับไลบรารี ta (แบบที่ calculate_indicators เคยใช้) และจับเวลาเทียบกัน
+# รัน: python benchmark_indicators.py [จำนวนแท่ง] [จำนวนหุ้น]
+# คืนค่า exit code 1 ถ้ามีคอลัมน์ใดต่างจาก ta เกินค่าที่ยอมรับได้
+
+TOLERANCE = 1e-6
+
+
+def make_history(bars, seed=0):
+    """ข้อมูลราคาจำลอง (random walk) สำหรับทดสอบ"""
+    rng = np.random.default_rng(seed)
+    close = 50 * np.exp(np.cumsum(rng.normal(0, 0.02, bars)))
+    spread = np.abs(rng.normal(0, 0.01, bars)) * close
+    high = close + spread
+    low = close - spread
+    open_ = low + (high - low) * rng.random(bars)
+    volume = rng.integers(1_000, 1_000_000, bars).astype(float)
+    # วันที่ราคาไม่ขยับและปริมาณ 0 (หุ้นสภาพคล่องต่ำ) มีจริงในตลาดไทย
+    flat = rng.random(bars) < 0.05
+    close[1:][flat[1:]] = close[:-1][flat[1:]]
+    volume[flat] = 0.0
+    high = np.maximum(high, close)
+    low = np.minimum(low, close)
+    index = pd.bdate_range('2020-01-01', periods=bars)
+    return pd.DataFrame({'Open': open_, 'High': high, 'Low': low, 'Close': close, 'Volume': volume}, index=index)
+
+
+def calculate_with_ta(df):
+    """ตัวชี้วัดแบบเดิมที่คำนวณด้วยไลบรารี ta"""
+    df['RSI_7'] = ta.momentum.RSIIndicator(df['Close'], window=7).rsi()
+    df['RSI_14'] = ta.momentum.RSIIndicator(df['Close'], window=14).rsi()
+    df['RSI_21'] = ta.momentum.RSIIndicator(df['Close'], window=21).rsi()
+    for window in [5, 10, 20, 50, 100, 200]:
+        df[f'SMA_{window}'] = ta.trend.sma_indicator(df['Close'], window=window)
+    for window in [5, 10, 20, 50]:
+        df[f'EMA_{window}'] = ta.trend.ema_indicator(df['Close'], window=window)
+
+    macd = ta.trend.MACD(df['Close'])
+    df['MACD'] = macd.macd()
+    df['MACD_Signal'] = macd.macd_signal()
+    df['MACD_Histogram'] = macd.macd_diff()
+
+    bb = ta.volatility.BollingerBands(df['Close'], window=20, window_dev=2)
+    df['BB_Upper'] = bb.bollinger_hband()
+    df['BB_Middle'] = bb.bollinger_mavg()
+    df['BB_Lower'] = bb.bollinger_lband()
+    df['BB_Width'] = (df['BB_Upper'] - df['BB_Lower']) / df['BB_Middle']
+    df['BB_Position'] = (df['Close'] - df['BB_Lower']) / (df['BB_Upper'] - df['BB_Lower'])
+
+    df['Volume_SMA'] = df['Volume'].rolling(window=20).mean()
+    df['Volume_Ratio'] = df['Volume'] / df['Volume_SMA']
+    df['Volume_5_SMA'] = df['Volume'].rolling(window=5).mean()
+    df['Volume_5_Ratio'] = df['Volume'] / df['Volume_5_SMA']
+
+    df['Resistance_20'] = df['High'].rolling(window=20).max()
+    df['Support_20'] = df['Low'].rolling(window=20).min()
+    df['Resistance_50'] = df['High'].rolling(window=50).max()
+    df['Support_50'] = df['Low'].rolling(window=50).min()
+
+    for periods in [1, 5, 10, 20]:
+        df[f'Price_Change_{periods}d'] = df['Close'].pct_change(periods) * 100
+    df['Volume_Change'] = df['Volume'].pct_change() * 100
+    df['Volatility_5'] = df['Close'].pct_change().rolling(window=5).std() * np.sqrt(252)
+    df['Volatility_20'] = df['Close'].pct_change().rolling(window=20).std() * np.sqrt(252)
+
+    adx = ta.trend.ADXIndicator(df['High'], df['Low'], df['Close'])
+    df['ADX'] = adx.adx()
+    df['DI_Pos'] = adx.adx_pos()
+    df['DI_Neg'] = adx.adx_neg()
+
+    df['ATR'] = ta.volatility.AverageTrueRange(df['High'], df['Low'], df['Close']).average_true_range()
+    df['ATR_Pct'] = (df['ATR'] / df['Close']) * 100
+
+    stoch = ta.momentum.StochasticOscillator(df['High'], df['Low'], df['Close'])
+    df['Stoch_K'] = stoch.stoch()
+    df['Stoch_D'] = stoch.stoch_signal()
+
+    df['CCI'] = ta.trend.CCIIndicator(df['High'], df['Low'], df['Close']).cci()
+    df['MFI'] = ta.volume.MFIIndicator(df['High'], df['Low'], df['Close'], df['Volume']).money_flow_index()
+    df['OBV'] = ta.volume.OnBalanceVolumeIndicator(df['Close'], df['Volume']).on_balance_volume()
+    df['OBV_Change'] = df['OBV'].pct_change() * 100
+
+    for periods in [5, 10]:
+        df[f'Momentum_{periods}'] = df['Close'] - df['Close'].shift(periods)
+        df[f'Momentum_{periods}_Pct'] = (df[f'Momentum_{periods}'] / df['Close'].shift(periods)) * 100
+    for window in [5, 10, 20]:
+        df[f'ROC_{window}'] = ta.momentum.ROCIndicator(df['Close'], window=window).roc()
+    return df
+
+
+def max_difference(expected, actual):
+    """ความต่างสัมพัทธ์สูงสุด (ตำแหน่ง NaN/inf ต้องตรงกันด้วย)"""
+    expected = np.asarray(expected, dtype=float)
+    actual = np.asarray(actual, dtype=float)
+    if not np.array_equal(np.isnan(expected), np.isnan(actual)):
+        return np.inf
+    if not np.array_equal(np.isinf(expected), np.isinf(actual)):
+        return np.inf
+    finite = np.isfinite(expected)
+    if not finite.any():
+        return 0.0
+    scale = np.maximum(np.abs(expected[finite]), 1.0)
+    return float(np.max(np.abs(expected[finite] - actual[finite]) / scale))
+
+
+def check_parity(df):
+    """เทียบทุกคอลัมน์ คืน list ของ (คอลัมน์, ความต่าง) ที่เกินค่าที่ยอมรับได้
+
+    ข้อมูลสั้นเกินไป ta จะ error กลางทาง (เช่น ADX) เทียบเฉพาะคอลัมน์ที่ ta คำนวณได้
+    """
+    expected = df.copy()
+    try:
+        calculate_with_ta(expected)
+    except Exception:
+        pass
+    actual = compute_indicators(df.copy())
+    failures = []
+    for column in ALL_COLUMNS:
+        if column not in expected.columns:
+            continue
+        diff = max_difference(expected[column], actual[column])
+        if diff > TOLERANCE:
+            failures.append((column, diff))
+    return failures
+
+
+def check_panel_parity(frames):
+    """panel หลายหุ้น (ความยาวต่างกัน) ต้องได้ค่าเท่ากับคำนวณทีละหุ้น"""
+    panel = PricePanel.from_frames(frames)
+    panel.compute(ALL_COLUMNS)
+    failures = []
+    for row, symbol in enumerate(panel.symbols):
+        expected = compute_indicators(frames[symbol].copy())
+        columns = panel.dates.get_indexer(expected.index)
+        for column in ALL_COLUMNS:
+            diff = max_difference(expected[column], panel.indicators[column][row, columns])
+            if diff > TOLERANCE:
+                failures.append((f'{symbol}:{column}', diff))
+    return failures
+
+
+def check_incremental_parity(df):
+    """IncrementalIndicators ทีละแท่ง (แก้แท่งล่าสุดด้วย update_last ก่อน) ต้องเท่ากับคำนวณใหม่ทั้งหมด
+
+    ADX/DI_Pos/DI_Neg ช่วงอุ่นเครื่อง (ก่อนแท่งที่ 2*window) ต้องเป็น NaN ตามที่ระบุไว้ใน docstring
+    """
+    expected = compute_indicators(df.copy())
+    engine = IncrementalIndicators()
+    rows = []
+    for high, low, close, volume in zip(df['High'], df['Low'], df['Close'], df['Volume']):
+        engine.update(high * 1.01, low * 0.99, close * 1.005, volume * 2)
+        rows.append(engine.update_last(high, low, close, volume))
+    actual = pd.DataFrame(rows, index=df.index)
+    warmup = 2 * engine.adx.window - 1
+    failures = []
+    for column in ALL_COLUMNS:
+        if column in ('ADX', 'DI_Pos', 'DI_Neg'):
+            if not actual[column].iloc[:warmup].isna().all():
+                failures.append((f'{column} (warm-up)', np.inf))
+            diff = max_difference(expected[column].iloc[warmup:], actual[column].iloc[warmup:])
+        else:
+            diff = max_difference(expected[column], actual[column])
+        if diff > TOLERANCE:
+            failures.append((column, diff))
+    return failures
+
+
+def timed(func, repeat=3):
+    best = np.inf
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main(bars=1250, symbols=50):
+    ok = True
+
+    for length in [10, 27, 28, 60, bars]:
+        failures = check_parity(make_history(length, seed=length))
+        status = "ผ่าน" if not failures else "ไม่ผ่าน"
+        print(f"ตรวจเทียบ ta ({length} แท่ง): {status}")
+        for column, diff in failures:
+            print(f"  {column}: ต่างกัน {diff:.3g}")
+        ok = ok and not failures
+
+    frames = {
+        f'S{i:03d}': make_history(bars - (i * 37) % (bars // 2), seed=i).iloc[(i * 11) % 40:]
+        for i in range(5)
+    }
+    # หุ้นที่หยุดซื้อขายบางวันกลางช่วง
+    frames['GAP'] = make_history(bars, seed=99).iloc[np.arange(bars) % 9 != 4]
+    failures = check_panel_parity(frames)
+    print(f"ตรวจ panel เทียบทีละหุ้น: {'ผ่าน' if not failures else 'ไม่ผ่าน'}")
+    for column, diff in failures:
+        print(f"  {column}: ต่างกัน {diff:.3g}")
+    ok = ok and not failures
+
+    failures = check_incremental_parity(make_history(min(bars, 300), seed=7))
+    print(f"ตรวจ IncrementalIndicators เทียบคำนวณใหม่: {'ผ่าน' if not failures else 'ไม่ผ่าน'}")
+    for column, diff in failures:
+        print(f"  {column}: ต่างกัน {diff:.3g}")
+    ok = ok and not failures
+
+    df = make_history(bars)
+    ta_time = timed(lambda: calculate_with_ta(df.copy()))
+    kernel_time = timed(lambda: compute_indicators(df.copy()))
+    print(f"หุ้น 1 ตัว {bars} แท่ง: ta {ta_time * 1000:.1f} ms, kernel {kernel_time * 1000:.1f} ms "
+          f"(เร็วขึ้น {ta_time / kernel_time:.1f} เท่า)")
+
+    frames = {f'S{i:03d}': make_history(bars, seed=i) for i in range(symbols)}
+    loop_time = timed(lambda: [compute_indicators(frame.copy()) for frame in frames.values()], repeat=1)
+    panel_time = timed(lambda: PricePanel.from_frames(frames).compute(ALL_COLUMNS), repeat=1)
+    print(f"{symbols} หุ้น: ทีละตัว {loop_time * 1000:.0f} ms, panel {panel_time * 1000:.0f} ms")
+
+    return ok
+
+
+if __name__ == "__main__":
+    args = [int(arg) for arg in sys.argv[1:3]]
+    sys.exit(0 if main(*args) else 1)
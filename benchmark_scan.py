@@ -0,0 +1,138 @@
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+import scanner_rules
+from benchmark_indicators import make_history
+from market_hours import now_bangkok
+from panel import PricePanel
+from price_cache import PriceCache
+from stock_analyzer import StockAnalyzer
+from universe import Universe
+
+# จับเวลาสแกนทั้งตลาด (ประมาณ 800 หุ้น) จากข้อมูลในแคช โดยไม่ใช้อินเทอร์เน็ต
+# รัน: python benchmark_scan.py [จำนวนหุ้น] [จำนวนแท่ง]
+# รอบแรกเปิดแคชใหม่ (โหลดจาก SQLite) รอบถัดไปใช้ข้อมูลในหน่วยความจำ
+# และตรวจว่าสแกนทั้งตลาดบน panel ให้ผลเท่ากับสแกนทีละหุ้น เมื่อบางหุ้นมีวันที่หยุดซื้อขายกลางช่วง
+
+SCANS = {
+    'momentum': scanner_rules.scan_momentum,
+    'breakout': scanner_rules.scan_breakout,
+    'rebound': scanner_rules.scan_rebound,
+}
+
+
+def make_universe(directory, count):
+    """ไฟล์รายชื่อหุ้นจำลอง"""
+    filename = os.path.join(directory, "universe.csv")
+    with open(filename, 'w', encoding='utf-8') as f:
+        f.write("symbol,name,name_th,market,sector\n")
+        for i in range(count):
+            market = 'mai' if i % 5 == 0 else 'SET'
+            f.write(f"S{i:04d},Synthetic {i},,{market},หมวด {i % 28}\n")
+    return filename
+
+
+def fill_cache(cache, symbols, bars, period='6mo'):
+    """เก็บราคาจำลองที่ยังไม่หมดอายุของทุกหุ้นลงแคช"""
+    end = pd.Timestamp(now_bangkok().date())
+    for i, symbol in enumerate(symbols):
+        df = make_history(bars, seed=i)
+        df.index = pd.bdate_range(end=end, periods=bars)
+        cache.store(symbol, df, period)
+
+
+def make_gapped_frames(count, bars):
+    """ราคาจำลองที่บางวันไม่มีซื้อขาย (รวมแท่งก่อนแท่งล่าสุดและแท่งล่าสุด) และเริ่มไม่พร้อมกัน"""
+    frames = {}
+    for i in range(count):
+        df = make_history(bars, seed=i)
+        keep = np.random.default_rng(i).random(bars) >= 0.1
+        if i % 3 == 0:
+            keep[-2] = False
+        if i % 7 == 0:
+            keep[-1] = False
+        frames[f'S{i:04d}'] = df[keep].iloc[i % 30:]
+    return frames
+
+
+def _same_value(a, b):
+    if isinstance(a, (float, np.floating)) and isinstance(b, (float, np.floating)):
+        if np.isnan(a) or np.isnan(b):
+            return np.isnan(a) and np.isnan(b)
+        return abs(a - b) <= 1e-9 * max(abs(a), abs(b), 1.0)
+    return a == b
+
+
+def check_gap_parity(count=300, bars=130):
+    """สแกน panel รวมเทียบกับสแกน panel ของแต่ละหุ้นแยกกัน คืน list ของสแกนเนอร์ที่ผลไม่ตรงกัน"""
+    frames = make_gapped_frames(count, bars)
+    names = {symbol: symbol for symbol in frames}
+    panel = PricePanel.from_frames(frames)
+    failures = []
+    for name, scan in SCANS.items():
+        combined = scan(panel, names)
+        single = [result for symbol, df in frames.items() for result in scan(PricePanel.from_frames({symbol: df}), names)]
+        same = len(combined) == len(single) and all(
+            a.keys() == b.keys() and all(_same_value(a[key], b[key]) for key in a)
+            for a, b in zip(combined, single)
+        )
+        print(f"ตรวจสแกน {name} บนข้อมูลที่มีวันหยุดซื้อขาย ({len(single)} รายการ): {'ผ่าน' if same else 'ไม่ผ่าน'}")
+        if not same:
+            failures.append(name)
+    return failures
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return time.perf_counter() - start, result
+
+
+def main(count=800, bars=130):
+    if check_gap_parity():
+        return False
+
+    with tempfile.TemporaryDirectory() as directory:
+        universe = Universe(make_universe(directory, count), local_filename=None)
+        db_path = os.path.join(directory, "prices.db")
+        symbols = universe.symbols()
+
+        elapsed, _ = timed(lambda: fill_cache(PriceCache(db_path), symbols, bars))
+        print(f"เตรียมแคช {len(symbols)} หุ้น x {bars} แท่ง: {elapsed:.1f} s")
+
+        downloads = []
+
+        def no_network(*args, **kwargs):
+            downloads.append(args)
+            return None
+
+        analyzer = StockAnalyzer(price_cache=PriceCache(db_path), universe=universe)
+        analyzer._download_history = no_network
+        analyzer._download_since = no_network
+        analyzer._download_bulk = lambda *args, **kwargs: downloads.append(args) or {}
+
+        elapsed, results = timed(lambda: analyzer.scan_all(limit=20))
+        print(f"scan_all (เปิดแคชใหม่): {elapsed:.2f} s")
+
+        for _ in range(2):
+            elapsed, results = timed(lambda: analyzer.scan_all(limit=20))
+            print(f"scan_all (ข้อมูลในหน่วยความจำ): {elapsed:.2f} s")
+
+        elapsed, panel = timed(lambda: analyzer.load_panel(period='3mo'))
+        print(f"  load_panel: {elapsed:.2f} s ({len(panel)} หุ้น)")
+
+        print("ผลลัพธ์: " + ", ".join(f"{name} {len(rows)}" for name, rows in results.items()))
+        if downloads:
+            print(f"มีการเรียกดาวน์โหลด {len(downloads)} ครั้ง (ข้อมูลในแคชควรครบ)")
+            return False
+    return True
+
+
+if __name__ == "__main__":
+    args = [int(arg) for arg in sys.argv[1:3]]
+    sys.exit(0 if main(*args) else 1)
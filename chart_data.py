@@ -0,0 +1,116 @@
+import numpy as np
+import pandas as pd
+
+# เตรียมข้อมูลก่อนส่งให้ Plotly: ช่วงเวลายาวๆ (2 ปี, 5 ปี) ไม่ต้องส่งทุกแท่งรายวัน
+# - แท่งเทียน/ปริมาณ/histogram: รวมเป็นแท่งรายสัปดาห์หรือรายเดือน (เปิด=แรก สูง=max ต่ำ=min ปิด=สุดท้าย)
+# - เส้นตัวชี้วัด (SMA, RSI, MACD): ลดจุดด้วย LTTB จากข้อมูลรายวัน คงรูปทรงของเส้นไว้
+# จำนวนจุดที่ส่งจึงแทบไม่เพิ่มขึ้นตามความยาวของช่วงเวลา
+
+# จำนวนแท่งเทียนและจุดต่อเส้นสูงสุดที่ส่งให้กราฟ
+MAX_CANDLES = 300
+MAX_LINE_POINTS = 500
+
+# รวมแท่งจากละเอียดไปหยาบ เลือกระดับแรกที่จำนวนแท่งไม่เกิน MAX_CANDLES
+RESAMPLE_RULES = [('W-FRI', 'รายสัปดาห์'), ('ME', 'รายเดือน')]
+
+OHLC_AGG = {'Open': 'first', 'High': 'max', 'Low': 'min', 'Close': 'last', 'Volume': 'sum'}
+
+
+def _resampler(obj, rule):
+    try:
+        return obj.resample(rule)
+    except ValueError:
+        # pandas ก่อน 2.2 ใช้ 'M' แทน 'ME'
+        return obj.resample(rule.rstrip('E'))
+
+
+def resample_ohlc(df, rule):
+    """รวมแท่งรายวันเป็นแท่งตาม rule โดย index ของแต่ละแท่งคือวันซื้อขายวันสุดท้ายในช่วงนั้น
+
+    คอลัมน์ตัวชี้วัดใช้ค่าของวันสุดท้ายในช่วง (ตรงกับราคาปิดของแท่ง)
+    """
+    agg = {column: OHLC_AGG.get(column, 'last') for column in df.columns}
+    out = _resampler(df, rule).agg(agg)
+    last_dates = _resampler(df.index.to_series(), rule).last()
+    keep = last_dates.notna().to_numpy()
+    out = out[keep]
+    out.index = pd.DatetimeIndex(last_dates[keep], name=df.index.name)
+    return out
+
+
+def candle_bars(df, max_candles=MAX_CANDLES):
+    """แท่งเทียนที่จำนวนไม่เกิน max_candles คืน (DataFrame, ชื่อระดับ)"""
+    if df is None or len(df) <= max_candles:
+        return df, 'รายวัน'
+    out, label = df, 'รายวัน'
+    for rule, name in RESAMPLE_RULES:
+        out, label = resample_ohlc(df, rule), name
+        if len(out) <= max_candles:
+            break
+    return out, label
+
+
+def lttb(x, y, threshold):
+    """Largest-Triangle-Three-Buckets: ตำแหน่งของจุดที่ควรเก็บไว้ threshold จุด
+
+    x, y เป็น array ตัวเลขที่ไม่มี NaN (x เรียงจากน้อยไปมาก)
+    """
+    n = len(y)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    # ขอบของแต่ละ bucket (ไม่รวมจุดแรกและจุดสุดท้ายที่เก็บไว้เสมอ)
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+
+    # ค่าเฉลี่ยของ bucket ถัดไป คำนวณล่วงหน้าจากผลรวมสะสม
+    cx = np.concatenate([[0.0], np.cumsum(x)])
+    cy = np.concatenate([[0.0], np.cumsum(y)])
+
+    previous = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], max(edges[i + 1], edges[i] + 1)
+        if i + 2 < len(edges):
+            next_start, next_end = edges[i + 1], max(edges[i + 2], edges[i + 1] + 1)
+        else:
+            next_start, next_end = n - 1, n
+        count = next_end - next_start
+        avg_x = (cx[next_end] - cx[next_start]) / count
+        avg_y = (cy[next_end] - cy[next_start]) / count
+
+        # พื้นที่สามเหลี่ยมระหว่างจุดที่เลือกก่อนหน้า จุดใน bucket และค่าเฉลี่ย bucket ถัดไป
+        px, py = x[previous], y[previous]
+        area = np.abs(
+            (px - avg_x) * (y[start:end] - py) - (px - x[start:end]) * (avg_y - py)
+        )
+        previous = start + int(np.argmax(area))
+        selected[i + 1] = previous
+    return selected
+
+
+def downsample_line(series, max_points=MAX_LINE_POINTS):
+    """ลดจำนวนจุดของเส้นด้วย LTTB (ตัดช่วง NaN ตอนต้นออก) คืน (index, values)"""
+    values = series.to_numpy(dtype=np.float64)
+    valid = np.flatnonzero(~np.isnan(values))
+    if len(valid) == 0:
+        return series.index[:0], values[:0]
+    index = series.index[valid]
+    values = values[valid]
+    if len(values) <= max_points:
+        return index, values
+    keep = lttb(index.asi8 if isinstance(index, pd.DatetimeIndex) else np.arange(len(values)), values, max_points)
+    return index[keep], values[keep]
+
+
+def candle_colors(open_, close, up='green', down='red'):
+    """สีของแท่งปริมาณ: up ถ้าปิด >= เปิด"""
+    return np.where(np.asarray(close) >= np.asarray(open_), up, down)
+
+
+def sign_colors(values, up='green', down='red'):
+    """สีตามเครื่องหมาย: up ถ้า >= 0 (NaN ได้ down)"""
+    return np.where(np.asarray(values) >= 0, up, down)
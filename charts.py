@@ -0,0 +1,122 @@
+import threading
+from collections import OrderedDict
+
+import plotly.graph_objects as go
+from plotly.subplots import make_subplots
+
+from chart_data import candle_bars, candle_colors, downsample_line, sign_colors
+
+# กราฟราคา 3 แถว (แท่งเทียน+SMA+ปริมาณ / RSI / MACD) ใช้ร่วมกันทุกแท็บ
+# รูปที่สร้างแล้วเก็บใน FigureCache ตาม (symbol, period, version, รูปแบบ) แสดงซ้ำได้โดยไม่ต้องสร้างใหม่
+
+SMA_STYLES = {20: 'orange', 50: 'blue', 200: 'red'}
+
+
+def _line(df, column, name, color, width):
+    x, y = downsample_line(df[column])
+    return go.Scatter(x=x, y=y, name=name, line=dict(color=color, width=width))
+
+
+def build_price_figure(df, height=800, show_legend=True, sma_windows=(20, 50, 200), rsi_midline=True):
+    """สร้างกราฟราคา/RSI/MACD จาก DataFrame ที่คำนวณตัวชี้วัดแล้ว"""
+    # ช่วงยาวรวมแท่งเป็นรายสัปดาห์/รายเดือน และลดจุดของเส้นตัวชี้วัด
+    candles, candle_label = candle_bars(df)
+
+    fig = make_subplots(
+        rows=3, cols=1,
+        shared_xaxes=True,
+        vertical_spacing=0.08,
+        row_heights=[0.5, 0.25, 0.25],
+        subplot_titles=(f'กราฟราคาและปริมาณ ({candle_label})', 'RSI (14)', 'MACD')
+    )
+
+    # กราฟแท่งเทียน
+    fig.add_trace(
+        go.Candlestick(
+            x=candles.index,
+            open=candles['Open'],
+            high=candles['High'],
+            low=candles['Low'],
+            close=candles['Close'],
+            name='ราคา',
+            showlegend=False
+        ),
+        row=1, col=1
+    )
+
+    # เพิ่ม SMA
+    for window in sma_windows:
+        column = f'SMA_{window}'
+        if column in df.columns:
+            fig.add_trace(_line(df, column, f'SMA {window}', SMA_STYLES.get(window, 'gray'), 1), row=1, col=1)
+
+    # เพิ่มปริมาณการซื้อขาย
+    fig.add_trace(
+        go.Bar(
+            x=candles.index, y=candles['Volume'], name='ปริมาณ',
+            marker_color=candle_colors(candles['Open'], candles['Close']), opacity=0.3
+        ),
+        row=1, col=1
+    )
+
+    # RSI
+    if 'RSI_14' in df.columns:
+        fig.add_trace(_line(df, 'RSI_14', 'RSI 14', 'purple', 2), row=2, col=1)
+        fig.add_hline(y=70, line_dash="dash", line_color="red", opacity=0.5, row=2, col=1)
+        fig.add_hline(y=30, line_dash="dash", line_color="green", opacity=0.5, row=2, col=1)
+        if rsi_midline:
+            fig.add_hline(y=50, line_dash="dot", line_color="gray", opacity=0.3, row=2, col=1)
+
+    # MACD
+    if 'MACD' in df.columns and 'MACD_Signal' in df.columns:
+        fig.add_trace(_line(df, 'MACD', 'MACD', 'blue', 1.5), row=3, col=1)
+        fig.add_trace(_line(df, 'MACD_Signal', 'Signal', 'red', 1.5), row=3, col=1)
+
+        # histogram (ค่าของวันสุดท้ายในแต่ละแท่ง)
+        if 'MACD_Histogram' in candles.columns:
+            fig.add_trace(
+                go.Bar(
+                    x=candles.index, y=candles['MACD_Histogram'], name='Histogram',
+                    marker_color=sign_colors(candles['MACD_Histogram']), opacity=0.5
+                ),
+                row=3, col=1
+            )
+
+    layout = dict(height=height, xaxis_rangeslider_visible=False, showlegend=show_legend)
+    if show_legend:
+        layout['legend'] = dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1)
+    fig.update_layout(**layout)
+    fig.update_xaxes(title_text="วันที่", row=3, col=1)
+    return fig
+
+
+class FigureCache:
+    """เก็บกราฟที่สร้างแล้ว (LRU) key ควรมี symbol, period และ version ของข้อมูล"""
+
+    def __init__(self, max_entries=32):
+        self.max_entries = max_entries
+        self._figures = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, builder):
+        """กราฟของ key ถ้ามีแล้ว ไม่เช่นนั้นเรียก builder() สร้างแล้วเก็บไว้"""
+        with self._lock:
+            fig = self._figures.get(key)
+            if fig is not None:
+                self._figures.move_to_end(key)
+                self.hits += 1
+                return fig
+        fig = builder()
+        with self._lock:
+            self.misses += 1
+            self._figures[key] = fig
+            self._figures.move_to_end(key)
+            while len(self._figures) > self.max_entries:
+                self._figures.popitem(last=False)
+        return fig
+
+    def clear(self):
+        with self._lock:
+            self._figures.clear()
@@ -0,0 +1,47 @@
+import numpy as np
+import pandas as pd
+
+# รูปแบบ DataFrame ที่ประหยัดหน่วยความจำสำหรับเก็บในแคช
+# ราคา (OHLC) เก็บเป็น float32 ซึ่งละเอียดพอสำหรับราคาหุ้นไทย (ทศนิยมไม่เกิน 2-3 ตำแหน่ง)
+# ปริมาณเก็บเป็น int64 ให้ตรงทุกหุ้น และตัดคอลัมน์ Dividends/Stock Splits ที่ไม่ได้ใช้ทิ้ง
+# ตัวชี้วัดทุกคอลัมน์เก็บรวมใน block float32 ก้อนเดียว
+
+PRICE_COLUMNS = ['Open', 'High', 'Low', 'Close']
+VOLUME_COLUMN = 'Volume'
+DROP_COLUMNS = ['Dividends', 'Stock Splits', 'Capital Gains', 'Adj Close']
+
+
+def compact_prices(df):
+    """เหลือเฉพาะ OHLCV ในรูปแบบ float32/int64"""
+    if df is None:
+        return None
+    data = {column: df[column].to_numpy(dtype=np.float32) for column in PRICE_COLUMNS if column in df.columns}
+    if VOLUME_COLUMN in df.columns:
+        volume = df[VOLUME_COLUMN].to_numpy(dtype=np.float64)
+        data[VOLUME_COLUMN] = np.nan_to_num(volume).astype(np.int64)
+    return pd.DataFrame(data, index=df.index)
+
+
+def compact_frame(df):
+    """ราคาแบบ compact_prices และตัวชี้วัดทั้งหมดเป็น block float32 ก้อนเดียว"""
+    if df is None:
+        return None
+    prices = compact_prices(df)
+    columns = [
+        column for column in df.columns
+        if column not in prices.columns and column not in DROP_COLUMNS
+    ]
+    if not columns:
+        return prices
+    block = np.empty((len(df), len(columns)), dtype=np.float32)
+    for i, column in enumerate(columns):
+        block[:, i] = df[column].to_numpy(dtype=np.float32)
+    indicators = pd.DataFrame(block, index=df.index, columns=columns, copy=False)
+    return pd.concat([prices, indicators], axis=1, copy=False)
+
+
+def memory_usage(df):
+    """จำนวนไบต์ที่ DataFrame ใช้ (รวม index)"""
+    if df is None:
+        return 0
+    return int(df.memory_usage(index=True, deep=True).sum())
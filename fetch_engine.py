@@ -0,0 +1,50 @@
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+
+class ParallelFetcher:
+    def __init__(self, max_workers=8, timeout=20):
+        self.max_workers = max_workers
+        self.timeout = timeout
+
+    def fetch(self, symbols, func):
+        """เรียก func(symbol) พร้อมกันหลายตัว และส่ง (symbol, ผลลัพธ์) ออกมาทันทีที่แต่ละตัวเสร็จ
+
+        ตัวที่เกิด error หรือใช้เวลาเกิน timeout (นับจากเริ่มทำงานจริง) จะได้ผลลัพธ์เป็น None
+        """
+        symbols = list(symbols)
+        if not symbols:
+            return
+
+        started = {}
+
+        def run(symbol):
+            started[symbol] = time.monotonic()
+            return func(symbol)
+
+        executor = ThreadPoolExecutor(max_workers=min(self.max_workers, len(symbols)))
+        futures = {executor.submit(run, symbol): symbol for symbol in symbols}
+        pending = set(futures)
+
+        try:
+            while pending:
+                done, pending = wait(pending, timeout=0.25, return_when=FIRST_COMPLETED)
+
+                for future in done:
+                    try:
+                        result = future.result()
+                    except Exception:
+                        result = None
+                    yield futures[future], result
+
+                # ตัดตัวที่ค้างนานเกินไปทิ้ง ไม่ให้ทั้งการสแกนรอตัวเดียว
+                now = time.monotonic()
+                expired = {
+                    future for future in pending
+                    if futures[future] in started and now - started[futures[future]] > self.timeout
+                }
+                for future in expired:
+                    yield futures[future], None
+                pending -= expired
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
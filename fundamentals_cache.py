@@ -0,0 +1,141 @@
+import json
+import os
+import threading
+import time
+
+DAY = 24 * 60 * 60
+
+# อายุของข้อมูลแต่ละฟิลด์ (วินาที)
+FIELD_TTLS = {
+    # ข้อมูลบริษัท แทบไม่เปลี่ยน
+    'name': 30 * DAY,
+    'sector': 30 * DAY,
+    'industry': 30 * DAY,
+    'website': 30 * DAY,
+    # ตัวเลขจากงบการเงิน เปลี่ยนตามรอบงบ
+    'roe': 7 * DAY,
+    'roa': 7 * DAY,
+    'eps': 7 * DAY,
+    'profit_margin': 7 * DAY,
+    'debt_to_equity': 7 * DAY,
+    'current_ratio': 7 * DAY,
+    'payout_ratio': 7 * DAY,
+}
+
+# ฟิลด์ที่ขึ้นกับราคา (P/E, P/B, ปันผล, มูลค่าตลาด ฯลฯ) ใช้ได้หนึ่งวัน
+DEFAULT_TTL = DAY
+
+
+class FundamentalsCache:
+    def __init__(self, filename=os.path.join("cache", "fundamentals.json"), field_ttls=None, default_ttl=DEFAULT_TTL):
+        self.filename = filename
+        self.field_ttls = dict(FIELD_TTLS if field_ttls is None else field_ttls)
+        self.default_ttl = default_ttl
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.RLock()
+        self._mtime = None
+        self._data = {}
+        self._reload()
+
+    def _reload(self):
+        """โหลดไฟล์ใหม่ถ้ามี session อื่นเขียนทับไว้"""
+        try:
+            mtime = os.path.getmtime(self.filename)
+        except OSError:
+            return
+        if mtime == self._mtime:
+            return
+        try:
+            with open(self.filename, 'r', encoding='utf-8') as f:
+                self._data = json.load(f)
+            self._mtime = mtime
+        except (OSError, ValueError):
+            pass
+
+    def _save(self):
+        """บันทึกลงดิสก์แบบ atomic"""
+        directory = os.path.dirname(self.filename)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp = f"{self.filename}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump(self._data, f, ensure_ascii=False)
+            os.replace(tmp, self.filename)
+            self._mtime = os.path.getmtime(self.filename)
+        except OSError:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+
+    def ttl(self, field):
+        return self.field_ttls.get(field, self.default_ttl)
+
+    def _fresh_fields(self, record, fields, now):
+        fetched = record.get('fetched', {})
+        return all(
+            field in fetched and now - fetched[field] < self.ttl(field)
+            for field in fields
+        )
+
+    def get(self, symbol, loader, fields=None):
+        """ดึงข้อมูลพื้นฐานจากแคช ถ้าฟิลด์ที่ต้องการหมดอายุจะเรียก loader(symbol) ใหม่
+
+        fields คือรายชื่อฟิลด์ที่ต้องใช้จริง ถ้าไม่ระบุจะตรวจทุกฟิลด์ที่เคยเก็บไว้
+        """
+        now = time.time()
+        with self._lock:
+            self._reload()
+            record = self._data.get(symbol)
+            if record is not None:
+                check = fields if fields is not None else record['values'].keys()
+                if self._fresh_fields(record, check, now):
+                    self.hits += 1
+                    return dict(record['values'])
+
+            self.misses += 1
+
+        values = loader(symbol)
+        if values is None:
+            # ดึงไม่ได้ ใช้ข้อมูลเก่าถ้ามี
+            return dict(record['values']) if record is not None else None
+
+        self.put(symbol, values, now)
+        return dict(values)
+
+    def put(self, symbol, values, fetched_at=None):
+        """บันทึกข้อมูลพื้นฐานของหุ้น"""
+        if fetched_at is None:
+            fetched_at = time.time()
+        with self._lock:
+            self._reload()
+            self._data[symbol] = {
+                'values': dict(values),
+                'fetched': {field: fetched_at for field in values},
+            }
+            self._save()
+
+    def refresh(self, symbol, loader):
+        """บังคับดึงข้อมูลของหุ้นตัวเดียวใหม่"""
+        self.invalidate(symbol)
+        return self.get(symbol, loader)
+
+    def invalidate(self, symbol=None):
+        """ล้างแคชของหุ้นตัวเดียว หรือทั้งหมด"""
+        with self._lock:
+            self._reload()
+            if symbol is None:
+                self._data = {}
+            else:
+                self._data.pop(symbol, None)
+            self._save()
+
+    def stats(self):
+        """สถิติการใช้แคช"""
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': (self.hits / total * 100) if total > 0 else 0,
+            'symbols': len(self._data),
+        }
@@ -0,0 +1,493 @@
+import math
+from collections import deque
+
+import numpy as np
+
+NAN = float('nan')
+
+# ค่าว่างใน undo (แยกจาก NaN ที่เป็นค่าจริงในหน้าต่างได้)
+_NOTHING = object()
+
+
+def _isnan(value):
+    return value is None or value != value
+
+
+class _RollingSum:
+    """ผลรวมในหน้าต่างเลื่อน คำนวณใหม่ทั้งหน้าต่างเป็นระยะเพื่อกันความคลาดเคลื่อนสะสม"""
+
+    def __init__(self, window):
+        self.window = window
+        self.values = deque()
+        self.total = 0.0
+        self.total_sq = 0.0
+        self.nan_count = 0
+        self._since_resum = 0
+        self._undo = None
+
+    def update(self, value):
+        undo = (self.total, self.total_sq, self.nan_count, self._since_resum)
+        dropped = _NOTHING
+        self.values.append(value)
+        if _isnan(value):
+            self.nan_count += 1
+        else:
+            self.total += value
+            self.total_sq += value * value
+
+        if len(self.values) > self.window:
+            old = dropped = self.values.popleft()
+            if _isnan(old):
+                self.nan_count -= 1
+            else:
+                self.total -= old
+                self.total_sq -= old * old
+
+        self._since_resum += 1
+        if self._since_resum >= self.window:
+            valid = [v for v in self.values if not _isnan(v)]
+            self.total = math.fsum(valid)
+            self.total_sq = math.fsum(v * v for v in valid)
+            self._since_resum = 0
+        self._undo = undo + (dropped,)
+
+    def revert(self):
+        """ย้อนการ update ครั้งล่าสุด"""
+        self.total, self.total_sq, self.nan_count, self._since_resum, dropped = self._undo
+        self.values.pop()
+        if dropped is not _NOTHING:
+            self.values.appendleft(dropped)
+
+    @property
+    def full(self):
+        return len(self.values) == self.window and self.nan_count == 0
+
+    def mean(self):
+        return self.total / self.window if self.full else NAN
+
+    def std(self):
+        """ส่วนเบี่ยงเบนมาตรฐานแบบ ddof=0 (แบบเดียวกับ ta Bollinger Bands)"""
+        if not self.full:
+            return NAN
+        mean = self.total / self.window
+        return math.sqrt(max(self.total_sq / self.window - mean * mean, 0.0))
+
+    def sample_std(self):
+        """ส่วนเบี่ยงเบนมาตรฐานแบบ ddof=1 (แบบเดียวกับ pandas rolling std)"""
+        if not self.full or self.window < 2:
+            return NAN
+        mean = self.total / self.window
+        variance = (self.total_sq - self.window * mean * mean) / (self.window - 1)
+        return math.sqrt(max(variance, 0.0))
+
+
+class _RollingExtreme:
+    """ค่าสูงสุด/ต่ำสุดในหน้าต่างเลื่อนด้วย monotonic deque (amortized O(1))"""
+
+    def __init__(self, window, highest=True):
+        self.window = window
+        self.highest = highest
+        self.items = deque()
+        self.count = 0
+        self._undo = None
+
+    def update(self, value):
+        index = self.count
+        self.count += 1
+        expired = []
+        dominated = []
+        while self.items and self.items[0][0] <= index - self.window:
+            expired.append(self.items.popleft())
+        if self.highest:
+            while self.items and self.items[-1][1] <= value:
+                dominated.append(self.items.pop())
+        else:
+            while self.items and self.items[-1][1] >= value:
+                dominated.append(self.items.pop())
+        self.items.append((index, value))
+        self._undo = (expired, dominated)
+        return self.items[0][1] if self.count >= self.window else NAN
+
+    def revert(self):
+        """ย้อนการ update ครั้งล่าสุด (ใส่รายการที่ถูกเอาออกกลับที่เดิม)"""
+        expired, dominated = self._undo
+        self.count -= 1
+        self.items.pop()
+        self.items.extend(reversed(dominated))
+        self.items.extendleft(reversed(expired))
+
+
+class _EWM:
+    """ค่าเฉลี่ยแบบ exponential (adjust=False) เริ่มจากค่าแรกที่ไม่ใช่ NaN"""
+
+    def __init__(self, alpha, min_periods):
+        self.alpha = alpha
+        self.min_periods = min_periods
+        self.state = NAN
+        self.count = 0
+        self._undo = None
+
+    def update(self, value):
+        self._undo = (self.state, self.count)
+        if not _isnan(value):
+            if _isnan(self.state):
+                self.state = value
+            else:
+                self.state = (1 - self.alpha) * self.state + self.alpha * value
+            self.count += 1
+        return self.state if self.count >= self.min_periods else NAN
+
+    def revert(self):
+        self.state, self.count = self._undo
+
+
+class _EMA(_EWM):
+    def __init__(self, window):
+        super().__init__(2.0 / (window + 1), window)
+
+
+class _RSI:
+    """RSI แบบ Wilder เก็บค่าเฉลี่ยขึ้น/ลงไว้"""
+
+    def __init__(self, window):
+        self.up = _EWM(1.0 / window, window)
+        self.down = _EWM(1.0 / window, window)
+        self.prev_close = NAN
+        self._undo = None
+
+    def update(self, close):
+        self._undo = self.prev_close
+        diff = close - self.prev_close
+        self.prev_close = close
+        # แท่งแรก diff เป็น NaN ให้นับเป็น 0 แบบเดียวกับ ta
+        emaup = self.up.update(diff if diff > 0 else 0.0)
+        emadn = self.down.update(-diff if diff < 0 else 0.0)
+        if emadn == 0:
+            return 100.0
+        if _isnan(emadn):
+            return NAN
+        return 100 - 100 / (1 + emaup / emadn)
+
+    def revert(self):
+        self.up.revert()
+        self.down.revert()
+        self.prev_close = self._undo
+
+
+class _ATR:
+    """ATR แบบ Wilder (แท่งแรกๆ ก่อนครบ window เป็น 0 แบบเดียวกับ ta)"""
+
+    def __init__(self, window):
+        self.window = window
+        self.prev_close = NAN
+        self.count = 0
+        self.total = 0.0
+        self.state = 0.0
+        self._undo = None
+
+    def update(self, high, low, close):
+        self._undo = (self.prev_close, self.count, self.total, self.state)
+        candidates = [high - low, abs(high - self.prev_close), abs(low - self.prev_close)]
+        true_range = max(v for v in candidates if not _isnan(v))
+        self.prev_close = close
+        self.count += 1
+
+        if self.count < self.window:
+            self.total += true_range
+            self.state = 0.0
+        elif self.count == self.window:
+            self.total += true_range
+            self.state = self.total / self.window
+        else:
+            self.state = (self.state * (self.window - 1) + true_range) / self.window
+        return self.state
+
+    def revert(self):
+        self.prev_close, self.count, self.total, self.state = self._undo
+
+
+class _ADX:
+    """ADX, +DI และ -DI แบบ Wilder (ให้ค่าเดียวกับ ta ซึ่งต้องมีข้อมูลอย่างน้อย 2 เท่าของ window)"""
+
+    def __init__(self, window):
+        self.window = window
+        self.bars = 0
+        self.prev = None
+        # ผลรวมแบบ Wilder ของ TR, +DM, -DM (เริ่มจากผลรวมของแท่งที่ 1..window)
+        self.sums = [0.0, 0.0, 0.0]
+        self.dx_total = 0.0
+        self.adx = NAN
+        self.di = (NAN, NAN)
+        self._undo = None
+
+    def update(self, high, low, close):
+        self._undo = (self.bars, self.prev, self.sums, self.dx_total, self.adx, self.di)
+        index = self.bars
+        self.bars += 1
+        w = self.window
+        if self.prev is not None:
+            prev_high, prev_low, prev_close = self.prev
+            movement = max(high, prev_close) - min(low, prev_close)
+            up = high - prev_high
+            down = prev_low - low
+            pos = up if (up > down and up > 0) else 0.0
+            neg = down if (down > up and down > 0) else 0.0
+            values = (movement, pos, neg)
+            if index <= w:
+                self.sums = [total + value for total, value in zip(self.sums, values)]
+            else:
+                self.sums = [total - total / w + value for total, value in zip(self.sums, values)]
+
+            if index >= w:
+                trs, dip, din = self.sums
+                dip_pct = 100 * dip / trs if trs != 0 else 0.0
+                din_pct = 100 * din / trs if trs != 0 else 0.0
+                total = dip_pct + din_pct
+                dx = 100 * abs((dip_pct - din_pct) / total) if total != 0 else 0.0
+                # ta ให้ DI ของแท่งแรกที่คำนวณได้เป็น 0
+                self.di = (dip_pct, din_pct) if index > w else (0.0, 0.0)
+                if index < 2 * w - 1:
+                    self.dx_total += dx
+                elif index == 2 * w - 1:
+                    self.adx = (self.dx_total + dx) / w
+                else:
+                    self.adx = self.adx + (dx - self.adx) / w
+        self.prev = (high, low, close)
+        if self.bars < 2 * w:
+            return NAN, NAN, NAN
+        return self.adx, self.di[0], self.di[1]
+
+    def revert(self):
+        self.bars, self.prev, self.sums, self.dx_total, self.adx, self.di = self._undo
+
+
+class _CCI:
+    """Commodity Channel Index จากหน้าต่างของราคาเฉลี่ย (สูง+ต่ำ+ปิด)/3"""
+
+    def __init__(self, window, constant=0.015):
+        self.window = window
+        self.constant = constant
+        self.typical = deque(maxlen=window)
+        self._undo = None
+
+    def update(self, high, low, close):
+        typical = (high + low + close) / 3.0
+        self._undo = self.typical[0] if len(self.typical) == self.window else _NOTHING
+        self.typical.append(typical)
+        if len(self.typical) < self.window:
+            return NAN
+        values = np.fromiter(self.typical, dtype=np.float64, count=self.window)
+        mean = values.mean()
+        mad = np.abs(values - mean).mean()
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return float(np.float64(typical - mean) / (self.constant * mad))
+
+    def revert(self):
+        self.typical.pop()
+        if self._undo is not _NOTHING:
+            self.typical.appendleft(self._undo)
+
+
+class _MFI:
+    """Money Flow Index จากผลรวมของ money flow ขาขึ้น/ขาลงในหน้าต่าง"""
+
+    def __init__(self, window):
+        self.positive = _RollingSum(window)
+        self.negative = _RollingSum(window)
+        self.prev_typical = NAN
+        self._undo = None
+
+    def update(self, high, low, close, volume):
+        typical = (high + low + close) / 3.0
+        prev = self._undo = self.prev_typical
+        self.prev_typical = typical
+        direction = 1.0 if typical > prev else -1.0 if typical < prev else 0.0
+        flow = typical * volume * direction
+        self.positive.update(flow if flow >= 0 else 0.0)
+        self.negative.update(flow if flow < 0 else 0.0)
+        if not self.positive.full:
+            return NAN
+        positive = self.positive.total
+        negative = abs(self.negative.total)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return float(100 - 100 / (1 + np.float64(positive) / negative))
+
+    def revert(self):
+        self.positive.revert()
+        self.negative.revert()
+        self.prev_typical = self._undo
+
+
+def _pct(value, base):
+    if _isnan(value) or _isnan(base):
+        return NAN
+    if base == 0:
+        return NAN if value == 0 else math.copysign(math.inf, value)
+    return value / base - 1
+
+
+class IncrementalIndicators:
+    """ตัวชี้วัดแบบเก็บสถานะ เพิ่มแท่งใหม่ได้ใน O(1) ต่อตัวชี้วัด
+
+    ค่าของแต่ละแท่งเท่ากับแถวสุดท้ายของ compute_indicators บนข้อมูลถึงแท่งนั้น
+    (CCI คำนวณจากหน้าต่าง 20 แท่งล่าสุด) ยกเว้น ADX/DI_Pos/DI_Neg ช่วง 2*14-1 แท่งแรกเป็น NaN
+    ส่วน compute_indicators บนข้อมูลที่ยาวกว่านั้นจะเติม 0 (และ DI ช่วงแรก) ย้อนหลังให้แท่งเหล่านั้น
+    แท่งปัจจุบันที่ยังไม่ปิด (ราคาระหว่างวัน) แก้ไขได้ด้วย update_last โดยไม่ต้องสร้างใหม่
+    """
+
+    RSI_WINDOWS = [7, 14, 21]
+    SMA_WINDOWS = [5, 10, 20, 50, 100, 200]
+    EMA_WINDOWS = [5, 10, 20, 50]
+    CHANGE_PERIODS = [1, 5, 10, 20]
+
+    def __init__(self):
+        self.rsi = {w: _RSI(w) for w in self.RSI_WINDOWS}
+        self.sma = {w: _RollingSum(w) for w in self.SMA_WINDOWS}
+        self.ema = {w: _EMA(w) for w in self.EMA_WINDOWS}
+        self.macd_fast = _EMA(12)
+        self.macd_slow = _EMA(26)
+        self.macd_signal = _EMA(9)
+        self.volume_20 = _RollingSum(20)
+        self.volume_5 = _RollingSum(5)
+        self.resistance = {w: _RollingExtreme(w, highest=True) for w in (20, 50)}
+        self.support = {w: _RollingExtreme(w, highest=False) for w in (20, 50)}
+        self.returns_5 = _RollingSum(5)
+        self.returns_20 = _RollingSum(20)
+        self.atr = _ATR(14)
+        self.stoch_high = _RollingExtreme(14, highest=True)
+        self.stoch_low = _RollingExtreme(14, highest=False)
+        self.stoch_d = _RollingSum(3)
+        self.adx = _ADX(14)
+        self.cci = _CCI(20)
+        self.mfi = _MFI(14)
+        self.obv = None
+        self.closes = deque(maxlen=max(self.CHANGE_PERIODS) + 1)
+        self.prev_volume = NAN
+        self.bars = 0
+        self.latest = {}
+        # ตัวชี้วัดย่อยทุกตัวเก็บ undo ของแท่งล่าสุดไว้เอง update_last สั่ง revert ทีละตัว
+        self._parts = [
+            *self.rsi.values(), *self.sma.values(), *self.ema.values(),
+            self.macd_fast, self.macd_slow, self.macd_signal, self.volume_20, self.volume_5,
+            *self.resistance.values(), *self.support.values(), self.returns_5, self.returns_20,
+            self.atr, self.stoch_high, self.stoch_low, self.stoch_d, self.adx, self.cci, self.mfi,
+        ]
+        self._undo = None
+
+    @classmethod
+    def from_history(cls, df):
+        """สร้างสถานะจากข้อมูลย้อนหลัง (DataFrame ที่มี High/Low/Close/Volume)"""
+        engine = cls()
+        for high, low, close, volume in zip(df['High'], df['Low'], df['Close'], df['Volume']):
+            engine.update(high, low, close, volume)
+        return engine
+
+    def _lag(self, periods):
+        if len(self.closes) > periods:
+            return self.closes[-1 - periods]
+        return NAN
+
+    def update(self, high, low, close, volume):
+        """เพิ่มแท่งใหม่หนึ่งแท่ง คืน dict ค่าตัวชี้วัดของแท่งนั้น"""
+        high, low, close, volume = float(high), float(low), float(close), float(volume)
+        dropped = self.closes[0] if len(self.closes) == self.closes.maxlen else _NOTHING
+        self._undo = (dropped, self.prev_volume, self.obv, self.latest)
+        prev_close = self.closes[-1] if self.closes else NAN
+        self.closes.append(close)
+        self.bars += 1
+        row = {}
+
+        for w, rsi in self.rsi.items():
+            row[f'RSI_{w}'] = rsi.update(close)
+
+        for w, window in self.sma.items():
+            window.update(close)
+            row[f'SMA_{w}'] = window.mean()
+        for w, ema in self.ema.items():
+            row[f'EMA_{w}'] = ema.update(close)
+
+        fast = self.macd_fast.update(close)
+        slow = self.macd_slow.update(close)
+        macd = fast - slow
+        row['MACD'] = macd
+        row['MACD_Signal'] = self.macd_signal.update(macd)
+        row['MACD_Histogram'] = macd - row['MACD_Signal']
+
+        # Bollinger Bands ใช้หน้าต่าง 20 วันเดียวกับ SMA_20
+        middle = row['SMA_20']
+        band = 2 * self.sma[20].std()
+        row['BB_Upper'] = middle + band
+        row['BB_Middle'] = middle
+        row['BB_Lower'] = middle - band
+        width = row['BB_Upper'] - row['BB_Lower']
+        row['BB_Width'] = width / middle if middle else NAN
+        row['BB_Position'] = (close - row['BB_Lower']) / width if width else NAN
+
+        self.volume_20.update(volume)
+        self.volume_5.update(volume)
+        row['Volume_SMA'] = self.volume_20.mean()
+        row['Volume_Ratio'] = volume / row['Volume_SMA'] if row['Volume_SMA'] else NAN
+        row['Volume_5_SMA'] = self.volume_5.mean()
+        row['Volume_5_Ratio'] = volume / row['Volume_5_SMA'] if row['Volume_5_SMA'] else NAN
+
+        for w in (20, 50):
+            row[f'Resistance_{w}'] = self.resistance[w].update(high)
+            row[f'Support_{w}'] = self.support[w].update(low)
+
+        for periods in self.CHANGE_PERIODS:
+            row[f'Price_Change_{periods}d'] = _pct(close, self._lag(periods)) * 100
+
+        row['Volume_Change'] = _pct(volume, self.prev_volume) * 100
+        self.prev_volume = volume
+
+        daily_return = _pct(close, prev_close)
+        self.returns_5.update(daily_return)
+        self.returns_20.update(daily_return)
+        row['Volatility_5'] = self.returns_5.sample_std() * np.sqrt(252)
+        row['Volatility_20'] = self.returns_20.sample_std() * np.sqrt(252)
+
+        row['ATR'] = self.atr.update(high, low, close)
+        row['ATR_Pct'] = row['ATR'] / close * 100
+
+        row['ADX'], row['DI_Pos'], row['DI_Neg'] = self.adx.update(high, low, close)
+
+        highest = self.stoch_high.update(high)
+        lowest = self.stoch_low.update(low)
+        stoch_k = 100 * (close - lowest) / (highest - lowest) if highest != lowest else NAN
+        self.stoch_d.update(stoch_k)
+        row['Stoch_K'] = stoch_k
+        row['Stoch_D'] = self.stoch_d.mean()
+
+        row['CCI'] = self.cci.update(high, low, close)
+        row['MFI'] = self.mfi.update(high, low, close, volume)
+
+        prev_obv = self.obv
+        signed = -volume if close < prev_close else volume
+        self.obv = signed if prev_obv is None else prev_obv + signed
+        row['OBV'] = self.obv
+        row['OBV_Change'] = _pct(self.obv, prev_obv if prev_obv is not None else NAN) * 100
+
+        for periods in (5, 10):
+            base = self._lag(periods)
+            row[f'Momentum_{periods}'] = close - base
+            row[f'Momentum_{periods}_Pct'] = (close - base) / base * 100 if base else NAN
+
+        for periods in (5, 10, 20):
+            row[f'ROC_{periods}'] = _pct(close, self._lag(periods)) * 100
+
+        self.latest = row
+        return row
+
+    def update_last(self, high, low, close, volume):
+        """แทนที่แท่งล่าสุด (เช่นแท่งของวันนี้ที่ราคายังเปลี่ยน) ด้วยค่าใหม่ คืน dict ค่าตัวชี้วัด"""
+        if self._undo is None:
+            return self.update(high, low, close, volume)
+        # ย้อนเฉพาะแท่งล่าสุด (undo ของแต่ละตัวมีขนาดคงที่ ไม่ต้องสำเนาสถานะทั้งหมด)
+        for part in self._parts:
+            part.revert()
+        dropped, self.prev_volume, self.obv, self.latest = self._undo
+        self.closes.pop()
+        if dropped is not _NOTHING:
+            self.closes.appendleft(dropped)
+        self.bars -= 1
+        return self.update(high, low, close, volume)
@@ -0,0 +1,299 @@
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# ฟังก์ชันคำนวณตัวชี้วัดด้วย NumPy ล้วน ใช้ได้กับ array 1 มิติ (หุ้นตัวเดียว)
+# หรือ 2 มิติ (หุ้น x วันที่) โดยแกนเวลาคือแกนสุดท้าย
+# ค่า NaN ช่วงต้นของแต่ละแถว (หุ้นที่เข้าตลาดทีหลัง) ถูกข้ามเหมือนกับคำนวณหุ้นตัวนั้นแยก
+# ฟังก์ชันแบบ family คำนวณหลายหน้าต่างพร้อมกันและคืน dict {หน้าต่าง: array}
+
+
+def shift(x, periods):
+    """เลื่อนข้อมูลไปข้างหน้าตามแกนเวลา"""
+    out = np.full(x.shape, np.nan)
+    if 0 < periods < x.shape[-1]:
+        out[..., periods:] = x[..., :-periods]
+    return out
+
+
+def pct_change(x, periods):
+    """อัตราเปลี่ยนแปลง (เป็นสัดส่วน) เทียบกับ periods แท่งก่อน"""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return x / shift(x, periods) - 1
+
+
+def pct_change_family(x, periods_list):
+    return {periods: pct_change(x, periods) for periods in periods_list}
+
+
+def _prefix_sums(x):
+    valid = ~np.isnan(x)
+    pad = np.zeros(x.shape[:-1] + (1,))
+    csum = np.concatenate([pad, np.cumsum(np.where(valid, x, 0.0), axis=-1)], axis=-1)
+    ccount = np.concatenate([pad, np.cumsum(valid, axis=-1)], axis=-1)
+    return csum, ccount
+
+
+def _window_from_prefix(csum, ccount, window, shape, mean):
+    out = np.full(shape, np.nan)
+    if window <= shape[-1]:
+        total = csum[..., window:] - csum[..., :-window]
+        count = ccount[..., window:] - ccount[..., :-window]
+        values = total / window if mean else total
+        out[..., window - 1:] = np.where(count == window, values, np.nan)
+    return out
+
+
+def rolling_sum(x, window):
+    """ผลรวมในหน้าต่างเลื่อน ต้องมีข้อมูลครบ window ค่า"""
+    csum, ccount = _prefix_sums(x)
+    return _window_from_prefix(csum, ccount, window, x.shape, mean=False)
+
+
+def sma_family(x, windows):
+    """ค่าเฉลี่ยเคลื่อนที่หลายหน้าต่างจากผลรวมสะสมชุดเดียว"""
+    csum, ccount = _prefix_sums(x)
+    return {window: _window_from_prefix(csum, ccount, window, x.shape, mean=True) for window in windows}
+
+
+def sma(x, window):
+    return sma_family(x, [window])[window]
+
+
+def _sliding(x, window, func):
+    out = np.full(x.shape, np.nan)
+    if window <= x.shape[-1]:
+        out[..., window - 1:] = func(sliding_window_view(x, window, axis=-1))
+    return out
+
+
+def rolling_max_family(x, windows):
+    return {window: _sliding(x, window, lambda v: v.max(axis=-1)) for window in windows}
+
+
+def rolling_min_family(x, windows):
+    return {window: _sliding(x, window, lambda v: v.min(axis=-1)) for window in windows}
+
+
+def rolling_std(x, window, ddof=0):
+    return _sliding(x, window, lambda v: v.std(axis=-1, ddof=ddof))
+
+
+_EWM_BLOCK = 64
+
+
+def _seed_fill(x):
+    """เติม NaN ช่วงกลางด้วยค่าก่อนหน้า และช่วงต้นด้วยค่าแรกที่มี คืน (ค่าที่เติมแล้ว, จำนวนค่าจริงสะสม)
+
+    EWM ที่เริ่มจากค่าคงที่เท่ากับค่าแรกให้ผลเท่ากับเริ่มนับที่ค่าแรก จึงไม่ต้องแยกกรณีตามหุ้น
+    """
+    valid = ~np.isnan(x)
+    count = np.cumsum(valid, axis=-1)
+    index = np.where(valid, np.arange(x.shape[-1]), 0)
+    np.maximum.accumulate(index, axis=-1, out=index)
+    filled = np.take_along_axis(x, index, axis=-1)
+    first = np.take_along_axis(x, np.argmax(valid, axis=-1)[..., None], axis=-1)
+    return np.where(count == 0, first, filled), count
+
+
+def ewm_family(x, alphas, min_periods):
+    """ค่าเฉลี่ยแบบ exponential (adjust=False) หลายค่า alpha พร้อมกัน
+
+    คำนวณทีละช่วง _EWM_BLOCK แท่งด้วยการคูณเมทริกซ์น้ำหนัก (น้ำหนักไม่เกิน 1 จึงไม่ล้นค่า)
+    x อาจมีแกนนำหน้าเพิ่ม (เช่น up/down ของ RSI) ผลลัพธ์มีแกนแรกตามจำนวน alpha
+    """
+    alphas = np.asarray(alphas, dtype=float).reshape(-1, 1, 1)
+    min_periods = np.asarray(min_periods, dtype=float).reshape((-1,) + (1,) * x.ndim)
+    decay = 1 - alphas
+    filled, count = _seed_fill(x)
+
+    steps = np.arange(_EWM_BLOCK)
+    lag = steps[:, None] - steps[None, :]
+    # weights[k, j, i] = น้ำหนักของค่าที่ตำแหน่ง j ต่อผลลัพธ์ที่ตำแหน่ง i ในช่วงเดียวกัน
+    weights = np.where(lag.T >= 0, alphas * decay ** np.maximum(lag.T, 0), 0.0)
+    carry = decay[:, 0] ** (steps + 1)
+
+    rows = filled.reshape(-1, x.shape[-1])
+    out = np.empty((len(alphas),) + rows.shape)
+    state = np.broadcast_to(rows[:, 0], out.shape[:-1])
+    for start in range(0, rows.shape[-1], _EWM_BLOCK):
+        block = rows[:, start:start + _EWM_BLOCK]
+        size = block.shape[-1]
+        values = block @ weights[:, :size, :size] + state[..., None] * carry[:, None, :size]
+        out[..., start:start + size] = values
+        state = values[..., -1]
+    out = out.reshape((len(alphas),) + x.shape)
+    return np.where(count >= min_periods, out, np.nan)
+
+
+def ema_family(x, windows):
+    """EMA หลายหน้าต่างพร้อมกัน (ให้ผลเหมือน ta.trend.ema_indicator)"""
+    windows = list(windows)
+    alphas = [2.0 / (window + 1) for window in windows]
+    values = ewm_family(x, alphas, windows)
+    return {window: values[i] for i, window in enumerate(windows)}
+
+
+def ema(x, window):
+    return ema_family(x, [window])[window]
+
+
+def rsi_family(close, windows):
+    """RSI แบบ Wilder หลายหน้าต่างจาก diff ชุดเดียว (ให้ผลเหมือน ta.momentum.RSIIndicator)"""
+    windows = list(windows)
+    diff = close - shift(close, 1)
+    started = ~np.isnan(close)
+    # แท่งแรกของแต่ละหุ้นนับ diff เป็น 0 แบบเดียวกับ ta
+    up = np.where(started, np.where(diff > 0, diff, 0.0), np.nan)
+    down = np.where(started, np.where(diff < 0, -diff, 0.0), np.nan)
+
+    alphas = [1.0 / window for window in windows]
+    moves = np.stack([up, down])
+    averages = ewm_family(moves, alphas, windows)
+
+    result = {}
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for i, window in enumerate(windows):
+            emaup, emadn = averages[i, 0], averages[i, 1]
+            result[window] = np.where(emadn == 0, 100.0, 100 - 100 / (1 + emaup / emadn))
+    return result
+
+
+def macd(close, fast=12, slow=26, signal=9):
+    """MACD, Signal และ Histogram"""
+    emas = ema_family(close, [fast, slow])
+    line = emas[fast] - emas[slow]
+    signal_line = ema(line, signal)
+    return line, signal_line, line - signal_line
+
+
+def bollinger(close, window=20, window_dev=2):
+    """Bollinger Bands (ส่วนเบี่ยงเบนมาตรฐานแบบ ddof=0 แบบเดียวกับ ta)"""
+    middle = sma(close, window)
+    std = rolling_std(close, window, ddof=0)
+    return middle + window_dev * std, middle, middle - window_dev * std
+
+
+def true_range(high, low, close):
+    prev_close = shift(close, 1)
+    return np.fmax(np.fmax(high - low, np.abs(high - prev_close)), np.abs(low - prev_close))
+
+
+def atr(high, low, close, window=14):
+    """ATR แบบ Wilder (ค่าก่อนครบ window เป็น 0 แบบเดียวกับ ta)"""
+    tr = true_range(high, low, close)
+    count = np.cumsum(~np.isnan(tr), axis=-1)
+
+    # ค่าเริ่มต้นคือค่าเฉลี่ยของ TR window ค่าแรก จากนั้นเป็น EWM alpha = 1/window
+    seed = np.where(count == window, sma(tr, window), tr)
+    seed = np.where(count < window, np.nan, seed)
+    smoothed = ewm_family(seed, [1.0 / window], [1])[0]
+    return np.where(count == 0, np.nan, np.where(count < window, 0.0, smoothed))
+
+
+def stochastic(high, low, close, window=14, smooth_window=3):
+    """Stochastic %K และ %D"""
+    lowest = rolling_min_family(low, [window])[window]
+    highest = rolling_max_family(high, [window])[window]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        k = 100 * (close - lowest) / (highest - lowest)
+    return k, sma(k, smooth_window)
+
+
+def obv(close, volume):
+    """On-Balance Volume"""
+    signed = np.where(close < shift(close, 1), -volume, volume)
+    total = np.cumsum(np.where(np.isnan(signed), 0.0, signed), axis=-1)
+    return np.where(np.isnan(signed), np.nan, total)
+
+
+def cci(high, low, close, window=20, constant=0.015):
+    """Commodity Channel Index"""
+    typical = (high + low + close) / 3.0
+    mean = sma(typical, window)
+    mad = _sliding(
+        typical, window,
+        lambda v: np.abs(v - v.mean(axis=-1, keepdims=True)).mean(axis=-1)
+    )
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return (typical - mean) / (constant * mad)
+
+
+def mfi(high, low, close, volume, window=14):
+    """Money Flow Index"""
+    typical = (high + low + close) / 3.0
+    prev = shift(typical, 1)
+    direction = np.where(typical > prev, 1.0, np.where(typical < prev, -1.0, 0.0))
+    flow = typical * volume * direction
+    positive = rolling_sum(np.where(flow >= 0, flow, np.where(np.isnan(flow), np.nan, 0.0)), window)
+    negative = np.abs(rolling_sum(np.where(flow < 0, flow, np.where(np.isnan(flow), np.nan, 0.0)), window))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return 100 - 100 / (1 + positive / negative)
+
+
+def _adx_1d(high, low, close, window):
+    """ADX ของหุ้นตัวเดียว (ไม่มี NaN) เลียนแบบ ta.trend.ADXIndicator ทุกขั้นตอน"""
+    n = len(close)
+    adx_out = np.zeros(n)
+    pos_out = np.zeros(n)
+    neg_out = np.zeros(n)
+    if n < 2 * window:
+        # ta ต้องมีข้อมูลอย่างน้อย 2 เท่าของ window ถ้าน้อยกว่านั้นถือว่าคำนวณไม่ได้
+        nan = np.full(n, np.nan)
+        return nan, nan, nan
+
+    prev_close = shift(close, 1)
+    movement = np.maximum(high, prev_close) - np.minimum(low, prev_close)
+    diff_up = high - shift(high, 1)
+    diff_down = shift(low, 1) - low
+    with np.errstate(invalid='ignore'):
+        pos = np.abs(((diff_up > diff_down) & (diff_up > 0)) * diff_up)
+        neg = np.abs(((diff_down > diff_up) & (diff_down > 0)) * diff_down)
+
+    # ผลรวมแบบ Wilder: s[i] = s[i-1] - s[i-1]/window + x คือ window * EWM(alpha=1/window)
+    # ตำแหน่งสุดท้ายของ ta ไม่ได้คำนวณและเป็น 0
+    size = n - (window - 1)
+    series = np.stack([movement, pos, neg])
+    seeds = series[:, 1:window + 1].sum(axis=1) / window
+    steps = np.concatenate([seeds[:, None], series[:, window + 1:window + size - 1]], axis=1)
+    smoothed = np.zeros((3, size))
+    smoothed[:, :size - 1] = window * ewm_family(steps, [1.0 / window], [1])[0]
+    trs, dip, din = smoothed
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        dip_pct = np.where(trs != 0, 100 * dip / trs, 0.0)
+        din_pct = np.where(trs != 0, 100 * din / trs, 0.0)
+        total = dip_pct + din_pct
+        dx = np.where(total != 0, 100 * np.abs((dip_pct - din_pct) / total), 0.0)
+
+    adx_values = np.zeros(size)
+    steps = np.concatenate([[dx[0:window].mean()], dx[window:size - 1]])
+    adx_values[window:] = ewm_family(steps, [1.0 / window], [1])[0]
+    adx_out[window - 1:] = adx_values
+
+    # +DI/-DI ของ ta เลื่อนไปหนึ่งแท่งและไม่มีค่าที่ตำแหน่งแรก
+    index = np.arange(1, size - 1)
+    pos_out[index + window] = dip_pct[index]
+    neg_out[index + window] = din_pct[index]
+    return adx_out, pos_out, neg_out
+
+
+def adx(high, low, close, window=14):
+    """ADX, +DI และ -DI (ให้ผลเหมือน ta.trend.ADXIndicator)"""
+    if close.ndim == 1:
+        rows = [(high, low, close)]
+    else:
+        rows = list(zip(high, low, close))
+
+    outputs = [np.full(close.shape, np.nan) for _ in range(3)]
+    for r, (h, l, c) in enumerate(rows):
+        valid = np.flatnonzero(~np.isnan(c))
+        if len(valid) == 0:
+            continue
+        start, end = valid[0], valid[-1] + 1
+        values = _adx_1d(h[start:end], l[start:end], c[start:end], window)
+        for output, value in zip(outputs, values):
+            if close.ndim == 1:
+                output[start:end] = value
+            else:
+                output[r, start:end] = value
+    return tuple(outputs)
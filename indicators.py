@@ -0,0 +1,287 @@
+import numpy as np
+
+import indicator_kernels as kernels
+
+# ทะเบียนตัวชี้วัด: แต่ละรายการบอกคอลัมน์ที่สร้าง คอลัมน์ที่ต้องมีก่อน และฟังก์ชันคำนวณ
+# ผู้เรียกขอเฉพาะคอลัมน์ที่ต้องใช้ ระบบจะหาลำดับการคำนวณ (รวมตัวที่ต้องมีก่อน) ให้เอง
+# ตัวชี้วัดที่อยู่ใน family เดียวกัน (เช่น RSI หลายหน้าต่าง) คำนวณพร้อมกันในครั้งเดียว
+# frame เป็น DataFrame ของหุ้นตัวเดียว หรือ dict ของ array 2 มิติ (หุ้น x วันที่) ก็ได้
+
+
+class Indicator:
+    def __init__(self, outputs, func, requires=(), family=None, param=None):
+        self.outputs = list(outputs)
+        self.func = func
+        self.requires = list(requires)
+        self.family = family
+        self.param = param
+
+    def __repr__(self):
+        return f"Indicator({self.outputs})"
+
+
+REGISTRY = []
+OUTPUTS = {}
+
+
+def _add(indicator):
+    REGISTRY.append(indicator)
+    for column in indicator.outputs:
+        OUTPUTS[column] = indicator
+
+
+def register(outputs, requires=()):
+    """ลงทะเบียนฟังก์ชันคำนวณตัวชี้วัด (ใช้เป็น decorator)"""
+    def decorator(func):
+        _add(Indicator(outputs, func, requires))
+        return func
+    return decorator
+
+
+def register_family(columns, requires=()):
+    """ลงทะเบียน family ของตัวชี้วัด columns คือ {ชื่อคอลัมน์: พารามิเตอร์}
+
+    ฟังก์ชันรับ (frame, {ชื่อคอลัมน์: พารามิเตอร์}) ของคอลัมน์ที่ต้องคำนวณในรอบนั้น
+    """
+    def decorator(func):
+        for column, param in columns.items():
+            _add(Indicator([column], func, requires, family=func, param=param))
+        return func
+    return decorator
+
+
+def _values(frame, column):
+    return np.asarray(frame[column], dtype=float)
+
+
+# RSI (3 ค่า)
+@register_family({f'RSI_{w}': w for w in [7, 14, 21]})
+def _rsi(frame, columns):
+    values = kernels.rsi_family(_values(frame, 'Close'), columns.values())
+    for column, window in columns.items():
+        frame[column] = values[window]
+
+
+# Moving Averages
+@register_family({f'SMA_{w}': w for w in [5, 10, 20, 50, 100, 200]})
+def _sma(frame, columns):
+    values = kernels.sma_family(_values(frame, 'Close'), columns.values())
+    for column, window in columns.items():
+        frame[column] = values[window]
+
+
+@register_family({f'EMA_{w}': w for w in [5, 10, 20, 50]})
+def _ema(frame, columns):
+    values = kernels.ema_family(_values(frame, 'Close'), columns.values())
+    for column, window in columns.items():
+        frame[column] = values[window]
+
+
+# MACD
+@register(['MACD', 'MACD_Signal', 'MACD_Histogram'])
+def _macd(frame):
+    frame['MACD'], frame['MACD_Signal'], frame['MACD_Histogram'] = kernels.macd(_values(frame, 'Close'))
+
+
+# Bollinger Bands
+@register(['BB_Upper', 'BB_Middle', 'BB_Lower'])
+def _bollinger(frame):
+    frame['BB_Upper'], frame['BB_Middle'], frame['BB_Lower'] = kernels.bollinger(
+        _values(frame, 'Close'), window=20, window_dev=2
+    )
+
+
+@register(['BB_Width'], requires=['BB_Upper', 'BB_Middle', 'BB_Lower'])
+def _bb_width(frame):
+    frame['BB_Width'] = (frame['BB_Upper'] - frame['BB_Lower']) / frame['BB_Middle']
+
+
+@register(['BB_Position'], requires=['BB_Upper', 'BB_Lower'])
+def _bb_position(frame):
+    frame['BB_Position'] = (frame['Close'] - frame['BB_Lower']) / (frame['BB_Upper'] - frame['BB_Lower'])
+
+
+# Volume
+def _volume_sma(frame, columns):
+    values = kernels.sma_family(_values(frame, 'Volume'), columns.values())
+    for column, window in columns.items():
+        frame[column] = values[window]
+
+
+register_family({'Volume_SMA': 20})(_volume_sma)
+
+
+@register(['Volume_Ratio'], requires=['Volume_SMA'])
+def _volume_ratio(frame):
+    frame['Volume_Ratio'] = frame['Volume'] / frame['Volume_SMA']
+
+
+register_family({'Volume_5_SMA': 5})(_volume_sma)
+
+
+@register(['Volume_5_Ratio'], requires=['Volume_5_SMA'])
+def _volume_5_ratio(frame):
+    frame['Volume_5_Ratio'] = frame['Volume'] / frame['Volume_5_SMA']
+
+
+# Support/Resistance
+def _resistance(frame, columns):
+    values = kernels.rolling_max_family(_values(frame, 'High'), columns.values())
+    for column, window in columns.items():
+        frame[column] = values[window]
+
+
+def _support(frame, columns):
+    values = kernels.rolling_min_family(_values(frame, 'Low'), columns.values())
+    for column, window in columns.items():
+        frame[column] = values[window]
+
+
+for _window in [20, 50]:
+    register_family({f'Resistance_{_window}': _window})(_resistance)
+    register_family({f'Support_{_window}': _window})(_support)
+
+
+# Price change (ROC ด้านล่างใช้ฟังก์ชันเดียวกันจึงคำนวณรวมกันได้)
+@register_family({f'Price_Change_{p}d': p for p in [1, 5, 10, 20]})
+def _price_change(frame, columns):
+    values = kernels.pct_change_family(_values(frame, 'Close'), set(columns.values()))
+    for column, periods in columns.items():
+        frame[column] = values[periods] * 100
+
+
+# Volume change
+@register(['Volume_Change'])
+def _volume_change(frame):
+    frame['Volume_Change'] = kernels.pct_change(_values(frame, 'Volume'), 1) * 100
+
+
+# Volatility
+@register_family({'Volatility_5': 5, 'Volatility_20': 20})
+def _volatility(frame, columns):
+    returns = kernels.pct_change(_values(frame, 'Close'), 1)
+    for column, window in columns.items():
+        frame[column] = kernels.rolling_std(returns, window, ddof=1) * np.sqrt(252)
+
+
+# ADX (trend strength)
+@register(['ADX', 'DI_Pos', 'DI_Neg'])
+def _adx(frame):
+    frame['ADX'], frame['DI_Pos'], frame['DI_Neg'] = kernels.adx(
+        _values(frame, 'High'), _values(frame, 'Low'), _values(frame, 'Close')
+    )
+
+
+# ATR (Average True Range)
+@register(['ATR'])
+def _atr(frame):
+    frame['ATR'] = kernels.atr(_values(frame, 'High'), _values(frame, 'Low'), _values(frame, 'Close'))
+
+
+@register(['ATR_Pct'], requires=['ATR'])
+def _atr_pct(frame):
+    frame['ATR_Pct'] = (frame['ATR'] / frame['Close']) * 100
+
+
+# Stochastic
+@register(['Stoch_K', 'Stoch_D'])
+def _stochastic(frame):
+    frame['Stoch_K'], frame['Stoch_D'] = kernels.stochastic(
+        _values(frame, 'High'), _values(frame, 'Low'), _values(frame, 'Close')
+    )
+
+
+# CCI (Commodity Channel Index)
+@register(['CCI'])
+def _cci(frame):
+    frame['CCI'] = kernels.cci(_values(frame, 'High'), _values(frame, 'Low'), _values(frame, 'Close'))
+
+
+# Money Flow Index
+@register(['MFI'])
+def _mfi(frame):
+    frame['MFI'] = kernels.mfi(
+        _values(frame, 'High'), _values(frame, 'Low'), _values(frame, 'Close'), _values(frame, 'Volume')
+    )
+
+
+# OBV (On-Balance Volume)
+@register(['OBV'])
+def _obv(frame):
+    frame['OBV'] = kernels.obv(_values(frame, 'Close'), _values(frame, 'Volume'))
+
+
+@register(['OBV_Change'], requires=['OBV'])
+def _obv_change(frame):
+    frame['OBV_Change'] = kernels.pct_change(_values(frame, 'OBV'), 1) * 100
+
+
+# Momentum Indicators
+@register_family({f'Momentum_{p}': p for p in [5, 10]})
+def _momentum(frame, columns):
+    close = _values(frame, 'Close')
+    for column, periods in columns.items():
+        frame[column] = close - kernels.shift(close, periods)
+
+
+@register_family({f'Momentum_{p}_Pct': p for p in [5, 10]})
+def _momentum_pct(frame, columns):
+    close = _values(frame, 'Close')
+    for column, periods in columns.items():
+        base = kernels.shift(close, periods)
+        frame[column] = (close - base) / base * 100
+
+
+# Rate of Change
+register_family({f'ROC_{p}': p for p in [5, 10, 20]})(_price_change)
+
+
+ALL_COLUMNS = [column for indicator in REGISTRY for column in indicator.outputs]
+
+
+def resolve(columns=None):
+    """หาลำดับตัวชี้วัดที่ต้องคำนวณสำหรับคอลัมน์ที่ขอ (รวมตัวที่ต้องมีก่อน)"""
+    if columns is None:
+        return list(REGISTRY)
+
+    ordered = []
+    seen = set()
+
+    def visit(column):
+        if column not in OUTPUTS:
+            raise KeyError(f"ไม่รู้จักตัวชี้วัด {column}")
+        indicator = OUTPUTS[column]
+        if id(indicator) in seen:
+            return
+        seen.add(id(indicator))
+        for required in indicator.requires:
+            visit(required)
+        ordered.append(indicator)
+
+    for column in columns:
+        if column in ('Open', 'High', 'Low', 'Close', 'Volume'):
+            continue
+        visit(column)
+    return ordered
+
+
+def compute_indicators(frame, columns=None):
+    """เพิ่มคอลัมน์ตัวชี้วัดลงใน frame เฉพาะที่ขอและยังไม่มี"""
+    pending = [
+        indicator for indicator in resolve(columns)
+        if not all(column in frame for column in indicator.outputs)
+    ]
+    done = set()
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for indicator in pending:
+            if id(indicator) in done:
+                continue
+            if indicator.family is None:
+                indicator.func(frame)
+                done.add(id(indicator))
+                continue
+            # รวมสมาชิกของ family เดียวกันที่ต้องคำนวณแล้วเรียกครั้งเดียว
+            members = [m for m in pending if m.family is indicator.family and id(m) not in done]
+            indicator.family(frame, {m.outputs[0]: m.param for m in members})
+            done.update(id(m) for m in members)
+    return frame
@@ -0,0 +1,81 @@
+from datetime import datetime, timedelta, timezone, time
+
+# ตลาดหลักทรัพย์ฯ ใช้เวลาไทย (UTC+7) ไม่มี daylight saving
+BANGKOK_TZ = timezone(timedelta(hours=7), name='Asia/Bangkok')
+
+# ช่วงเวลาซื้อขาย: เช้า 10:00-12:30, บ่าย 14:30-16:40 (รวมช่วง pre-close)
+SESSIONS = [
+    (time(10, 0), time(12, 30)),
+    (time(14, 30), time(16, 40)),
+]
+
+# เผื่อเวลาให้ Yahoo อัปเดตแท่งหลังจบแต่ละช่วง
+SETTLE_DELAY = timedelta(minutes=20)
+
+
+def now_bangkok():
+    """เวลาปัจจุบันตามเวลาไทย"""
+    return datetime.now(BANGKOK_TZ)
+
+
+def to_bangkok(dt):
+    """แปลง datetime หรือ timestamp (วินาที) เป็นเวลาไทย"""
+    if dt is None:
+        return now_bangkok()
+    if isinstance(dt, (int, float)):
+        return datetime.fromtimestamp(dt, BANGKOK_TZ)
+    return dt.astimezone(BANGKOK_TZ)
+
+
+def is_trading_day(day):
+    """วันทำการ (จันทร์-ศุกร์) ไม่รวมวันหยุดนักขัตฤกษ์"""
+    return day.weekday() < 5
+
+
+def is_market_open(now=None):
+    """ตลาดเปิดซื้อขายอยู่หรือไม่"""
+    now = to_bangkok(now)
+    if not is_trading_day(now):
+        return False
+    current = now.time()
+    return any(start <= current < end for start, end in SESSIONS)
+
+
+def last_session_end(now=None):
+    """เวลาที่ช่วงซื้อขายล่าสุดจบลง (รวมเวลาเผื่อ) ก่อนเวลาที่กำหนด"""
+    now = to_bangkok(now)
+    for days_back in range(8):
+        day = (now - timedelta(days=days_back)).date()
+        if not is_trading_day(day):
+            continue
+        for _, end in reversed(SESSIONS):
+            end_dt = datetime.combine(day, end, BANGKOK_TZ) + SETTLE_DELAY
+            if end_dt <= now:
+                return end_dt
+    return now - timedelta(days=7)
+
+
+def is_fresh(fetched_at, now=None, intraday_ttl=300):
+    """ข้อมูลที่ดึงมาเมื่อ fetched_at ยังใช้ได้หรือไม่
+
+    ระหว่างตลาดเปิดใช้ได้ภายใน intraday_ttl วินาที
+    นอกเวลาใช้ได้ถ้าดึงหลังช่วงซื้อขายล่าสุดจบแล้ว
+    """
+    if fetched_at is None:
+        return False
+    now = to_bangkok(now)
+    fetched_at = to_bangkok(fetched_at)
+    if is_market_open(now):
+        return (now - fetched_at).total_seconds() < intraday_ttl
+    return fetched_at >= last_session_end(now)
+
+
+def data_version(now=None, intraday_ttl=300):
+    """ตัวบอกรุ่นของข้อมูลราคา เปลี่ยนค่าเมื่อควรมีข้อมูลใหม่ ใช้เป็นส่วนหนึ่งของ key แคช
+
+    ระหว่างตลาดเปิดเปลี่ยนทุก intraday_ttl วินาที นอกเวลาคงที่จนกว่าช่วงซื้อขายถัดไปจะจบ
+    """
+    now = to_bangkok(now)
+    if is_market_open(now):
+        return f"live-{int(now.timestamp() // intraday_ttl)}"
+    return last_session_end(now).isoformat()
@@ -0,0 +1,152 @@
+import itertools
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+import backtest
+from panel import FIELDS, PricePanel
+
+# ทดลองเกณฑ์ของสแกนเนอร์หลายชุด (grid) ด้วยการทดสอบย้อนหลัง แล้วจัดอันดับตามผลตอบแทนคาดหวัง
+# ตัวชี้วัดไม่ขึ้นกับเกณฑ์ จึงคำนวณครั้งเดียวในโปรเซสหลัก แล้ววางราคาและตัวชี้วัดทั้งหมดใน shared memory
+# worker ทุกตัวอ่าน array ชุดเดียวกันโดยตรง (อ่านอย่างเดียว ไม่ต้อง pickle ข้อมูลส่งไปทีละงาน)
+
+# ช่วงของเกณฑ์ที่ทดลองโดยค่าเริ่มต้น (ค่าที่ไม่ระบุใช้ค่าเดิมใน scanner_rules)
+DEFAULT_GRIDS = {
+    'momentum': {
+        'volume_ratio': [1.0, 1.2, 1.5, 2.0],
+        'rsi_7_low': [40, 50, 60],
+        'atr_pct': [1.5, 2, 3],
+        'min_pct': [50, 60, 70],
+    },
+    'breakout': {
+        'volume_ratio': [1.0, 1.3, 1.6, 2.0],
+        'rsi_max': [60, 65, 70],
+        'dist_20': [2, 3, 5],
+        'dist_50': [3, 5, 8],
+    },
+    'rebound': {
+        'rsi_14': [25, 30, 35, 40],
+        'rsi_7': [20, 25, 30],
+        'dist_support': [1, 2, 3, 5],
+    },
+}
+
+# ชุดเกณฑ์ที่มีการเทรดน้อยกว่านี้ไม่น่าเชื่อถือ จัดไว้ท้ายตาราง
+MIN_TRADES = 30
+
+SUMMARY_COLUMNS = ['trades', 'hit_rate', 'win_rate', 'avg_win', 'avg_loss', 'expectancy', 'max_drawdown', 'avg_bars_held']
+
+# panel ของ worker (สร้างครั้งเดียวตอนเริ่ม worker)
+_panel = None
+_shm = None
+
+
+def expand_grid(grid):
+    """แปลง {ชื่อเกณฑ์: [ค่าที่ทดลอง]} เป็น list ของ params ทุกชุด"""
+    names = list(grid)
+    return [dict(zip(names, values)) for values in itertools.product(*(grid[name] for name in names))]
+
+
+class SharedPanel:
+    """ราคาและตัวชี้วัดของ PricePanel ใน shared memory ก้อนเดียว (array ชื่อ x หุ้น x วันที่)"""
+
+    def __init__(self, panel, columns):
+        arrays = {**panel.fields, **panel.compute(columns)}
+        self.names = list(arrays)
+        self.shape = (len(self.names),) + panel.fields['Close'].shape
+        self.symbols = panel.symbols
+        self.dates = panel.dates
+        self.shm = shared_memory.SharedMemory(create=True, size=max(int(np.prod(self.shape)) * 8, 1))
+        values = None
+        try:
+            values = np.ndarray(self.shape, dtype=np.float64, buffer=self.shm.buf)
+            for i, name in enumerate(self.names):
+                values[i] = arrays[name]
+        except Exception:
+            # __exit__ จะไม่ถูกเรียกถ้า __init__ ไม่สำเร็จ ต้องคืน shared memory เอง
+            values = None
+            self.close()
+            raise
+
+    def spec(self):
+        """ข้อมูลที่ worker ต้องใช้เปิด shared memory (ขนาดเล็ก pickle ได้)"""
+        return self.shm.name, self.shape, self.names, self.symbols, self.dates
+
+    def close(self):
+        self.shm.close()
+        self.shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def attach_panel(name, shape, names, symbols, dates):
+    """สร้าง PricePanel ที่ใช้ array ใน shared memory โดยตรง คืน (panel, shm)"""
+    try:
+        # Python 3.13+ ไม่ต้องให้ resource tracker ของ worker ลบ shared memory ที่โปรเซสหลักเป็นเจ้าของ
+        shm = shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        shm = shared_memory.SharedMemory(name=name)
+    values = np.ndarray(shape, dtype=np.float64, buffer=shm.buf)
+    values.flags.writeable = False
+    arrays = dict(zip(names, values))
+    panel = PricePanel(symbols, dates, {field: arrays[field] for field in FIELDS})
+    panel.indicators = arrays
+    return panel, shm
+
+
+def _init_worker(spec):
+    global _panel, _shm
+    _panel, _shm = attach_panel(*spec)
+
+
+def _evaluate(task):
+    strategy, params = task
+    return backtest.summarize(backtest.simulate(_panel, *backtest.STRATEGIES[strategy](_panel, params)))
+
+
+def rank(strategy, param_sets, stats, rank_by='expectancy', min_trades=MIN_TRADES):
+    """ตารางผลของทุกชุดเกณฑ์ เรียงจากดีที่สุด (ชุดที่เทรดน้อยกว่า min_trades อยู่ท้าย)"""
+    rows = [{**params, **{column: result[column] for column in SUMMARY_COLUMNS}} for params, result in zip(param_sets, stats)]
+    table = pd.DataFrame(rows)
+    if table.empty:
+        return table
+    table.insert(0, 'strategy', strategy)
+    table['enough_trades'] = table['trades'] >= min_trades
+    table = table.sort_values(['enough_trades', rank_by], ascending=[False, False], kind='stable')
+    return table.reset_index(drop=True)
+
+
+def sweep(panel, strategy, grid=None, max_workers=None, rank_by='expectancy', min_trades=MIN_TRADES):
+    """ทดสอบย้อนหลังทุกชุดเกณฑ์ใน grid พร้อมกันหลายโปรเซส คืน DataFrame ที่จัดอันดับแล้ว"""
+    grid = DEFAULT_GRIDS[strategy] if grid is None else grid
+    param_sets = expand_grid(grid)
+    tasks = [(strategy, params) for params in param_sets]
+    workers = min(max_workers or os.cpu_count() or 1, len(tasks)) or 1
+
+    with SharedPanel(panel, backtest.STRATEGY_COLUMNS[strategy]) as shared:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(shared.spec(),)) as executor:
+            chunksize = max(1, len(tasks) // (workers * 4))
+            stats = list(executor.map(_evaluate, tasks, chunksize=chunksize))
+    return rank(strategy, param_sets, stats, rank_by=rank_by, min_trades=min_trades)
+
+
+if __name__ == "__main__":
+    # รันจากข้อมูลในแคช: python param_sweep.py [สแกนเนอร์] [ช่วงเวลา เช่น 2y]
+    from stock_analyzer import StockAnalyzer
+
+    strategy = sys.argv[1] if len(sys.argv) > 1 else 'momentum'
+    period = sys.argv[2] if len(sys.argv) > 2 else '2y'
+    panel = StockAnalyzer().load_panel(period=period)
+    start = time.perf_counter()
+    table = sweep(panel, strategy)
+    print(table.head(20).to_string(index=False))
+    print(f"{len(table)} ชุดเกณฑ์ ใช้เวลา {time.perf_counter() - start:.2f} s")
@@ -1,100 +1,267 @@
 import json
 import os
+import threading
+import time
 from datetime import datetime
 
+# การเก็บพอร์ต: snapshot (portfolio.json) + journal ของรายการซื้อขายที่เกิดหลัง snapshot
+# แต่ละรายการต่อท้าย journal หนึ่งบรรทัด (JSON Lines) แล้ว fsync ทันที ไม่ต้องเขียนทั้งพอร์ตใหม่
+# ครบ compact_every รายการจะรวมเป็น snapshot ใหม่ (เขียนแบบ atomic) แล้วล้าง journal
+# ไฟล์ portfolio.json แบบเดิม (dict ของหุ้นล้วนๆ) โหลดได้ตามปกติและจะถูกแปลงตอน compact
+
+
 class PortfolioManager:
-    def __init__(self, filename="portfolio.json"):
+    def __init__(self, filename="portfolio.json", journal_filename=None, compact_every=100):
         self.filename = filename
+        self.journal_filename = journal_filename if journal_filename is not None else f"{filename}.journal"
+        self.compact_every = compact_every
+        # seq ของรายการล่าสุด และ seq ที่รวมอยู่ใน snapshot แล้ว
+        self.seq = 0
+        self.snapshot_seq = 0
+        # ยอดสะสมของแต่ละหุ้น ปรับทุกครั้งที่มีรายการใหม่ ไม่ต้องไล่รายการซื้อขายทั้งหมด
+        self.positions = {}
+        # ใช้ร่วมกันหลาย session: ตรวจจำนวนหุ้น เขียน journal และ compact ต้องทำทีละรายการ
+        # (RLock เพราะ sell_stock -> _append -> compact เรียกซ้อนกัน)
+        self._lock = threading.RLock()
         self.portfolio = self.load_portfolio()
     
-    def load_portfolio(self):
-        """โหลดข้อมูลพอร์ต"""
-        if os.path.exists(self.filename):
+    def _set_aside(self, filename):
+        """ย้ายไฟล์ที่อ่านไม่ได้ไปไว้ข้างๆ (ไม่ลบทิ้ง) เพื่อกู้ข้อมูลภายหลัง"""
+        corrupt = f"{filename}.corrupt-{time.strftime('%Y%m%d-%H%M%S')}"
+        try:
+            os.replace(filename, corrupt)
+            print(f"ไฟล์ {filename} เสียหาย ย้ายไปไว้ที่ {corrupt}")
+        except OSError as e:
+            print(f"Error moving corrupt file {filename}: {e}")
+        return corrupt
+    
+    def _load_snapshot(self):
+        if not os.path.exists(self.filename):
+            return 0, {}
+        try:
+            with open(self.filename, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Error loading portfolio {self.filename}: {e}")
+            self._set_aside(self.filename)
+            return 0, {}
+        if isinstance(data, dict) and 'seq' in data and 'portfolio' in data:
+            return data['seq'], data['portfolio']
+        # รูปแบบเดิม: ทั้งไฟล์คือพอร์ต
+        return 0, data if isinstance(data, dict) else {}
+    
+    def _load_journal(self):
+        """อ่านรายการใน journal ที่สมบูรณ์
+        
+        บรรทัดสุดท้ายที่เขียนไม่จบ (ปิดโปรแกรมระหว่างเขียน) จะถูกตัดทิ้ง
+        บรรทัดที่เสียหายกลางไฟล์จะถูกข้าม (เก็บสำเนาไฟล์เดิมไว้ข้างๆ) รายการหลังจากนั้นยังใช้ได้ตามปกติ
+        """
+        if not os.path.exists(self.journal_filename):
+            return []
+        with open(self.journal_filename, 'rb') as f:
+            raw = f.read()
+        
+        entries = []
+        good_lines = []
+        skipped = []
+        lines = raw.split(b'\n')
+        for i, line in enumerate(lines):
+            if not line.strip():
+                continue
             try:
-                with open(self.filename, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            except:
-                return {}
-        return {}
+                entry = json.loads(line.decode('utf-8'))
+            except ValueError:
+                entry = None
+            if isinstance(entry, dict) and 'seq' in entry:
+                entries.append(entry)
+                good_lines.append(line)
+            elif i < len(lines) - 1:
+                # บรรทัดที่ไม่มีขึ้นบรรทัดใหม่ต่อท้ายคือรายการที่เขียนไม่จบ ทิ้งได้เลย ส่วนบรรทัดกลางไฟล์ต้องแจ้ง
+                skipped.append(i + 1)
+        
+        cleaned = b''.join(line + b'\n' for line in good_lines)
+        if cleaned != raw:
+            if skipped:
+                corrupt = f"{self.journal_filename}.corrupt-{time.strftime('%Y%m%d-%H%M%S')}"
+                with open(corrupt, 'wb') as f:
+                    f.write(raw)
+                print(f"journal {self.journal_filename} บรรทัด {skipped} เสียหาย ข้ามไป (สำเนาไฟล์เดิมอยู่ที่ {corrupt})")
+            # เขียน journal ใหม่เฉพาะรายการที่อ่านได้ รายการถัดไปจะได้เริ่มที่บรรทัดใหม่
+            tmp = f"{self.journal_filename}.{os.getpid()}.tmp"
+            with open(tmp, 'wb') as f:
+                f.write(cleaned)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self.journal_filename)
+        return entries
+    
+    def load_portfolio(self):
+        """โหลดข้อมูลพอร์ต (snapshot แล้วตามด้วยรายการใน journal ที่ใหม่กว่า)"""
+        self.snapshot_seq, portfolio = self._load_snapshot()
+        self.seq = self.snapshot_seq
+        self.positions = {}
+        for symbol, data in portfolio.items():
+            for t in data['transactions']:
+                self._update_position(symbol, t)
+        for entry in self._load_journal():
+            if entry['seq'] <= self.snapshot_seq:
+                # รวมอยู่ใน snapshot แล้ว (ปิดโปรแกรมระหว่าง compact)
+                continue
+            self._apply(portfolio, entry)
+            self.seq = entry['seq']
+        return portfolio
+    
+    def _apply(self, portfolio, entry):
+        symbol = entry['symbol']
+        if symbol not in portfolio:
+            portfolio[symbol] = {
+                'name': entry.get('name', symbol),
+                'transactions': []
+            }
+        transaction = {
+            'date': entry['date'],
+            'shares': entry['shares'],
+            'price': entry['price'],
+            'type': entry['type']
+        }
+        portfolio[symbol]['transactions'].append(transaction)
+        self._update_position(symbol, transaction)
+    
+    def _update_position(self, symbol, t):
+        """ปรับยอดสะสมของหุ้นด้วยรายการเดียว
+        
+        ต้นทุนเฉลี่ยคิดจากรายการซื้อทั้งหมด (ไม่หักส่วนที่ขาย) เหมือน get_average_cost เดิม
+        กำไรที่รับรู้แล้วของการขายคิดเทียบกับต้นทุนเฉลี่ย ณ ตอนที่ขาย
+        """
+        position = self.positions.get(symbol)
+        if position is None:
+            position = self.positions[symbol] = {
+                'shares': 0, 'buy_shares': 0, 'buy_cost': 0.0, 'realized': 0.0
+            }
+        position['shares'] += t['shares']
+        if t['type'] == 'buy':
+            position['buy_shares'] += t['shares']
+            position['buy_cost'] += t['shares'] * t['price']
+        elif position['buy_shares'] > 0:
+            avg_cost = position['buy_cost'] / position['buy_shares']
+            position['realized'] += -t['shares'] * (t['price'] - avg_cost)
+    
+    def _append(self, entry):
+        """เพิ่มรายการลง journal (fsync ก่อนคืนค่า) แล้วปรับพอร์ตในหน่วยความจำ"""
+        with self._lock:
+            entry = dict(entry, seq=self.seq + 1)
+            line = json.dumps(entry, ensure_ascii=False) + '\n'
+            directory = os.path.dirname(self.journal_filename)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(self.journal_filename, 'a', encoding='utf-8') as f:
+                f.write(line)
+                f.flush()
+                os.fsync(f.fileno())
+            
+            self.seq = entry['seq']
+            self._apply(self.portfolio, entry)
+            if self.seq - self.snapshot_seq >= self.compact_every:
+                self.compact()
     
     def save_portfolio(self):
-        """บันทึกข้อมูลพอร์ต"""
+        """บันทึกพอร์ตทั้งหมดเป็น snapshot (เหมือน compact)"""
+        return self.compact()
+    
+    def compact(self):
+        """รวมพอร์ตปัจจุบันเป็น snapshot ใหม่แบบ atomic แล้วล้าง journal"""
+        # ถือ lock ตลอดจนล้าง journal เสร็จ รายการที่เขียนระหว่างนั้นจะไม่ถูกลบโดยไม่อยู่ใน snapshot
+        with self._lock:
+            return self._compact()
+    
+    def _compact(self):
+        directory = os.path.dirname(self.filename)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp = f"{self.filename}.{os.getpid()}.tmp"
+        try:
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump({'seq': self.seq, 'portfolio': self.portfolio}, f, ensure_ascii=False)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self.filename)
+        except OSError as e:
+            print(f"Error saving portfolio snapshot: {e}")
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            return False
+        
+        self.snapshot_seq = self.seq
+        # ถ้าปิดโปรแกรมก่อนล้าง journal รายการเก่าจะถูกข้ามตอนโหลดเพราะ seq ไม่เกิน snapshot
         try:
-            with open(self.filename, 'w', encoding='utf-8') as f:
-                json.dump(self.portfolio, f, ensure_ascii=False, indent=2)
-        except:
-            pass
+            with open(self.journal_filename, 'w', encoding='utf-8'):
+                pass
+        except OSError as e:
+            print(f"Error truncating portfolio journal: {e}")
+        return True
     
     def add_stock(self, symbol, name, shares, price, date=None):
         """เพิ่มหุ้น"""
-        if symbol not in self.portfolio:
-            self.portfolio[symbol] = {
-                'name': name,
-                'transactions': []
-            }
-        
         if date is None:
             date = datetime.now().strftime('%Y-%m-%d')
         
-        self.portfolio[symbol]['transactions'].append({
+        self._append({
+            'symbol': symbol,
+            'name': name,
             'date': date,
             'shares': shares,
             'price': price,
             'type': 'buy'
         })
-        
-        self.save_portfolio()
         return True
     
     def sell_stock(self, symbol, shares, price, date=None):
         """ขายหุ้น"""
-        if symbol not in self.portfolio:
-            return False
-        
-        current = self.get_current_shares(symbol)
-        if shares > current:
-            return False
-        
         if date is None:
             date = datetime.now().strftime('%Y-%m-%d')
         
-        self.portfolio[symbol]['transactions'].append({
-            'date': date,
-            'shares': -shares,
-            'price': price,
-            'type': 'sell'
-        })
-        
-        self.save_portfolio()
+        # ตรวจจำนวนหุ้นและบันทึกการขายภายใต้ lock เดียวกัน สอง session จะขายเกินที่มีไม่ได้
+        with self._lock:
+            if symbol not in self.portfolio:
+                return False
+            
+            current = self.get_current_shares(symbol)
+            if shares > current:
+                return False
+            
+            self._append({
+                'symbol': symbol,
+                'date': date,
+                'shares': -shares,
+                'price': price,
+                'type': 'sell'
+            })
         return True
     
     def get_current_shares(self, symbol):
         """จำนวนหุ้นปัจจุบัน"""
-        if symbol not in self.portfolio:
+        position = self.positions.get(symbol)
+        if position is None:
             return 0
-        
-        total = 0
-        for t in self.portfolio[symbol]['transactions']:
-            total += t['shares']
-        return max(0, total)
+        return max(0, position['shares'])
     
     def get_average_cost(self, symbol):
         """ต้นทุนเฉลี่ย"""
-        if symbol not in self.portfolio:
-            return 0
-        
-        total_cost = 0
-        total_shares = 0
-        
-        for t in self.portfolio[symbol]['transactions']:
-            if t['type'] == 'buy':
-                total_cost += t['shares'] * t['price']
-                total_shares += t['shares']
-        
-        if total_shares == 0:
+        position = self.positions.get(symbol)
+        if position is None or position['buy_shares'] == 0:
             return 0
-        
-        return total_cost / total_shares
+        return position['buy_cost'] / position['buy_shares']
+    
+    def get_realized_pnl(self, symbol=None):
+        """กำไร/ขาดทุนที่รับรู้แล้วจากการขาย (ของหุ้นตัวเดียว หรือทั้งพอร์ตถ้าไม่ระบุ)"""
+        if symbol is not None:
+            position = self.positions.get(symbol)
+            return position['realized'] if position else 0.0
+        return sum(position['realized'] for position in self.positions.values())
+    
+    def get_held_symbols(self):
+        """รหัสหุ้นที่ยังถืออยู่ (จำนวนหุ้นมากกว่า 0)"""
+        return [symbol for symbol, position in self.positions.items() if position['shares'] > 0]
     
     def get_all_holdings(self):
         """รายการหุ้นทั้งหมดที่ถืออยู่"""
@@ -106,7 +273,8 @@ class PortfolioManager:
                     'symbol': symbol,
                     'name': data['name'],
                     'shares': shares,
-                    'avg_cost': self.get_average_cost(symbol)
+                    'avg_cost': self.get_average_cost(symbol),
+                    'realized_pnl': self.get_realized_pnl(symbol)
                 })
         return holdings
     
@@ -0,0 +1,338 @@
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+from compact_frame import compact_prices, memory_usage
+from market_hours import is_fresh, now_bangkok
+
+# ความยาวของแต่ละช่วงเวลา (วัน) ใช้เทียบว่าข้อมูลที่เก็บไว้ครอบคลุมพอหรือไม่
+PERIOD_DAYS = {
+    '1d': 1,
+    '5d': 5,
+    '1mo': 31,
+    '3mo': 92,
+    '6mo': 183,
+    'ytd': 366,
+    '1y': 366,
+    '2y': 731,
+    '5y': 1827,
+    '10y': 3653,
+    'max': float('inf'),
+}
+
+PERIOD_OFFSETS = {
+    '1mo': pd.DateOffset(months=1),
+    '3mo': pd.DateOffset(months=3),
+    '6mo': pd.DateOffset(months=6),
+    '1y': pd.DateOffset(years=1),
+    '2y': pd.DateOffset(years=2),
+    '5y': pd.DateOffset(years=5),
+    '10y': pd.DateOffset(years=10),
+}
+
+PRICE_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume', 'Dividends', 'Stock Splits']
+DB_COLUMNS = ['open', 'high', 'low', 'close', 'volume', 'dividends', 'splits']
+
+INDEX_TZ = 'Asia/Bangkok'
+
+
+def slice_period(df, period):
+    """ตัดข้อมูลให้เหลือเฉพาะช่วงเวลาที่ต้องการ"""
+    if df is None or df.empty or period == 'max':
+        return df
+    if period == '1d':
+        return df.iloc[-1:]
+    if period == '5d':
+        return df.iloc[-5:]
+
+    today = pd.Timestamp(now_bangkok().date(), tz=INDEX_TZ)
+    if period == 'ytd':
+        start = today.replace(month=1, day=1)
+    elif period in PERIOD_OFFSETS:
+        start = today - PERIOD_OFFSETS[period]
+    else:
+        return df
+    # index เรียงตามวันที่อยู่แล้ว ใช้ searchsorted แทน boolean mask (เร็วกว่ามากเมื่อสแกนหลายร้อยหุ้น)
+    return df.iloc[df.index.searchsorted(start):]
+
+
+class PriceCache:
+    def __init__(self, db_path=os.path.join("cache", "prices.db"), intraday_ttl=300):
+        self.db_path = db_path
+        self.intraday_ttl = intraday_ttl
+        self._memory = {}
+        self._lock = threading.RLock()
+        self._init_db()
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _init_db(self):
+        """สร้างตารางถ้ายังไม่มี"""
+        directory = os.path.dirname(self.db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._lock, self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS bars ("
+                "symbol TEXT NOT NULL, date TEXT NOT NULL, "
+                "open REAL, high REAL, low REAL, close REAL, volume REAL, "
+                "dividends REAL, splits REAL, "
+                "PRIMARY KEY (symbol, date))"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS meta ("
+                "symbol TEXT PRIMARY KEY, period TEXT NOT NULL, fetched_at REAL NOT NULL)"
+            )
+
+    def _load(self, symbol):
+        """โหลดข้อมูลของหุ้นจากดิสก์เข้าหน่วยความจำ"""
+        with self._lock, self._connect() as conn:
+            row = conn.execute(
+                "SELECT period, fetched_at FROM meta WHERE symbol = ?", (symbol,)
+            ).fetchone()
+            if row is None:
+                return None
+            bars = conn.execute(
+                f"SELECT date, {', '.join(DB_COLUMNS)} FROM bars WHERE symbol = ? ORDER BY date",
+                (symbol,)
+            ).fetchall()
+
+        df = pd.DataFrame(bars, columns=['Date'] + PRICE_COLUMNS)
+        df.index = pd.DatetimeIndex(pd.to_datetime(df.pop('Date'))).tz_localize(INDEX_TZ)
+        df.index.name = 'Date'
+
+        entry = {'frame': compact_prices(df), 'period': row[0], 'fetched_at': row[1]}
+        self._memory[symbol] = entry
+        return entry
+
+    def preload(self, symbols, chunk_size=500):
+        """โหลดหลายหุ้นจากดิสก์เข้าหน่วยความจำในคำสั่งเดียว (แทนการโหลดทีละตัวตอนสแกนทั้งตลาด)"""
+        with self._lock:
+            missing = [symbol for symbol in dict.fromkeys(symbols) if symbol not in self._memory]
+        for i in range(0, len(missing), chunk_size):
+            chunk = missing[i:i + chunk_size]
+            placeholders = ', '.join('?' * len(chunk))
+            with self._lock, self._connect() as conn:
+                meta = conn.execute(
+                    f"SELECT symbol, period, fetched_at FROM meta WHERE symbol IN ({placeholders})", chunk
+                ).fetchall()
+                bars = conn.execute(
+                    f"SELECT symbol, date, {', '.join(DB_COLUMNS)} FROM bars "
+                    f"WHERE symbol IN ({placeholders}) ORDER BY symbol, date",
+                    chunk
+                ).fetchall()
+            if not meta:
+                continue
+
+            df = pd.DataFrame(bars, columns=['Symbol', 'Date'] + PRICE_COLUMNS)
+            index = pd.DatetimeIndex(pd.to_datetime(df.pop('Date'), format='%Y-%m-%d')).tz_localize(INDEX_TZ)
+            df.index = index.rename('Date')
+            owners = df.pop('Symbol').to_numpy()
+            prices = compact_prices(df)
+
+            # แถวเรียงตามหุ้นแล้ว หาขอบเขตของแต่ละหุ้นจากตำแหน่งที่รหัสเปลี่ยน
+            bounds = {}
+            if len(owners):
+                starts = np.flatnonzero(np.r_[True, owners[1:] != owners[:-1]])
+                ends = np.r_[starts[1:], len(owners)]
+                bounds = {owners[s]: (s, e) for s, e in zip(starts, ends)}
+
+            with self._lock:
+                for symbol, period, fetched_at in meta:
+                    if symbol in self._memory:
+                        continue
+                    start, end = bounds.get(symbol, (0, 0))
+                    self._memory[symbol] = {
+                        'frame': prices.iloc[start:end].copy(),
+                        'period': period,
+                        'fetched_at': fetched_at,
+                    }
+
+    def _entry(self, symbol):
+        entry = self._memory.get(symbol)
+        if entry is None:
+            entry = self._load(symbol)
+        return entry
+
+    @staticmethod
+    def _normalize(df):
+        """จัดคอลัมน์และ index (วันที่ตามเวลาไทย) ให้เป็นรูปแบบเดียวกับที่เก็บ"""
+        df = df.copy()
+        for col in PRICE_COLUMNS:
+            if col not in df.columns:
+                df[col] = 0.0
+        df = df[PRICE_COLUMNS]
+        if df.index.tz is None:
+            df.index = df.index.tz_localize(INDEX_TZ)
+        else:
+            df.index = df.index.tz_convert(INDEX_TZ)
+        df.index = df.index.normalize()
+        df.index.name = 'Date'
+        return df
+
+    @staticmethod
+    def _rows(symbol, df):
+        return [
+            (symbol, date.strftime('%Y-%m-%d'), *values)
+            for date, values in zip(df.index, df.itertuples(index=False, name=None))
+        ]
+
+    def _insert(self, conn, rows):
+        conn.executemany(
+            f"INSERT OR REPLACE INTO bars (symbol, date, {', '.join(DB_COLUMNS)}) "
+            f"VALUES (?, ?, {', '.join('?' * len(DB_COLUMNS))})",
+            rows
+        )
+
+    def store(self, symbol, df, period, fetched_at=None):
+        """บันทึกแท่งราคาของหุ้นลงดิสก์และหน่วยความจำ (แทนที่ข้อมูลเดิมทั้งหมด)"""
+        if fetched_at is None:
+            fetched_at = time.time()
+
+        df = self._normalize(df)
+        with self._lock, self._connect() as conn:
+            conn.execute("DELETE FROM bars WHERE symbol = ?", (symbol,))
+            self._insert(conn, self._rows(symbol, df))
+            conn.execute(
+                "INSERT OR REPLACE INTO meta (symbol, period, fetched_at) VALUES (?, ?, ?)",
+                (symbol, period, fetched_at)
+            )
+            self._memory[symbol] = {'frame': compact_prices(df), 'period': period, 'fetched_at': fetched_at}
+
+    def refresh_start(self, symbol, period=None):
+        """วันที่ที่ควรเริ่มดึงข้อมูลเพิ่ม (แท่งก่อนแท่งล่าสุด) หรือ None ถ้าต้องดึงใหม่ทั้งช่วง
+
+        แท่งล่าสุดอาจเป็นแท่งระหว่างวันที่ยังไม่จบ จึงใช้แท่งก่อนหน้าเป็นแท่งอ้างอิง
+        ถ้าระบุ period ข้อมูลเดิมต้องครอบคลุมช่วงนั้นด้วย
+        """
+        entry = self._entry(symbol)
+        if entry is None or len(entry['frame']) < 2:
+            return None
+        if period is not None and not self.covers(entry, period):
+            return None
+        return entry['frame'].index[-2]
+
+    def merge_recent(self, symbol, recent, fetched_at=None):
+        """รวมแท่งใหม่ (ดึงตั้งแต่ refresh_start) เข้ากับข้อมูลเดิม
+
+        คืน False ถ้าต้องดึงใหม่ทั้งช่วง: ราคาของแท่งอ้างอิงเปลี่ยน (Yahoo ปรับราคาย้อนหลัง
+        จากปันผล/แตกพาร์) หรือมีปันผล/แตกพาร์ในแท่งใหม่ ซึ่งทำให้ราคาเก่าทั้งหมดต้องปรับตาม
+        """
+        if fetched_at is None:
+            fetched_at = time.time()
+        reference = self.refresh_start(symbol)
+        if reference is None or recent is None or recent.empty:
+            return False
+
+        with self._lock:
+            entry = self._memory[symbol]
+            frame = entry['frame']
+            recent = self._normalize(recent)
+            if reference not in recent.index:
+                return False
+            if not np.isclose(recent.at[reference, 'Close'], frame.at[reference, 'Close'], rtol=1e-6):
+                return False
+
+            new = recent[recent.index > reference]
+            if (new[['Dividends', 'Stock Splits']].fillna(0) != 0).any().any():
+                return False
+
+            with self._connect() as conn:
+                conn.execute(
+                    "DELETE FROM bars WHERE symbol = ? AND date > ?",
+                    (symbol, reference.strftime('%Y-%m-%d'))
+                )
+                self._insert(conn, self._rows(symbol, new))
+                conn.execute("UPDATE meta SET fetched_at = ? WHERE symbol = ?", (fetched_at, symbol))
+
+            self._memory[symbol] = {
+                'frame': pd.concat([frame[frame.index <= reference], compact_prices(new)]),
+                'period': entry['period'],
+                'fetched_at': fetched_at,
+            }
+        return True
+
+    def covers(self, entry, period):
+        """ข้อมูลที่เก็บไว้ครอบคลุมช่วงเวลาที่ขอหรือไม่"""
+        return PERIOD_DAYS.get(entry['period'], 0) >= PERIOD_DAYS.get(period, float('inf'))
+
+    def _usable(self, entry, period):
+        return (
+            entry is not None
+            and self.covers(entry, period)
+            and is_fresh(entry['fetched_at'], intraday_ttl=self.intraday_ttl)
+        )
+
+    def is_fresh(self, symbol, period):
+        """มีข้อมูลที่ครอบคลุมช่วงเวลาและยังไม่หมดอายุหรือไม่"""
+        return self._usable(self._entry(symbol), period)
+
+    def fetch_period(self, symbol, period):
+        """ช่วงเวลาที่ควรดาวน์โหลดเมื่อข้อมูลหมดอายุ"""
+        # ดึงช่วงที่กว้างที่สุดระหว่างที่ขอกับที่เคยเก็บไว้ เพื่อไม่ให้ข้อมูลเดิมหดลง
+        entry = self._entry(symbol)
+        if entry is not None and self.covers(entry, period):
+            return entry['period']
+        return period
+
+    def get_history(self, symbol, period, fetcher, recent_fetcher=None):
+        """ดึงแท่งราคาจากแคช ถ้าไม่มีหรือหมดอายุจะเรียก fetcher(symbol, period)
+
+        ถ้าให้ recent_fetcher(symbol, start) มาและข้อมูลเดิมครอบคลุมช่วงเวลาแล้ว
+        จะดึงเฉพาะแท่งตั้งแต่ start มารวมกับข้อมูลเดิมแทนการดึงใหม่ทั้งช่วง
+        """
+        entry = self._entry(symbol)
+        if self._usable(entry, period):
+            return slice_period(entry['frame'], period).copy()
+
+        start = self.refresh_start(symbol, period) if recent_fetcher is not None else None
+        if start is not None and self.merge_recent(symbol, recent_fetcher(symbol, start)):
+            return slice_period(self._memory[symbol]['frame'], period).copy()
+
+        fetch_period = self.fetch_period(symbol, period)
+        df = fetcher(symbol, fetch_period)
+        if df is None or df.empty:
+            # ดึงไม่ได้ ใช้ข้อมูลเก่าที่มีไปก่อน
+            if entry is not None:
+                return slice_period(entry['frame'], period).copy()
+            return df
+
+        self.store(symbol, df, fetch_period)
+        return slice_period(self._memory[symbol]['frame'], period).copy()
+
+    def memory_usage(self):
+        """หน่วยความจำที่ข้อมูลในแคชใช้ สำหรับกำหนดขนาดแคช"""
+        with self._lock:
+            sizes = {symbol: memory_usage(entry['frame']) for symbol, entry in self._memory.items()}
+        total = sum(sizes.values())
+        return {
+            'symbols': len(sizes),
+            'bytes': total,
+            'bytes_per_symbol': total / len(sizes) if sizes else 0,
+            'by_symbol': sizes,
+        }
+
+    def invalidate(self, symbol=None):
+        """บังคับให้ดึงข้อมูลใหม่ในครั้งถัดไป"""
+        with self._lock, self._connect() as conn:
+            if symbol is None:
+                conn.execute("UPDATE meta SET fetched_at = 0")
+                for entry in self._memory.values():
+                    entry['fetched_at'] = 0
+            else:
+                conn.execute("UPDATE meta SET fetched_at = 0 WHERE symbol = ?", (symbol,))
+                if symbol in self._memory:
+                    self._memory[symbol]['fetched_at'] = 0
@@ -0,0 +1,116 @@
+import threading
+import time
+
+import pandas as pd
+import yfinance as yf
+
+from fetch_engine import ParallelFetcher
+from market_hours import is_fresh
+
+# ราคาล่าสุดของหุ้นหลายตัว (เช่นหุ้นในพอร์ต) ดึงด้วย yf.download ครั้งเดียว
+# ตัวที่ไม่มาในชุดดาวน์โหลดจะดึงทีละตัวพร้อมกันหลาย thread
+# ราคาที่ดึงแล้วใช้ซ้ำได้ ttl วินาทีระหว่างตลาดเปิด และจนถึงช่วงซื้อขายถัดไปเมื่อตลาดปิด
+# ตัวที่ดึงไม่ได้จะลองใหม่หลัง retry_after วินาที ไม่ว่าตลาดจะเปิดหรือปิด
+
+
+class QuoteService:
+    def __init__(self, ttl=60, max_workers=8, timeout=10, retry_after=60):
+        self.ttl = ttl
+        self.retry_after = retry_after
+        self.timeout = timeout
+        self.fetcher = ParallelFetcher(max_workers=max_workers, timeout=timeout)
+        # {symbol: (ราคา หรือ None ถ้าดึงไม่ได้, เวลาที่ดึง)}
+        self._quotes = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _last_close(df):
+        if df is None or df.empty or 'Close' not in df.columns:
+            return None
+        closes = df['Close'].dropna()
+        if closes.empty:
+            return None
+        return float(closes.iloc[-1])
+
+    def _download_bulk(self, symbols):
+        """ราคาปิดล่าสุดของหลายหุ้นจาก yf.download ครั้งเดียว"""
+        try:
+            data = yf.download(
+                symbols,
+                period='5d',
+                group_by='ticker',
+                auto_adjust=True,
+                threads=True,
+                progress=False,
+                timeout=self.timeout
+            )
+        except Exception as e:
+            return {}
+
+        if data is None or data.empty:
+            return {}
+
+        prices = {}
+        for symbol in symbols:
+            if isinstance(data.columns, pd.MultiIndex):
+                if symbol not in data.columns.get_level_values(0):
+                    continue
+                df = data[symbol]
+            else:
+                df = data
+            price = self._last_close(df)
+            if price is not None:
+                prices[symbol] = price
+        return prices
+
+    def _download_one(self, symbol):
+        """ราคาปิดล่าสุดของหุ้นตัวเดียว"""
+        try:
+            return self._last_close(yf.Ticker(symbol).history(period='5d', timeout=self.timeout))
+        except Exception as e:
+            return None
+
+    def _usable(self, symbol, fetched_at, now):
+        if symbol not in self._quotes:
+            return False
+        price, quoted_at = self._quotes[symbol]
+        if price is None:
+            # ดึงไม่ได้ครั้งก่อน ไม่ใช้ช่วงเวลาตลาด (ไม่เช่นนั้นหลังตลาดปิดจะไม่ลองใหม่จนถึงวันถัดไป)
+            return fetched_at - quoted_at < self.retry_after
+        return is_fresh(quoted_at, now=now, intraday_ttl=self.ttl)
+
+    def get_prices(self, symbols, now=None):
+        """{symbol: ราคาล่าสุด} ของหุ้นที่ขอ (ตัวที่ดึงไม่ได้จะไม่อยู่ใน dict)"""
+        symbols = list(dict.fromkeys(symbols))
+        fetched_at = time.time() if now is None else now
+        with self._lock:
+            stale = [symbol for symbol in symbols if not self._usable(symbol, fetched_at, now)]
+
+        if stale:
+            prices = self._download_bulk(stale) if len(stale) > 1 else {}
+            missing = [symbol for symbol in stale if symbol not in prices]
+            for symbol, price in self.fetcher.fetch(missing, self._download_one):
+                if price is not None:
+                    prices[symbol] = price
+            with self._lock:
+                for symbol in stale:
+                    price = prices.get(symbol)
+                    if price is None and symbol in self._quotes and self._quotes[symbol][0] is not None:
+                        # ดึงไม่ได้ ใช้ราคาเก่าไปก่อน และลองใหม่ในรอบถัดไป
+                        continue
+                    self._quotes[symbol] = (price, fetched_at)
+
+        with self._lock:
+            return {
+                symbol: self._quotes[symbol][0]
+                for symbol in symbols
+                if symbol in self._quotes and self._quotes[symbol][0] is not None
+            }
+
+    def invalidate(self, symbol=None):
+        """บังคับให้ดึงราคาใหม่ในครั้งถัดไป"""
+        with self._lock:
+            if symbol is None:
+                self._quotes.clear()
+            else:
+                self._quotes.pop(symbol, None)
@@ -0,0 +1,156 @@
+import json
+import os
+import sys
+import threading
+import time
+
+from market_hours import data_version, is_market_open, last_session_end, now_bangkok, to_bangkok
+
+# เก็บผลไว้มากกว่าที่หน้าจอแสดง ผู้ใช้เลือกจำนวนได้โดยไม่ต้องสแกนใหม่
+RESULT_LIMIT = 50
+
+
+def format_age(seconds):
+    """แสดงอายุของผลสแกนเป็นข้อความ"""
+    if seconds is None:
+        return "ยังไม่เคยสแกน"
+    if seconds < 60:
+        return "เมื่อสักครู่"
+    if seconds < 60 * 60:
+        return f"{int(seconds // 60)} นาทีที่แล้ว"
+    if seconds < 24 * 60 * 60:
+        return f"{int(seconds // 3600)} ชั่วโมงที่แล้ว"
+    return f"{int(seconds // 86400)} วันที่แล้ว"
+
+
+class ScanResultStore:
+    """ผลสแกนล่าสุดพร้อมเวลาที่สแกนเสร็จ เก็บเป็นไฟล์ JSON ให้หน้าเว็บอ่านได้ทันที"""
+
+    def __init__(self, filename=os.path.join("cache", "scan_results.json")):
+        self.filename = filename
+        self._mtime = None
+        self._table = {'finished_at': None, 'version': None, 'results': {}}
+        self._lock = threading.Lock()
+
+    def load(self):
+        """โหลดผลสแกนจากดิสก์ (เฉพาะเมื่อไฟล์เปลี่ยน)"""
+        try:
+            mtime = os.path.getmtime(self.filename)
+        except OSError:
+            return self._table
+        if mtime == self._mtime:
+            return self._table
+        try:
+            with open(self.filename, 'r', encoding='utf-8') as f:
+                table = json.load(f)
+            if 'results' in table:
+                self._table = table
+                self._mtime = mtime
+        except (OSError, ValueError):
+            pass
+        return self._table
+
+    def save(self, results, finished_at=None, version=None):
+        """บันทึกผลสแกนทั้งชุดแบบ atomic"""
+        table = {
+            'finished_at': time.time() if finished_at is None else finished_at,
+            'version': version,
+            'results': results,
+        }
+        directory = os.path.dirname(self.filename)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._lock:
+            tmp = f"{self.filename}.{os.getpid()}.tmp"
+            try:
+                with open(tmp, 'w', encoding='utf-8') as f:
+                    json.dump(table, f, ensure_ascii=False, default=float)
+                os.replace(tmp, self.filename)
+            except OSError:
+                if os.path.exists(tmp):
+                    os.remove(tmp)
+            self._table = table
+        return table
+
+    @property
+    def finished_at(self):
+        return self.load().get('finished_at')
+
+    def get(self, name):
+        """ผลสแกนชุด name (list ของ dict) หรือ None ถ้ายังไม่มี"""
+        return self.load()['results'].get(name)
+
+    def age(self, now=None):
+        """อายุของผลสแกนล่าสุด (วินาที) หรือ None ถ้ายังไม่เคยสแกน"""
+        finished_at = self.finished_at
+        if finished_at is None:
+            return None
+        return max(0.0, to_bangkok(now).timestamp() - finished_at)
+
+
+class ScanScheduler:
+    """สแกนหุ้นทุกแบบตามรอบเวลา: ทุก interval วินาทีระหว่างตลาดเปิด และหนึ่งครั้งหลังจบแต่ละช่วง"""
+
+    def __init__(self, analyzer, store=None, interval=15 * 60, limit=RESULT_LIMIT, poll=30):
+        self.analyzer = analyzer
+        self.store = store if store is not None else ScanResultStore()
+        self.interval = interval
+        self.limit = limit
+        self.poll = poll
+        self._stop = threading.Event()
+        self._worker = None
+
+    def is_due(self, now=None):
+        """ถึงเวลาสแกนรอบใหม่หรือยัง"""
+        now = to_bangkok(now)
+        finished_at = self.store.finished_at
+        if finished_at is None:
+            return True
+        if is_market_open(now):
+            return now.timestamp() - finished_at >= self.interval
+        # นอกเวลาซื้อขาย สแกนครั้งเดียวหลังช่วงซื้อขายล่าสุดจบ
+        return finished_at < last_session_end(now).timestamp()
+
+    def run_once(self):
+        """สแกนทุกแบบแล้วบันทึกผล"""
+        results = self.analyzer.scan_all(limit=self.limit)
+        return self.store.save(results, version=data_version(intraday_ttl=self.analyzer.price_cache.intraday_ttl))
+
+    def run_forever(self):
+        """วนสแกนตามรอบจนกว่าจะเรียก stop()"""
+        while not self._stop.is_set():
+            if self.is_due():
+                try:
+                    self.run_once()
+                    print(f"สแกนเสร็จ {now_bangkok():%Y-%m-%d %H:%M}")
+                except Exception as e:
+                    print(f"Error running scheduled scan: {e}")
+            self._stop.wait(self.poll)
+
+    def start(self):
+        """เริ่มสแกนตามรอบใน thread แยก (ใช้ใน process เดียวกับหน้าเว็บ)"""
+        if self._worker is not None and self._worker.is_alive():
+            return False
+        self._stop.clear()
+        self._worker = threading.Thread(target=self.run_forever, daemon=True)
+        self._worker.start()
+        return True
+
+    def stop(self):
+        self._stop.set()
+
+
+if __name__ == "__main__":
+    # รันเป็น worker แยก: python scan_scheduler.py [นาทีต่อรอบ] [--once]
+    from stock_analyzer import StockAnalyzer
+
+    args = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+    minutes = float(args[0]) if args else 15
+    scheduler = ScanScheduler(StockAnalyzer(), interval=minutes * 60)
+    if '--once' in sys.argv:
+        scheduler.run_once()
+    else:
+        try:
+            scheduler.run_forever()
+        except KeyboardInterrupt:
+            scheduler.stop()
@@ -0,0 +1,279 @@
+import numpy as np
+
+# เงื่อนไขของแต่ละสแกนเนอร์เขียนเป็น boolean mask บน array ใดๆ
+# ส่ง array ของแท่งล่าสุดเพื่อสแกน หรือ array 2 มิติทั้งช่วงเวลาเพื่อทดสอบย้อนหลังก็ได้
+
+MOMENTUM_COLUMNS = [
+    'Close', 'EMA_5', 'EMA_10', 'RSI_7', 'RSI_14', 'MACD', 'MACD_Signal',
+    'Volume_Ratio', 'Price_Change_1d', 'Price_Change_5d', 'ROC_5',
+    'Stoch_K', 'Stoch_D', 'ATR_Pct', 'Resistance_20'
+]
+BREAKOUT_COLUMNS = ['Close', 'Resistance_20', 'Resistance_50', 'Volume_Ratio', 'RSI_14']
+REBOUND_COLUMNS = ['Close', 'RSI_7', 'RSI_14', 'Support_20', 'MACD', 'MACD_Signal', 'Volume_Ratio']
+ALL_SCAN_COLUMNS = list(dict.fromkeys(MOMENTUM_COLUMNS + BREAKOUT_COLUMNS + REBOUND_COLUMNS))
+
+# เกณฑ์ของแต่ละสแกนเนอร์ ส่ง params (เฉพาะค่าที่ต้องการเปลี่ยน) เพื่อทดลองเกณฑ์อื่นได้ เช่นใน param_sweep
+MOMENTUM_PARAMS = {
+    'rsi_7_low': 50,
+    'rsi_7_high': 70,
+    'volume_ratio': 1.2,
+    'gain_5d': 3,
+    'roc_5': 1,
+    'stoch_max': 80,
+    'atr_pct': 2,
+    'near_resistance': 0.95,
+    # คะแนนขั้นต่ำ (%) ที่จะถือว่ามีโมเมนตัม
+    'min_pct': 50,
+}
+BREAKOUT_PARAMS = {
+    'volume_ratio': 1.3,
+    'rsi_max': 65,
+    'dist_20': 3,
+    'dist_50': 5,
+}
+REBOUND_PARAMS = {
+    'rsi_14': 35,
+    'rsi_7': 30,
+    'dist_support': 3,
+}
+
+
+def _params(defaults, params):
+    return {**defaults, **params} if params else defaults
+
+
+def momentum_signals(ind, params=None):
+    """สัญญาณโมเมนตัม 10 ข้อ คืน dict {ชื่อสัญญาณ: mask}"""
+    p = _params(MOMENTUM_PARAMS, params)
+    close = ind['Close']
+    return {
+        # 1. ราคาเหนือ EMA 5 (ระยะสั้น)
+        'EMA_5': close > ind['EMA_5'],
+        # 2. EMA 5 > EMA 10 (กระทิงระยะสั้น)
+        'EMA_CROSS': ind['EMA_5'] > ind['EMA_10'],
+        # 3. RSI 7 อยู่ในช่วงกระทิง (50-70)
+        'RSI_7': (ind['RSI_7'] > p['rsi_7_low']) & (ind['RSI_7'] < p['rsi_7_high']),
+        # 4. MACD กระทิง
+        'MACD': ind['MACD'] > ind['MACD_Signal'],
+        # 5. ปริมาณสูงกว่าค่าเฉลี่ย
+        'VOLUME': ind['Volume_Ratio'] > p['volume_ratio'],
+        # 6. ราคาเพิ่มขึ้น 5 วัน
+        'GAIN_5D': ind['Price_Change_5d'] > p['gain_5d'],
+        # 7. ROC 5 เป็นบวก
+        'ROC': ind['ROC_5'] > p['roc_5'],
+        # 8. Stochastic ในโซนกระทิง
+        'STOCH': (ind['Stoch_K'] > ind['Stoch_D']) & (ind['Stoch_K'] < p['stoch_max']),
+        # 9. ATR สูง (ความผันผวน)
+        'HIGH_ATR': ind['ATR_Pct'] > p['atr_pct'],
+        # 10. ราคาใกล้แนวต้าน ( breakout โอกาส)
+        'NEAR_RESISTANCE': close / ind['Resistance_20'] > p['near_resistance'],
+    }
+
+
+def momentum_score(ind, params=None):
+    """คะแนนโมเมนตัม (0-10)"""
+    return sum(mask.astype(int) for mask in momentum_signals(ind, params).values())
+
+
+def breakout_masks(ind, params=None):
+    """เงื่อนไข breakout แนวต้านระยะสั้น (20 วัน) และแนวต้านหลัก (50 วัน)"""
+    p = _params(BREAKOUT_PARAMS, params)
+    close = ind['Close']
+    resistance_20 = np.nan_to_num(ind['Resistance_20'])
+    resistance_50 = np.nan_to_num(ind['Resistance_50'])
+    valid = (resistance_20 > 0) & (resistance_50 > 0)
+
+    dist_20 = (resistance_20 - close) / close * 100
+    dist_50 = (resistance_50 - close) / close * 100
+
+    # ปริมาณเพิ่มขึ้น และ RSI ไม่ overbought
+    volume_surge = ind['Volume_Ratio'] > p['volume_ratio']
+    rsi_ok = ind['RSI_14'] < p['rsi_max']
+
+    short_term = valid & (dist_20 > 0) & (dist_20 < p['dist_20']) & volume_surge & rsi_ok
+    major = valid & ~short_term & (dist_50 > 0) & (dist_50 < p['dist_50']) & volume_surge
+    return {
+        'short_term': short_term,
+        'major': major,
+        'dist_20': dist_20,
+        'dist_50': dist_50,
+    }
+
+
+def rebound_masks(ind, prev, params=None):
+    """เงื่อนไข oversold รอรีบาวด์ ต้องใช้ค่า MACD ของแท่งก่อนหน้า (prev)"""
+    p = _params(REBOUND_PARAMS, params)
+    close = ind['Close']
+    rsi_oversold = ind['RSI_14'] < p['rsi_14']
+    rsi_7_oversold = ind['RSI_7'] < p['rsi_7']
+
+    # ราคาใกล้แนวรับ
+    support_20 = np.nan_to_num(ind['Support_20'])
+    has_support = support_20 > 0
+    with np.errstate(divide='ignore', invalid='ignore'):
+        dist_to_support = np.where(has_support, (close - support_20) / support_20 * 100, 999)
+    near_support = has_support & (dist_to_support > 0) & (dist_to_support < p['dist_support'])
+
+    # MACD เพิ่งตัดขึ้น
+    macd_bullish = (ind['MACD'] > ind['MACD_Signal']) & (prev['MACD'] <= prev['MACD_Signal'])
+
+    signal = (rsi_oversold | rsi_7_oversold) & (near_support | macd_bullish)
+    score = (
+        rsi_7_oversold * 2
+        + near_support * 2
+        + macd_bullish * 1
+        + (ind['Volume_Ratio'] > 1) * 1
+    )
+    return {
+        'signal': signal,
+        'score': score,
+        'near_support': near_support,
+        'macd_bullish': macd_bullish,
+        'dist_to_support': dist_to_support,
+        'support_20': support_20,
+    }
+
+
+def _latest(panel, columns, offset=0):
+    panel.compute(columns)
+    return {column: panel.latest(column, offset) for column in columns}
+
+
+def scan_momentum(panel, names, params=None):
+    """หาหุ้นโมเมนตัมจาก panel คืน list ของ dict ผลลัพธ์"""
+    p = _params(MOMENTUM_PARAMS, params)
+    latest = _latest(panel, MOMENTUM_COLUMNS)
+    signals = momentum_signals(latest, p)
+    score = sum(mask.astype(int) for mask in signals.values())
+    momentum_pct = score / 10 * 100
+
+    # เฉพาะหุ้นที่มีโมเมนตัมสูง (>= min_pct)
+    selected = np.flatnonzero((panel.bar_count > 20) & (momentum_pct >= p['min_pct']))
+
+    results = []
+    for i in selected:
+        symbol = panel.symbols[i]
+        current_price = float(latest['Close'][i])
+        pct = float(momentum_pct[i])
+        atr_pct = latest['ATR_Pct'][i]
+
+        if pct >= 80:
+            signal_type = "แข็งแกร่ง"
+            signal_emoji = "🟢"
+        elif pct >= 60:
+            signal_type = "ดี"
+            signal_emoji = "🟡"
+        else:
+            signal_type = "ปานกลาง"
+            signal_emoji = "⚪"
+
+        # คำนวณระยะเวลาที่เหมาะถือ
+        if atr_pct > 3:
+            holding_period = "1-3 วัน"
+        elif atr_pct > 2:
+            holding_period = "3-7 วัน"
+        else:
+            holding_period = "1-2 สัปดาห์"
+
+        results.append({
+            'symbol': names.get(symbol, symbol),
+            'code': symbol,
+            'price': current_price,
+            'change_1d': latest['Price_Change_1d'][i],
+            'change_5d': latest['Price_Change_5d'][i],
+            'volume_ratio': latest['Volume_Ratio'][i],
+            'rsi': latest['RSI_14'][i],
+            'momentum_score': int(score[i]),
+            'momentum_pct': pct,
+            'signal_type': signal_type,
+            'signal_emoji': signal_emoji,
+            'signals': [name for name, mask in signals.items() if mask[i]],
+            'target': current_price * 1.05,  # +5%
+            'stop_loss': current_price * 0.97,  # -3%
+            'holding_period': holding_period,
+            'atr_pct': atr_pct
+        })
+
+    return results
+
+
+def scan_breakout(panel, names, params=None):
+    """หาหุ้นที่กำลังจะ breakout จาก panel"""
+    latest = _latest(panel, BREAKOUT_COLUMNS)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        masks = breakout_masks(latest, params)
+    enough = panel.bar_count > 50
+
+    results = []
+    for i in np.flatnonzero(enough & (masks['short_term'] | masks['major'])):
+        symbol = panel.symbols[i]
+        current_price = float(latest['Close'][i])
+        volume_ratio = latest['Volume_Ratio'][i]
+        result = {
+            'symbol': names.get(symbol, symbol),
+            'code': symbol,
+            'price': current_price,
+        }
+
+        if masks['short_term'][i]:
+            resistance_20 = float(latest['Resistance_20'][i])
+            result.update({
+                'resistance_20': resistance_20,
+                'dist_to_resistance': float(masks['dist_20'][i]),
+                'volume_ratio': volume_ratio,
+                'rsi': latest['RSI_14'][i],
+                'breakout_type': "แนวต้านระยะสั้น",
+                'probability': "สูง" if volume_ratio > 1.5 else "ปานกลาง",
+                'target_1': resistance_20 * 1.03,
+                'target_2': resistance_20 * 1.05,
+                'stop_loss': current_price * 0.97
+            })
+        else:
+            resistance_50 = float(latest['Resistance_50'][i])
+            result.update({
+                'resistance_50': resistance_50,
+                'dist_to_resistance': float(masks['dist_50'][i]),
+                'volume_ratio': volume_ratio,
+                'rsi': latest['RSI_14'][i],
+                'breakout_type': "แนวต้านหลัก",
+                'probability': "ปานกลาง",
+                'target_1': resistance_50 * 1.05,
+                'target_2': resistance_50 * 1.08,
+                'stop_loss': current_price * 0.95
+            })
+        results.append(result)
+
+    return results
+
+
+def scan_rebound(panel, names, params=None):
+    """หาหุ้น oversold ที่มีโอกาสรีบาวด์จาก panel"""
+    latest = _latest(panel, REBOUND_COLUMNS)
+    prev = _latest(panel, ['MACD', 'MACD_Signal'], offset=1)
+    masks = rebound_masks(latest, prev, params)
+    enough = panel.bar_count > 20
+
+    results = []
+    for i in np.flatnonzero(enough & masks['signal']):
+        symbol = panel.symbols[i]
+        current_price = float(latest['Close'][i])
+        rebound_score = int(masks['score'][i])
+        probability = "สูง" if rebound_score >= 4 else "ปานกลาง" if rebound_score >= 3 else "ต่ำ"
+
+        results.append({
+            'symbol': names.get(symbol, symbol),
+            'code': symbol,
+            'price': current_price,
+            'rsi_14': latest['RSI_14'][i],
+            'rsi_7': latest['RSI_7'][i],
+            'support': float(masks['support_20'][i]),
+            'dist_to_support': float(masks['dist_to_support'][i]),
+            'macd_signal': "bullish" if masks['macd_bullish'][i] else "neutral",
+            'rebound_score': rebound_score,
+            'probability': probability,
+            'target_1': current_price * 1.03,
+            'target_2': current_price * 1.05,
+            'stop_loss': current_price * 0.95
+        })
+
+    return results
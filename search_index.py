@@ -0,0 +1,131 @@
+import re
+from collections import defaultdict
+
+# ดัชนีค้นหาหุ้นในหน่วยความจำ ใช้ตอบช่องค้นหาทุกครั้งที่ผู้ใช้พิมพ์ (ไม่เรียกอินเทอร์เน็ต)
+# - prefix trie ของรหัสหุ้นและคำในชื่อ (อังกฤษ/ไทย): พิมพ์ต้นคำก็เจอ
+# - trigram ของข้อความทั้งหมด: เจอคำที่อยู่กลางชื่อ และคำที่พิมพ์ผิดเล็กน้อย
+
+# ลำดับความสำคัญของผลลัพธ์ (น้อย = ขึ้นก่อน)
+RANK_EXACT = 0
+RANK_SYMBOL_PREFIX = 1
+RANK_NAME_PREFIX = 2
+RANK_FUZZY = 3
+
+# สัดส่วน trigram ของคำค้นที่ต้องพบในชื่อหุ้น จึงนับเป็นผลที่ใกล้เคียง
+MIN_SIMILARITY = 0.5
+
+_END = None
+
+
+def normalize(text):
+    """ตัวพิมพ์เล็ก ตัดช่องว่างซ้ำ และตัด .BK ท้ายรหัส"""
+    text = re.sub(r'\s+', ' ', (text or '').casefold()).strip()
+    if text.endswith('.bk'):
+        text = text[:-3]
+    return text
+
+
+def _trigrams(text):
+    text = f"  {text} "
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class SearchIndex:
+    """ดัชนีค้นหาหุ้นจากรหัสและชื่อ search() คืน [(symbol, ชื่อที่แสดง)] เรียงตามความใกล้เคียง"""
+
+    def __init__(self):
+        self._symbols = []
+        self._display = []
+        self._ids = {}
+        self._exact = {}
+        self._trie = {}
+        self._trigrams = defaultdict(set)
+
+    def __len__(self):
+        return len(self._symbols)
+
+    def __contains__(self, symbol):
+        return symbol in self._ids
+
+    def add(self, symbol, display, names=()):
+        """เพิ่มหุ้น (หรือเพิ่มชื่อให้หุ้นที่มีอยู่แล้ว) names คือชื่อบริษัทภาษาอังกฤษ/ไทย"""
+        entry_id = self._ids.get(symbol)
+        if entry_id is None:
+            entry_id = len(self._symbols)
+            self._ids[symbol] = entry_id
+            self._symbols.append(symbol)
+            self._display.append(display)
+        else:
+            self._display[entry_id] = display
+
+        code = normalize(symbol)
+        self._exact[code] = entry_id
+        self._insert(code, entry_id, RANK_SYMBOL_PREFIX)
+        texts = [code]
+
+        for name in [display, *names]:
+            name = normalize(name)
+            if not name:
+                continue
+            texts.append(name)
+            # ทั้งชื่อเต็ม (ชื่อไทยมักไม่มีช่องว่าง) และแต่ละคำในชื่อ
+            for word in {name, *name.split(' ')}:
+                if word == code:
+                    continue
+                self._insert(word, entry_id, RANK_NAME_PREFIX)
+
+        for text in texts:
+            for word in text.split(' '):
+                for gram in _trigrams(word):
+                    self._trigrams[gram].add(entry_id)
+
+    def _insert(self, word, entry_id, rank):
+        # แต่ละ node เก็บหุ้นทุกตัวที่มีคำขึ้นต้นด้วย prefix นั้น ค้นได้ในเวลาตามความยาวคำค้น
+        node = self._trie
+        for char in word:
+            node = node.setdefault(char, {})
+            matches = node.setdefault(_END, {})
+            if matches.get(entry_id, rank + 1) > rank:
+                matches[entry_id] = rank
+
+    def _prefix(self, query):
+        node = self._trie
+        for char in query:
+            node = node.get(char)
+            if node is None:
+                return {}
+        return node.get(_END, {})
+
+    def _fuzzy(self, query):
+        """หุ้นที่มี trigram ร่วมกับคำค้นมากพอ คืน {id: สัดส่วนที่พบ}"""
+        grams = _trigrams(query)
+        counts = defaultdict(int)
+        for gram in grams:
+            for entry_id in self._trigrams.get(gram, ()):
+                counts[entry_id] += 1
+        total = len(grams)
+        return {
+            entry_id: count / total
+            for entry_id, count in counts.items()
+            if count / total >= MIN_SIMILARITY
+        }
+
+    def search(self, query, limit=20):
+        """ค้นหาหุ้นจากรหัสหรือชื่อ คืน [(symbol, ชื่อที่แสดง)] สูงสุด limit รายการ"""
+        query = normalize(query)
+        if not query:
+            return []
+
+        scores = {}
+        exact = self._exact.get(query)
+        if exact is not None:
+            scores[exact] = (RANK_EXACT, 0.0)
+        for entry_id, rank in self._prefix(query).items():
+            scores.setdefault(entry_id, (rank, 0.0))
+        # ค้นแบบใกล้เคียงเฉพาะเมื่อไม่พบรหัสหรือชื่อที่ขึ้นต้นด้วยคำค้น
+        if not scores:
+            for entry_id, similarity in self._fuzzy(query).items():
+                scores.setdefault(entry_id, (RANK_FUZZY, -similarity))
+
+        ranked = sorted(scores, key=lambda entry_id: (*scores[entry_id], len(self._symbols[entry_id]), entry_id))
+        return [(self._symbols[entry_id], self._display[entry_id]) for entry_id in ranked[:limit]]
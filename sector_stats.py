@@ -0,0 +1,136 @@
+import json
+import os
+import statistics
+import threading
+import time
+
+DAY = 24 * 60 * 60
+# ดึงข้อมูลไม่ได้ทั้งหมด ลองใหม่หลังจากนี้ (วินาที)
+RETRY_AFTER = 15 * 60
+
+METRICS = ['pe', 'pb', 'div']
+
+# thread ที่กำลังคำนวณของแต่ละไฟล์ ใช้ร่วมกันทุก instance ในโปรเซส
+# (แอปสร้าง SectorStats ใหม่ได้ทุกครั้งที่ rerun จึงต้องไม่เริ่มดึงข้อมูลซ้ำซ้อน)
+_workers = {}
+_workers_lock = threading.Lock()
+# เวลาที่คำนวณไม่สำเร็จครั้งล่าสุดของแต่ละไฟล์
+_failed_at = {}
+
+
+class SectorStats:
+    def __init__(self, filename=os.path.join("cache", "sector_stats.json"), max_age=DAY):
+        self.filename = filename
+        self.max_age = max_age
+        self._table = {'updated_at': 0, 'sectors': {}}
+        self.load()
+
+    def load(self):
+        """โหลดตารางสถิติจากดิสก์"""
+        try:
+            with open(self.filename, 'r', encoding='utf-8') as f:
+                table = json.load(f)
+            if 'sectors' in table:
+                self._table = table
+        except (OSError, ValueError):
+            pass
+
+    def save(self):
+        """บันทึกตารางสถิติลงดิสก์แบบ atomic"""
+        directory = os.path.dirname(self.filename)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp = f"{self.filename}.{os.getpid()}.tmp"
+        try:
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump(self._table, f, ensure_ascii=False, indent=2)
+            os.replace(tmp, self.filename)
+        except OSError:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+
+    @property
+    def updated_at(self):
+        return self._table.get('updated_at', 0)
+
+    def is_stale(self):
+        return time.time() - self.updated_at > self.max_age
+
+    def get(self, sector_name):
+        """สถิติของหมวด (ค่าเฉลี่ย/มัธยฐานของ P/E, P/B, ปันผล) หรือ None ถ้ายังไม่มี"""
+        return self._table['sectors'].get(sector_name)
+
+    @staticmethod
+    def _summarize(values):
+        if not values:
+            return None, None
+        return sum(values) / len(values), statistics.median(values)
+
+    def refresh(self, sectors, metrics_loader):
+        """คำนวณสถิติทุกหมวดใหม่
+
+        sectors คือ dict {ชื่อหมวด: [รหัสหุ้น]} และ metrics_loader(symbol) คืน dict ที่มี pe, pb, div
+        หมวดที่ดึงข้อมูลไม่ได้เลยใช้แถวเดิม ถ้าดึงไม่ได้ทุกหมวด (เช่น Yahoo ใช้ไม่ได้) จะไม่บันทึก
+        และคืน None ตารางเดิมยังถือว่าเก่าอยู่ รอบถัดไปจะลองใหม่
+        """
+        previous = self._table['sectors']
+        collected_any = False
+        table = {}
+        for sector_name, symbols in sectors.items():
+            collected = {metric: [] for metric in METRICS}
+            for symbol in symbols:
+                try:
+                    metrics = metrics_loader(symbol)
+                except Exception:
+                    metrics = None
+                if not metrics:
+                    continue
+                for metric in METRICS:
+                    value = metrics.get(metric)
+                    if value and value > 0:
+                        collected[metric].append(value)
+
+            if not any(collected.values()):
+                if sector_name in previous:
+                    table[sector_name] = previous[sector_name]
+                continue
+            collected_any = True
+
+            row = {'count': len(symbols)}
+            for metric in METRICS:
+                mean, median = self._summarize(collected[metric])
+                row[f'{metric}_mean'] = mean
+                row[f'{metric}_median'] = median
+                row[f'{metric}_count'] = len(collected[metric])
+            table[sector_name] = row
+
+        if not collected_any:
+            _failed_at[os.path.abspath(self.filename)] = time.time()
+            return None
+
+        # สลับตารางทั้งก้อน ผู้อ่านจะไม่เห็นตารางที่คำนวณไม่เสร็จ
+        self._table = {'updated_at': time.time(), 'sectors': table}
+        self.save()
+        return table
+
+    def refresh_in_background(self, sectors, metrics_loader):
+        """คำนวณสถิติใหม่ใน thread แยก (ถ้ายังไม่มี thread ของไฟล์เดียวกันที่ทำงานอยู่)"""
+        key = os.path.abspath(self.filename)
+        with _workers_lock:
+            worker = _workers.get(key)
+            if worker is not None and worker.is_alive():
+                return False
+            # instance อื่นอาจเพิ่งคำนวณเสร็จ ใช้ตารางบนดิสก์ถ้ายังใหม่อยู่
+            self.load()
+            if not self.is_stale():
+                return False
+            if time.time() - _failed_at.get(key, 0) < RETRY_AFTER:
+                return False
+            worker = threading.Thread(
+                target=self.refresh,
+                args=(dict(sectors), metrics_loader),
+                daemon=True
+            )
+            _workers[key] = worker
+            worker.start()
+            return True
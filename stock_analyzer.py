@@ -1,63 +1,101 @@
 import yfinance as yf
 import pandas as pd
 import numpy as np
-import ta
 from datetime import datetime, timedelta
 import requests
 import time
+import itertools
+from collections.abc import Mapping
+
+from price_cache import PriceCache
+from fetch_engine import ParallelFetcher
+from fundamentals_cache import FundamentalsCache
+from sector_stats import SectorStats
+from panel import PricePanel
+from indicators import ALL_COLUMNS as INDICATOR_COLUMNS, compute_indicators, resolve as resolve_indicators
+from incremental_indicators import IncrementalIndicators
+import scanner_rules
+from universe import Universe
+from search_index import SearchIndex
+from symbol_registry import SymbolRegistry
+
+# คอลัมน์ที่ฟังก์ชันวิเคราะห์ (แนวโน้ม, RSI, MACD, ปริมาณ, แนวรับแนวต้าน) ต้องใช้
+ANALYSIS_COLUMNS = [
+    'SMA_20', 'SMA_50', 'SMA_200', 'ADX',
+    'RSI_7', 'RSI_14', 'RSI_21',
+    'MACD', 'MACD_Signal', 'MACD_Histogram',
+    'Volume_Ratio', 'Support_20', 'Resistance_20'
+]
+
+# รหัสที่ตรวจกับ Yahoo แล้วไม่พบ จะไม่ถามซ้ำภายในเวลานี้ (วินาที)
+FAILED_LOOKUP_TTL = 24 * 60 * 60
+
+class LazyStockInfo(Mapping):
+    """ข้อมูลพื้นฐานที่จะดึงจาก Yahoo เมื่อถูกใช้งานครั้งแรกเท่านั้น"""
+    
+    def __init__(self, loader, symbol):
+        self._loader = loader
+        self._symbol = symbol
+        self._data = None
+    
+    @property
+    def loaded(self):
+        return self._data is not None
+    
+    def _load(self):
+        if self._data is None:
+            self._data = self._loader(self._symbol) or {}
+        return self._data
+    
+    def __getitem__(self, key):
+        return self._load()[key]
+    
+    def __iter__(self):
+        return iter(self._load())
+    
+    def __len__(self):
+        return len(self._load())
+    
+    def __repr__(self):
+        if self._data is None:
+            return f"LazyStockInfo({self._symbol!r}, not loaded)"
+        return f"LazyStockInfo({self._symbol!r}, {self._data!r})"
 
 class StockAnalyzer:
-    def __init__(self):
-        self.thai_stocks = {
-            'ADVANC.BK': 'ADVANC',
-            'AOT.BK': 'AOT',
-            'BDMS.BK': 'BDMS',
-            'BH.BK': 'BH',
-            'BTS.BK': 'BTS',
-            'CPALL.BK': 'CPALL',
-            'CPF.BK': 'CPF',
-            'CRC.BK': 'CRC',
-            'DTAC.BK': 'DTAC',
-            'GULF.BK': 'GULF',
-            'INTUCH.BK': 'INTUCH',
-            'IVL.BK': 'IVL',
-            'KBANK.BK': 'KBANK',
-            'KTB.BK': 'KTB',
-            'PTT.BK': 'PTT',
-            'PTTEP.BK': 'PTTEP',
-            'SCB.BK': 'SCB',
-            'SCC.BK': 'SCC',
-            'SIRI.BK': 'SIRI',
-            'TISCO.BK': 'TISCO',
-            'TRUE.BK': 'TRUE',
-            'BANPU.BK': 'BANPU',
-            'CHG.BK': 'CHG',
-            'COM7.BK': 'COM7',
-            'EA.BK': 'EA',
-            'JAS.BK': 'JAS',
-            'LH.BK': 'LH',
-            'MINT.BK': 'MINT',
-            'PTG.BK': 'PTG',
-            'RATCH.BK': 'RATCH',
-            'SAWAD.BK': 'SAWAD',
-            'TMB.BK': 'TMB',
-            'TOP.BK': 'TOP',
-            'TU.BK': 'TU',
-            'WHA.BK': 'WHA'
-        }
+    def __init__(self, price_cache=None, fundamentals_cache=None, sector_stats=None, max_workers=8, fetch_timeout=20, bulk_download=True, bulk_chunk_size=50, universe=None, symbol_registry=None):
+        # แคชแท่งราคาบนดิสก์ ใช้ร่วมกันทุก session
+        self.price_cache = price_cache if price_cache is not None else PriceCache()
+        
+        # แคชข้อมูลพื้นฐาน (อายุแยกตามฟิลด์)
+        self.fundamentals = fundamentals_cache if fundamentals_cache is not None else FundamentalsCache()
+        
+        # ดึงข้อมูลหลายหุ้นพร้อมกัน (จำกัดจำนวน thread และเวลาต่อหุ้น)
+        self.fetch_timeout = fetch_timeout
+        self.fetcher = ParallelFetcher(max_workers=max_workers, timeout=fetch_timeout)
+        
+        # ใช้ yf.download ดึงหลายหุ้นในคำขอเดียวก่อนสแกน
+        self.bulk_download = bulk_download
+        self.bulk_chunk_size = bulk_chunk_size
+        
+        # รายชื่อหุ้นทั้งตลาดและหมวดของแต่ละตัว (โหลดจากไฟล์ ดู universe.py)
+        self.universe = universe if universe is not None else Universe()
+        self.thai_stocks = self.universe.names()
         
         # หมวดหมู่หุ้น
-        self.sectors = {
-            'ธนาคาร': ['KBANK.BK', 'KTB.BK', 'SCB.BK', 'TISCO.BK', 'TMB.BK'],
-            'พลังงาน': ['PTT.BK', 'PTTEP.BK', 'GULF.BK', 'BANPU.BK', 'EA.BK', 'TOP.BK', 'RATCH.BK'],
-            'สื่อสาร': ['ADVANC.BK', 'DTAC.BK', 'INTUCH.BK', 'TRUE.BK', 'JAS.BK'],
-            'ค้าปลีก': ['CPALL.BK', 'CRC.BK', 'COM7.BK'],
-            'อาหาร': ['CPF.BK', 'MINT.BK', 'TU.BK'],
-            'การแพทย์': ['BDMS.BK', 'BH.BK', 'CHG.BK'],
-            'ขนส่ง': ['AOT.BK', 'BTS.BK'],
-            'อสังหาฯ': ['SIRI.BK', 'LH.BK', 'WHA.BK'],
-            'การเงิน': ['SAWAD.BK']
-        }
+        self.sectors = self.universe.sectors()
+        
+        # รหัสที่เคยตรวจกับ Yahoo (ทั้งที่พบและไม่พบ) เก็บบนดิสก์ ใช้ได้ทันทีโดยไม่ตรวจซ้ำ
+        self.symbol_registry = symbol_registry if symbol_registry is not None else SymbolRegistry()
+        for symbol, name in self.symbol_registry.symbols().items():
+            self.thai_stocks.setdefault(symbol, name)
+        
+        # ดัชนีค้นหาหุ้นจากรหัสและชื่อ
+        self.search_index = SearchIndex()
+        for symbol, name in self.thai_stocks.items():
+            self._index_symbol(symbol, name)
+        
+        # ตารางสถิติของแต่ละหมวด (คำนวณล่วงหน้าใน background)
+        self.sector_stats = sector_stats if sector_stats is not None else SectorStats()
     
     def validate_stock_symbol(self, symbol):
         """ตรวจสอบรหัสหุ้นและแปลงเป็นรูปแบบที่ถูกต้อง"""
@@ -74,36 +112,64 @@ class StockAnalyzer:
         
         return symbol
     
-    def search_stock(self, query):
-        """ค้นหาหุ้นจากชื่อหรือรหัส"""
-        query = query.upper().strip()
-        results = []
+    def _index_symbol(self, symbol, display_name):
+        row = self.universe.get(symbol)
+        names = [row['name'], row['name_th']] if row else []
+        self.search_index.add(symbol, display_name, names)
+    
+    def search_stock(self, query, limit=20):
+        """ค้นหาหุ้นจากรหัสหรือชื่อ (อังกฤษ/ไทย) ในดัชนี ไม่เรียก Yahoo
         
-        # ค้นจากรายการที่มี
-        for symbol, name in self.thai_stocks.items():
-            if query in symbol or query in name:
-                results.append((symbol, name))
-        
-        # ถ้าไม่พบและ query น่าจะเป็นรหัสหุ้น ให้ลองใช้โดยตรง
-        if not results and len(query) > 0:
-            # ตรวจสอบว่าเป็นรหัสที่ถูกต้องหรือไม่
-            test_symbol = self.validate_stock_symbol(query)
-            try:
-                stock = yf.Ticker(test_symbol)
-                info = stock.info
-                if info and info.get('regularMarketPrice') is not None:
-                    # มีข้อมูล แสดงว่ารหัสถูกต้อง
-                    display_name = info.get('shortName', test_symbol)
-                    results.append((test_symbol, display_name))
-                    # เพิ่มเข้าไปใน thai_stocks อัตโนมัติ
-                    self.thai_stocks[test_symbol] = display_name
-            except:
-                pass
-        
-        return results
+        รหัสที่ไม่อยู่ในรายชื่อให้ตรวจด้วย lookup_symbol() เมื่อผู้ใช้สั่งเท่านั้น
+        """
+        return self.search_index.search(query, limit)
+    
+    def lookup_symbol(self, query):
+        """ตรวจรหัสหุ้นกับ Yahoo คืน (symbol, ชื่อ) หรือ None ถ้าไม่พบ
+        
+        ผลการตรวจ (ทั้งพบและไม่พบ) บันทึกใน symbol_registry รหัสที่ไม่พบจะไม่ถาม Yahoo ซ้ำ
+        ภายใน FAILED_LOOKUP_TTL วินาที
+        """
+        test_symbol = self.validate_stock_symbol(query)
+        if test_symbol in self.thai_stocks:
+            return test_symbol, self.thai_stocks[test_symbol]
+        
+        failed_at = self.symbol_registry.failed_at(test_symbol)
+        if failed_at is not None and time.time() - failed_at < FAILED_LOOKUP_TTL:
+            return None
+        
+        try:
+            stock = yf.Ticker(test_symbol)
+            info = stock.info
+            if info and info.get('regularMarketPrice') is not None:
+                # มีข้อมูล แสดงว่ารหัสถูกต้อง
+                display_name = info.get('shortName', test_symbol)
+                # เพิ่มเข้าไปใน thai_stocks และดัชนีค้นหา
+                self.thai_stocks[test_symbol] = display_name
+                self._index_symbol(test_symbol, display_name)
+                self.symbol_registry.add(test_symbol, display_name)
+                return test_symbol, display_name
+        except Exception as e:
+            # เครือข่ายมีปัญหา ไม่นับว่ารหัสผิด
+            print(f"Error looking up {test_symbol}: {e}")
+            return None
+        
+        self.symbol_registry.record_failure(test_symbol)
+        return None
     
-    def get_stock_info_from_yahoo(self, symbol):
-        """ดึงข้อมูลหุ้นจาก Yahoo Finance พร้อมรายละเอียด"""
+    def get_stock_info_from_yahoo(self, symbol, fields=None):
+        """ดึงข้อมูลหุ้นจาก Yahoo Finance พร้อมรายละเอียด (ผ่านแคชข้อมูลพื้นฐาน)
+        
+        fields คือฟิลด์ที่ต้องใช้จริง ใช้ตัดสินว่าข้อมูลในแคชยังใช้ได้หรือไม่
+        """
+        return self.fundamentals.get(symbol, self._download_stock_info, fields)
+    
+    def refresh_stock_info(self, symbol):
+        """บังคับดึงข้อมูลพื้นฐานของหุ้นใหม่จาก Yahoo"""
+        return self.fundamentals.refresh(symbol, self._download_stock_info)
+    
+    def _download_stock_info(self, symbol):
+        """ดึง .info จาก Yahoo Finance โดยตรง"""
         try:
             stock = yf.Ticker(symbol)
             info = stock.info
@@ -139,401 +205,258 @@ class StockAnalyzer:
         except Exception as e:
             return None
     
-    def get_stock_data(self, symbol, period='6mo'):
-        """ดึงข้อมูลหุ้นจาก Yahoo Finance"""
+    def _download_history(self, symbol, period):
+        """ดาวน์โหลดแท่งราคารายวันจาก Yahoo Finance โดยตรง"""
+        try:
+            stock = yf.Ticker(symbol)
+            return stock.history(period=period, timeout=self.fetch_timeout)
+        except Exception as e:
+            return None
+    
+    def _download_since(self, symbol, start):
+        """ดาวน์โหลดเฉพาะแท่งตั้งแต่วันที่ start (ใช้เติมข้อมูลในแคชให้เป็นปัจจุบัน)"""
         try:
             stock = yf.Ticker(symbol)
-            df = stock.history(period=period)
-            info = self.get_stock_info_from_yahoo(symbol)
-            return df, info
+            return stock.history(start=start.strftime('%Y-%m-%d'), timeout=self.fetch_timeout)
+        except Exception as e:
+            return None
+    
+    def _download_bulk(self, symbols, period=None, start=None):
+        """ดาวน์โหลดแท่งราคาหลายหุ้นด้วย yf.download ครั้งเดียว แยกเป็น dict ของ DataFrame
+        
+        ระบุ period เพื่อดึงทั้งช่วง หรือ start เพื่อดึงเฉพาะแท่งตั้งแต่วันที่นั้น
+        """
+        try:
+            data = yf.download(
+                symbols,
+                period=period,
+                start=start.strftime('%Y-%m-%d') if start is not None else None,
+                group_by='ticker',
+                auto_adjust=True,
+                actions=True,
+                threads=True,
+                progress=False,
+                timeout=self.fetch_timeout
+            )
         except Exception as e:
+            return {}
+        
+        if data is None or data.empty:
+            return {}
+        
+        frames = {}
+        for symbol in symbols:
+            if isinstance(data.columns, pd.MultiIndex):
+                if symbol not in data.columns.get_level_values(0):
+                    continue
+                df = data[symbol]
+            else:
+                df = data
+            
+            df = df.dropna(subset=['Close'])
+            if not df.empty:
+                frames[symbol] = df
+        
+        return frames
+    
+    def prefetch_histories(self, symbols, period='3mo'):
+        """โหลดหุ้นที่ข้อมูลในแคชหมดอายุด้วยการดาวน์โหลดแบบกลุ่ม แล้วเก็บลงแคช
+        
+        หุ้นที่มีข้อมูลครอบคลุมช่วงเวลาแล้วจะดึงเฉพาะแท่งล่าสุดมาต่อท้าย
+        ตัวที่ราคาย้อนหลังถูกปรับ (ปันผล/แตกพาร์) จะถูกดึงใหม่ทั้งช่วง
+        """
+        self.price_cache.preload(symbols)
+        stale = [symbol for symbol in symbols if not self.price_cache.is_fresh(symbol, period)]
+        
+        # จัดกลุ่มตามวันที่เริ่มดึง เพื่อให้แต่ละกลุ่มใช้คำขอเดียว
+        recent_groups = {}
+        full = []
+        for symbol in stale:
+            start = self.price_cache.refresh_start(symbol, period)
+            if start is not None:
+                recent_groups.setdefault(start, []).append(symbol)
+            else:
+                full.append(symbol)
+        
+        for start, group in recent_groups.items():
+            for i in range(0, len(group), self.bulk_chunk_size):
+                chunk = group[i:i + self.bulk_chunk_size]
+                recent = self._download_bulk(chunk, start=start)
+                for symbol in chunk:
+                    if not self.price_cache.merge_recent(symbol, recent.get(symbol)):
+                        full.append(symbol)
+        
+        # จัดกลุ่มตามช่วงเวลาที่ต้องดึง เพื่อให้แต่ละกลุ่มใช้คำขอเดียว
+        groups = {}
+        for symbol in full:
+            fetch_period = self.price_cache.fetch_period(symbol, period)
+            groups.setdefault(fetch_period, []).append(symbol)
+        
+        for fetch_period, group in groups.items():
+            for i in range(0, len(group), self.bulk_chunk_size):
+                chunk = group[i:i + self.bulk_chunk_size]
+                for symbol, df in self._download_bulk(chunk, fetch_period).items():
+                    self.price_cache.store(symbol, df, fetch_period)
+    
+    def get_bulk_history(self, symbols=None, period='3mo', long_format=False):
+        """ดึงข้อมูลหลายหุ้น (ค่าเริ่มต้นคือทุกตัวใน thai_stocks) ด้วยการดาวน์โหลดแบบกลุ่ม
+        
+        คืน dict {symbol: DataFrame} หรือ DataFrame เดียวที่มี index (Symbol, Date) ถ้า long_format=True
+        """
+        symbols = list(symbols if symbols is not None else self.thai_stocks)
+        self.prefetch_histories(symbols, period)
+        
+        frames = {}
+        for symbol in symbols:
+            # ตัวที่ไม่มาในชุดดาวน์โหลดจะถูกดึงทีละตัวตามปกติ
+            df = self.price_cache.get_history(symbol, period, self._download_history, self._download_since)
+            if df is not None and not df.empty:
+                frames[symbol] = df
+        
+        if long_format:
+            if not frames:
+                return pd.DataFrame()
+            return pd.concat(frames, names=['Symbol', 'Date'])
+        return frames
+    
+    def get_stock_history(self, symbol, period='6mo'):
+        """ดึงเฉพาะแท่งราคา ไม่ดึงข้อมูลพื้นฐาน"""
+        try:
+            return self.price_cache.get_history(symbol, period, self._download_history, self._download_since)
+        except Exception as e:
+            return None
+    
+    def get_stock_data(self, symbol, period='6mo'):
+        """ดึงข้อมูลหุ้นจาก Yahoo Finance
+        
+        info เป็น LazyStockInfo ซึ่งจะเรียก .info จาก Yahoo เมื่อถูกอ่านครั้งแรกเท่านั้น
+        """
+        df = self.get_stock_history(symbol, period)
+        if df is None:
             return None, None
+        info = LazyStockInfo(self.get_stock_info_from_yahoo, symbol)
+        return df, info
     
-    def calculate_indicators(self, df):
-        """คำนวณตัวชี้วัดทางเทคนิคแบบครบถ้วน"""
+    def calculate_indicators(self, df, columns=None):
+        """คำนวณตัวชี้วัดทางเทคนิค
+        
+        columns คือชุดคอลัมน์ที่ต้องใช้ เช่น {'EMA_5', 'RSI_7', 'MACD'} ถ้าไม่ระบุจะคำนวณครบทุกตัว
+        ตัวที่มีอยู่ใน df แล้วจะไม่คำนวณซ้ำ
+        """
         if df is None or df.empty:
             return None
         
+        # ชื่อตัวชี้วัดที่ไม่รู้จักเป็นความผิดของผู้เรียก ให้ error ออกไปเลย
+        resolve_indicators(columns)
+        
+        before = list(df.columns)
         try:
-            # RSI (3 ค่า)
-            df['RSI_7'] = ta.momentum.RSIIndicator(df['Close'], window=7).rsi()
-            df['RSI_14'] = ta.momentum.RSIIndicator(df['Close'], window=14).rsi()
-            df['RSI_21'] = ta.momentum.RSIIndicator(df['Close'], window=21).rsi()
-            
-            # Moving Averages
-            df['SMA_5'] = ta.trend.sma_indicator(df['Close'], window=5)
-            df['SMA_10'] = ta.trend.sma_indicator(df['Close'], window=10)
-            df['SMA_20'] = ta.trend.sma_indicator(df['Close'], window=20)
-            df['SMA_50'] = ta.trend.sma_indicator(df['Close'], window=50)
-            df['SMA_100'] = ta.trend.sma_indicator(df['Close'], window=100)
-            df['SMA_200'] = ta.trend.sma_indicator(df['Close'], window=200)
-            
-            df['EMA_5'] = ta.trend.ema_indicator(df['Close'], window=5)
-            df['EMA_10'] = ta.trend.ema_indicator(df['Close'], window=10)
-            df['EMA_20'] = ta.trend.ema_indicator(df['Close'], window=20)
-            df['EMA_50'] = ta.trend.ema_indicator(df['Close'], window=50)
-            
-            # MACD
-            macd = ta.trend.MACD(df['Close'])
-            df['MACD'] = macd.macd()
-            df['MACD_Signal'] = macd.macd_signal()
-            df['MACD_Histogram'] = macd.macd_diff()
-            
-            # Bollinger Bands
-            bb = ta.volatility.BollingerBands(df['Close'], window=20, window_dev=2)
-            df['BB_Upper'] = bb.bollinger_hband()
-            df['BB_Middle'] = bb.bollinger_mavg()
-            df['BB_Lower'] = bb.bollinger_lband()
-            df['BB_Width'] = (df['BB_Upper'] - df['BB_Lower']) / df['BB_Middle']
-            df['BB_Position'] = (df['Close'] - df['BB_Lower']) / (df['BB_Upper'] - df['BB_Lower'])
-            
-            # Volume
-            df['Volume_SMA'] = df['Volume'].rolling(window=20).mean()
-            df['Volume_Ratio'] = df['Volume'] / df['Volume_SMA']
-            df['Volume_5_SMA'] = df['Volume'].rolling(window=5).mean()
-            df['Volume_5_Ratio'] = df['Volume'] / df['Volume_5_SMA']
-            
-            # Support/Resistance
-            df['Resistance_20'] = df['High'].rolling(window=20).max()
-            df['Support_20'] = df['Low'].rolling(window=20).min()
-            df['Resistance_50'] = df['High'].rolling(window=50).max()
-            df['Support_50'] = df['Low'].rolling(window=50).min()
-            
-            # Price change
-            df['Price_Change_1d'] = df['Close'].pct_change(1) * 100
-            df['Price_Change_5d'] = df['Close'].pct_change(5) * 100
-            df['Price_Change_10d'] = df['Close'].pct_change(10) * 100
-            df['Price_Change_20d'] = df['Close'].pct_change(20) * 100
-            
-            # Volume change
-            df['Volume_Change'] = df['Volume'].pct_change() * 100
-            
-            # Volatility
-            df['Volatility_5'] = df['Close'].pct_change().rolling(window=5).std() * np.sqrt(252)
-            df['Volatility_20'] = df['Close'].pct_change().rolling(window=20).std() * np.sqrt(252)
-            
-            # ADX (trend strength)
-            adx = ta.trend.ADXIndicator(df['High'], df['Low'], df['Close'])
-            df['ADX'] = adx.adx()
-            df['DI_Pos'] = adx.adx_pos()
-            df['DI_Neg'] = adx.adx_neg()
-            
-            # ATR (Average True Range)
-            df['ATR'] = ta.volatility.AverageTrueRange(df['High'], df['Low'], df['Close']).average_true_range()
-            df['ATR_Pct'] = (df['ATR'] / df['Close']) * 100
-            
-            # Stochastic
-            stoch = ta.momentum.StochasticOscillator(df['High'], df['Low'], df['Close'])
-            df['Stoch_K'] = stoch.stoch()
-            df['Stoch_D'] = stoch.stoch_signal()
-            
-            # CCI (Commodity Channel Index)
-            df['CCI'] = ta.trend.CCIIndicator(df['High'], df['Low'], df['Close']).cci()
-            
-            # Money Flow Index
-            df['MFI'] = ta.volume.MFIIndicator(df['High'], df['Low'], df['Close'], df['Volume']).money_flow_index()
-            
-            # OBV (On-Balance Volume)
-            df['OBV'] = ta.volume.OnBalanceVolumeIndicator(df['Close'], df['Volume']).on_balance_volume()
-            df['OBV_Change'] = df['OBV'].pct_change() * 100
-            
-            # Momentum Indicators
-            df['Momentum_5'] = df['Close'] - df['Close'].shift(5)
-            df['Momentum_10'] = df['Close'] - df['Close'].shift(10)
-            df['Momentum_5_Pct'] = (df['Momentum_5'] / df['Close'].shift(5)) * 100
-            df['Momentum_10_Pct'] = (df['Momentum_10'] / df['Close'].shift(10)) * 100
-            
-            # Rate of Change
-            df['ROC_5'] = ta.momentum.ROCIndicator(df['Close'], window=5).roc()
-            df['ROC_10'] = ta.momentum.ROCIndicator(df['Close'], window=10).roc()
-            df['ROC_20'] = ta.momentum.ROCIndicator(df['Close'], window=20).roc()
-            
+            compute_indicators(df, columns)
         except Exception as e:
             print(f"Error calculating indicators: {e}")
+        
+        # family คำนวณพร้อมกันทำให้คอลัมน์ใหม่เรียงตามลำดับที่คำนวณ จัดให้เรียงตามทะเบียนตัวชี้วัดเหมือนเดิม
+        added = [column for column in INDICATOR_COLUMNS if column in df.columns and column not in before]
+        ordered = before + added + [column for column in df.columns if column not in before and column not in added]
+        if ordered != list(df.columns):
+            df = df[ordered]
             
         return df
     
-    def scan_momentum_stocks(self, limit=20, progress_callback=None):
-        """สแกนหาหุ้นที่มีโมเมนตัมสำหรับเล่นสั้น"""
-        results = []
+    def get_indicator_stream(self, symbol, period='1y'):
+        """สร้างตัวชี้วัดแบบเพิ่มทีละแท่งจากข้อมูลย้อนหลัง สำหรับติดตามราคาแบบสด
         
-        total_stocks = len(self.thai_stocks)
+        แท่งใหม่ส่งเข้า stream.update(high, low, close, volume) โดยไม่ต้องคำนวณย้อนหลังใหม่
+        ราคาระหว่างวันของแท่งล่าสุดที่ยังไม่ปิดส่งเข้า stream.update_last(...) แทน
+        """
+        df = self.get_stock_history(symbol, period)
+        if df is None or df.empty:
+            return None
+        return IncrementalIndicators.from_history(df)
+    
+    def iter_stock_histories(self, symbols, period='3mo', progress_callback=None):
+        """ดึงข้อมูลหลายหุ้นพร้อมกัน และส่ง (symbol, df) ออกมาตามลำดับที่โหลดเสร็จ"""
+        symbols = list(symbols)
+        total = len(symbols)
         
-        for i, (symbol, name) in enumerate(self.thai_stocks.items()):
-            
+        if self.bulk_download:
+            self.prefetch_histories(symbols, period)
+        else:
+            self.price_cache.preload(symbols)
+        
+        def load(symbol):
+            return self.get_stock_history(symbol, period=period)
+        
+        # ตัวที่ข้อมูลในแคชยังใช้ได้อ่านจากหน่วยความจำทันที ไม่ต้องผ่าน thread pool
+        cached = [symbol for symbol in symbols if self.price_cache.is_fresh(symbol, period)]
+        cached_set = set(cached)
+        remaining = [symbol for symbol in symbols if symbol not in cached_set]
+        loaded = itertools.chain(
+            ((symbol, load(symbol)) for symbol in cached),
+            self.fetcher.fetch(remaining, load)
+        )
+        
+        for i, (symbol, df) in enumerate(loaded):
             if progress_callback:
-                progress_callback(i, total_stocks, f"กำลังสแกน {name}...")
-            
-            try:
-                # ดึงข้อมูล 3 เดือนล่าสุด
-                df, info = self.get_stock_data(symbol, period='3mo')
-                
-                if df is not None and not df.empty and len(df) > 20:
-                    df = self.calculate_indicators(df)
-                    
-                    # ข้อมูลล่าสุด
-                    latest = df.iloc[-1]
-                    prev = df.iloc[-2] if len(df) > 1 else latest
-                    
-                    current_price = latest['Close']
-                    prev_price = prev['Close']
-                    
-                    # คำนวณโมเมนตัมสัญญาณ
-                    momentum_score = 0
-                    signals = []
-                    
-                    # 1. ราคาเหนือ EMA 5 (ระยะสั้น)
-                    if not pd.isna(latest['EMA_5']) and current_price > latest['EMA_5']:
-                        momentum_score += 1
-                        signals.append("EMA_5")
-                    
-                    # 2. EMA 5 > EMA 10 (กระทิงระยะสั้น)
-                    if not pd.isna(latest['EMA_5']) and not pd.isna(latest['EMA_10']) and latest['EMA_5'] > latest['EMA_10']:
-                        momentum_score += 1
-                        signals.append("EMA_CROSS")
-                    
-                    # 3. RSI 7 อยู่ในช่วงกระทิง (50-70)
-                    if not pd.isna(latest['RSI_7']) and 50 < latest['RSI_7'] < 70:
-                        momentum_score += 1
-                        signals.append("RSI_7")
-                    
-                    # 4. MACD กระทิง
-                    if not pd.isna(latest['MACD']) and not pd.isna(latest['MACD_Signal']) and latest['MACD'] > latest['MACD_Signal']:
-                        momentum_score += 1
-                        signals.append("MACD")
-                    
-                    # 5. ปริมาณสูงกว่าค่าเฉลี่ย
-                    if not pd.isna(latest['Volume_Ratio']) and latest['Volume_Ratio'] > 1.2:
-                        momentum_score += 1
-                        signals.append("VOLUME")
-                    
-                    # 6. ราคาเพิ่มขึ้น 5 วัน
-                    if not pd.isna(latest['Price_Change_5d']) and latest['Price_Change_5d'] > 3:
-                        momentum_score += 1
-                        signals.append("GAIN_5D")
-                    
-                    # 7. ROC 5 เป็นบวก
-                    if not pd.isna(latest['ROC_5']) and latest['ROC_5'] > 1:
-                        momentum_score += 1
-                        signals.append("ROC")
-                    
-                    # 8. Stochastic ในโซนกระทิง
-                    if not pd.isna(latest['Stoch_K']) and not pd.isna(latest['Stoch_D']) and latest['Stoch_K'] > latest['Stoch_D'] and latest['Stoch_K'] < 80:
-                        momentum_score += 1
-                        signals.append("STOCH")
-                    
-                    # 9. ATR สูง (ความผันผวน)
-                    if not pd.isna(latest['ATR_Pct']) and latest['ATR_Pct'] > 2:
-                        momentum_score += 1
-                        signals.append("HIGH_ATR")
-                    
-                    # 10. ราคาใกล้แนวต้าน ( breakout โอกาส)
-                    if not pd.isna(latest['Resistance_20']) and current_price / latest['Resistance_20'] > 0.95:
-                        momentum_score += 1
-                        signals.append("NEAR_RESISTANCE")
-                    
-                    # คำนวณเปอร์เซ็นต์โมเมนตัม
-                    momentum_pct = (momentum_score / 10) * 100
-                    
-                    # เฉพาะหุ้นที่มีโมเมนตัมสูง (> 50%)
-                    if momentum_pct >= 50:
-                        # หาสัญญาณเพิ่มเติม
-                        if momentum_pct >= 80:
-                            signal_type = "แข็งแกร่ง"
-                            signal_emoji = "🟢"
-                        elif momentum_pct >= 60:
-                            signal_type = "ดี"
-                            signal_emoji = "🟡"
-                        else:
-                            signal_type = "ปานกลาง"
-                            signal_emoji = "⚪"
-                        
-                        # ราคาเป้าหมายระยะสั้น
-                        target_price = current_price * 1.05  # +5%
-                        stop_loss = current_price * 0.97  # -3%
-                        
-                        # คำนวณระยะเวลาที่เหมาะถือ
-                        if latest['ATR_Pct'] > 3:
-                            holding_period = "1-3 วัน"
-                        elif latest['ATR_Pct'] > 2:
-                            holding_period = "3-7 วัน"
-                        else:
-                            holding_period = "1-2 สัปดาห์"
-                        
-                        results.append({
-                            'symbol': name,
-                            'code': symbol,
-                            'price': current_price,
-                            'change_1d': latest.get('Price_Change_1d', 0),
-                            'change_5d': latest.get('Price_Change_5d', 0),
-                            'volume_ratio': latest.get('Volume_Ratio', 1),
-                            'rsi': latest.get('RSI_14', 50),
-                            'momentum_score': momentum_score,
-                            'momentum_pct': momentum_pct,
-                            'signal_type': signal_type,
-                            'signal_emoji': signal_emoji,
-                            'signals': signals,
-                            'target': target_price,
-                            'stop_loss': stop_loss,
-                            'holding_period': holding_period,
-                            'atr_pct': latest.get('ATR_Pct', 0)
-                        })
-            
-            except Exception as e:
-                pass
+                name = self.thai_stocks.get(symbol, symbol)
+                progress_callback(i + 1, total, f"โหลด {name} แล้ว")
+            yield symbol, df
+    
+    def load_panel(self, symbols=None, period='3mo', progress_callback=None):
+        """โหลดข้อมูลหลายหุ้นแล้วรวมเป็น PricePanel (หุ้น x วันที่)"""
+        if symbols is None:
+            symbols = self.thai_stocks
+        loaded = dict(self.iter_stock_histories(symbols, period=period, progress_callback=progress_callback))
+        # เรียงตามรายชื่อที่ขอ (ไม่ใช่ลำดับที่โหลดเสร็จ) ผลที่คะแนนเท่ากันจะเรียงเหมือนเดิมทุกครั้ง
+        frames = {symbol: loaded[symbol] for symbol in symbols if symbol in loaded}
+        return PricePanel.from_frames(frames)
+    
+    def scan_momentum_stocks(self, limit=20, progress_callback=None, panel=None):
+        """สแกนหาหุ้นที่มีโมเมนตัมสำหรับเล่นสั้น"""
+        if panel is None:
+            panel = self.load_panel(period='3mo', progress_callback=progress_callback)
+        results = scanner_rules.scan_momentum(panel, self.thai_stocks)
         
         # เรียงตามโมเมนตัมสูงสุด
         results.sort(key=lambda x: x['momentum_pct'], reverse=True)
         
         return results[:limit]
     
-    def scan_breakout_stocks(self, limit=20):
+    def scan_breakout_stocks(self, limit=20, progress_callback=None, panel=None):
         """สแกนหาหุ้นที่กำลังจะ breakout"""
-        results = []
-        
-        for symbol, name in self.thai_stocks.items():
-            try:
-                df, info = self.get_stock_data(symbol, period='3mo')
-                
-                if df is not None and not df.empty and len(df) > 50:
-                    df = self.calculate_indicators(df)
-                    
-                    latest = df.iloc[-1]
-                    current_price = latest['Close']
-                    
-                    # หาแนวต้านสำคัญ
-                    resistance_50 = latest['Resistance_50'] if not pd.isna(latest['Resistance_50']) else 0
-                    resistance_20 = latest['Resistance_20'] if not pd.isna(latest['Resistance_20']) else 0
-                    
-                    if resistance_20 > 0 and resistance_50 > 0:
-                        # ใกล้แนวต้าน 50 วัน
-                        dist_to_resistance_50 = ((resistance_50 - current_price) / current_price) * 100
-                        
-                        # ใกล้แนวต้าน 20 วัน
-                        dist_to_resistance_20 = ((resistance_20 - current_price) / current_price) * 100
-                        
-                        # ปริมาณเพิ่มขึ้น
-                        volume_surge = not pd.isna(latest['Volume_Ratio']) and latest['Volume_Ratio'] > 1.3
-                        
-                        # RSI ไม่ overbought
-                        rsi_ok = not pd.isna(latest['RSI_14']) and latest['RSI_14'] < 65
-                        
-                        # เงื่อนไข breakout
-                        if 0 < dist_to_resistance_20 < 3 and volume_surge and rsi_ok:
-                            breakout_type = "แนวต้านระยะสั้น"
-                            probability = "สูง" if latest['Volume_Ratio'] > 1.5 else "ปานกลาง"
-                            
-                            results.append({
-                                'symbol': name,
-                                'code': symbol,
-                                'price': current_price,
-                                'resistance_20': resistance_20,
-                                'dist_to_resistance': dist_to_resistance_20,
-                                'volume_ratio': latest['Volume_Ratio'],
-                                'rsi': latest['RSI_14'],
-                                'breakout_type': breakout_type,
-                                'probability': probability,
-                                'target_1': resistance_20 * 1.03,
-                                'target_2': resistance_20 * 1.05,
-                                'stop_loss': current_price * 0.97
-                            })
-                        
-                        elif 0 < dist_to_resistance_50 < 5 and volume_surge:
-                            breakout_type = "แนวต้านหลัก"
-                            probability = "ปานกลาง"
-                            
-                            results.append({
-                                'symbol': name,
-                                'code': symbol,
-                                'price': current_price,
-                                'resistance_50': resistance_50,
-                                'dist_to_resistance': dist_to_resistance_50,
-                                'volume_ratio': latest['Volume_Ratio'],
-                                'rsi': latest['RSI_14'],
-                                'breakout_type': breakout_type,
-                                'probability': probability,
-                                'target_1': resistance_50 * 1.05,
-                                'target_2': resistance_50 * 1.08,
-                                'stop_loss': current_price * 0.95
-                            })
-            
-            except Exception as e:
-                pass
+        if panel is None:
+            panel = self.load_panel(period='3mo', progress_callback=progress_callback)
+        results = scanner_rules.scan_breakout(panel, self.thai_stocks)
         
         # เรียงตามระยะห่างจากแนวต้าน
         results.sort(key=lambda x: x['dist_to_resistance'])
         
         return results[:limit]
     
-    def scan_oversold_rebound(self, limit=20):
+    def scan_oversold_rebound(self, limit=20, progress_callback=None, panel=None):
         """สแกนหาหุ้นที่ oversold และมีโอกาสรีบาวด์"""
-        results = []
-        
-        for symbol, name in self.thai_stocks.items():
-            try:
-                df, info = self.get_stock_data(symbol, period='3mo')
-                
-                if df is not None and not df.empty and len(df) > 20:
-                    df = self.calculate_indicators(df)
-                    
-                    latest = df.iloc[-1]
-                    current_price = latest['Close']
-                    
-                    # เงื่อนไข oversold
-                    rsi_oversold = not pd.isna(latest['RSI_14']) and latest['RSI_14'] < 35
-                    rsi_7_oversold = not pd.isna(latest['RSI_7']) and latest['RSI_7'] < 30
-                    
-                    # ราคาใกล้แนวรับ
-                    support_20 = latest['Support_20'] if not pd.isna(latest['Support_20']) else 0
-                    near_support = False
-                    dist_to_support = 999
-                    if support_20 > 0:
-                        dist_to_support = ((current_price - support_20) / support_20) * 100
-                        near_support = 0 < dist_to_support < 3
-                    
-                    # MACD เริ่มมีสัญญาณซื้อ
-                    macd_bullish = False
-                    if not pd.isna(latest['MACD']) and not pd.isna(latest['MACD_Signal']):
-                        prev = df.iloc[-2]
-                        macd_bullish = latest['MACD'] > latest['MACD_Signal'] and prev['MACD'] <= prev['MACD_Signal']
-                    
-                    if (rsi_oversold or rsi_7_oversold) and (near_support or macd_bullish):
-                        rebound_score = 0
-                        if rsi_7_oversold:
-                            rebound_score += 2
-                        if near_support:
-                            rebound_score += 2
-                        if macd_bullish:
-                            rebound_score += 1
-                        if not pd.isna(latest['Volume_Ratio']) and latest['Volume_Ratio'] > 1:
-                            rebound_score += 1
-                        
-                        probability = "สูง" if rebound_score >= 4 else "ปานกลาง" if rebound_score >= 3 else "ต่ำ"
-                        
-                        results.append({
-                            'symbol': name,
-                            'code': symbol,
-                            'price': current_price,
-                            'rsi_14': latest['RSI_14'],
-                            'rsi_7': latest['RSI_7'],
-                            'support': support_20,
-                            'dist_to_support': dist_to_support,
-                            'macd_signal': "bullish" if macd_bullish else "neutral",
-                            'rebound_score': rebound_score,
-                            'probability': probability,
-                            'target_1': current_price * 1.03,
-                            'target_2': current_price * 1.05,
-                            'stop_loss': current_price * 0.95
-                        })
-            
-            except Exception as e:
-                pass
+        if panel is None:
+            panel = self.load_panel(period='3mo', progress_callback=progress_callback)
+        results = scanner_rules.scan_rebound(panel, self.thai_stocks)
         
         # เรียงตามคะแนนรีบาวด์
         results.sort(key=lambda x: x['rebound_score'], reverse=True)
         
         return results[:limit]
     
+    def scan_all(self, limit=20, progress_callback=None):
+        """สแกนทั้งสามแบบจากข้อมูลชุดเดียวกัน (โหลดและคำนวณตัวชี้วัดครั้งเดียวต่อหุ้น)
+
+        คืน dict {'momentum': [...], 'breakout': [...], 'rebound': [...]}
+        """
+        panel = self.load_panel(period='3mo', progress_callback=progress_callback)
+        panel.compute(scanner_rules.ALL_SCAN_COLUMNS)
+        return {
+            'momentum': self.scan_momentum_stocks(limit, panel=panel),
+            'breakout': self.scan_breakout_stocks(limit, panel=panel),
+            'rebound': self.scan_oversold_rebound(limit, panel=panel),
+        }
+    
     def get_trend_analysis(self, df):
         """วิเคราะห์แนวโน้มแบบละเอียด"""
         if df is None or df.empty:
@@ -757,7 +680,7 @@ class StockAnalyzer:
         """ดึงข้อมูลปันผลที่ถูกต้อง"""
         try:
             # ถ้า info เป็น None หรือไม่มีข้อมูล
-            if info is None or not isinstance(info, dict):
+            if info is None or not isinstance(info, Mapping):
                 return {
                     'dividend_yield': 0,
                     'payout_ratio': 0,
@@ -971,13 +894,55 @@ class StockAnalyzer:
         
         return final_score, rating, emoji, details
     
+    def get_sector_of(self, symbol):
+        """หาหมวดของหุ้นจาก self.sectors"""
+        for sector_name, symbols in self.sectors.items():
+            if symbol in symbols:
+                return sector_name
+        return None
+    
+    def _sector_peer_metrics(self, symbol):
+        """P/E, P/B และปันผล (%) ของหุ้นหนึ่งตัว สำหรับคำนวณสถิติหมวด"""
+        info = self.get_stock_info_from_yahoo(symbol, fields=['pe', 'pb', 'dividend_yield'])
+        if not info:
+            return None
+        return {
+            'pe': info.get('pe'),
+            'pb': info.get('pb'),
+            'div': self.get_dividend_info(info)['dividend_yield']
+        }
+    
+    def refresh_sector_stats(self, background=True):
+        """คำนวณตารางสถิติหมวดใหม่"""
+        if background:
+            return self.sector_stats.refresh_in_background(self.sectors, self._sector_peer_metrics)
+        return self.sector_stats.refresh(self.sectors, self._sector_peer_metrics)
+    
+    @staticmethod
+    def _compare_ratio(value, sector_value, low_text, high_text):
+        ratio = value / sector_value
+        if ratio < 0.8:
+            return low_text
+        elif ratio > 1.2:
+            return high_text
+        return "ใกล้เคียงหมวด"
+    
     def compare_with_sector(self, symbol, info):
-        """เปรียบเทียบกับหุ้นในหมวดเดียวกัน"""
+        """เปรียบเทียบกับหุ้นในหมวดเดียวกัน (อ่านจากตารางสถิติหมวด)"""
         if not info:
             return {}
         
-        sector = info.get('sector', '')
-        if not sector:
+        # หาหมวดจากรหัสหุ้นก่อน ถ้าไม่พบค่อยเทียบจากชื่อหมวดของ Yahoo
+        sector_name = self.get_sector_of(symbol)
+        if sector_name is None:
+            sector = info.get('sector', '')
+            if not sector:
+                return {}
+            for name in self.sectors:
+                if name in sector or sector in name:
+                    sector_name = name
+                    break
+        if sector_name is None:
             return {}
         
         comparison = {
@@ -986,40 +951,34 @@ class StockAnalyzer:
             'div_vs_sector': 'N/A'
         }
         
-        # หาค่าเฉลี่ยของหมวด
-        sector_pe = []
-        sector_pb = []
-        sector_div = []
+        if self.sector_stats.is_stale():
+            self.refresh_sector_stats(background=True)
         
-        # ถ้ามีการกำหนดหมวดใน self.sectors
-        for sector_name, symbols in self.sectors.items():
-            if sector_name in sector or sector in sector_name:
-                for sym in symbols:
-                    try:
-                        stock = yf.Ticker(sym)
-                        s_info = stock.info
-                        if s_info.get('trailingPE'):
-                            sector_pe.append(s_info.get('trailingPE'))
-                        if s_info.get('priceToBook'):
-                            sector_pb.append(s_info.get('priceToBook'))
-                        if s_info.get('dividendYield'):
-                            div = s_info.get('dividendYield')
-                            if div and div < 1:
-                                sector_div.append(div * 100)
-                            else:
-                                sector_div.append(div)
-                    except:
-                        pass
-                break
-        
-        if sector_pe and info.get('pe'):
-            avg_pe = sum(sector_pe) / len(sector_pe)
-            pe_ratio = info.get('pe') / avg_pe
-            if pe_ratio < 0.8:
-                comparison['pe_vs_sector'] = "ต่ำกว่าหมวด (ถูก)"
-            elif pe_ratio > 1.2:
-                comparison['pe_vs_sector'] = "สูงกว่าหมวด (แพง)"
-            else:
-                comparison['pe_vs_sector'] = "ใกล้เคียงหมวด"
+        stats = self.sector_stats.get(sector_name)
+        if not stats:
+            return comparison
+        
+        comparison['sector'] = sector_name
+        
+        pe = info.get('pe')
+        if pe and pe > 0 and stats.get('pe_mean'):
+            comparison['sector_pe'] = stats['pe_mean']
+            comparison['pe_vs_sector'] = self._compare_ratio(
+                pe, stats['pe_mean'], "ต่ำกว่าหมวด (ถูก)", "สูงกว่าหมวด (แพง)"
+            )
+        
+        pb = info.get('pb')
+        if pb and pb > 0 and stats.get('pb_mean'):
+            comparison['sector_pb'] = stats['pb_mean']
+            comparison['pb_vs_sector'] = self._compare_ratio(
+                pb, stats['pb_mean'], "ต่ำกว่าหมวด (ถูก)", "สูงกว่าหมวด (แพง)"
+            )
+        
+        div = self.get_dividend_info(info)['dividend_yield']
+        if div and div > 0 and stats.get('div_mean'):
+            comparison['sector_div'] = stats['div_mean']
+            comparison['div_vs_sector'] = self._compare_ratio(
+                div, stats['div_mean'], "ปันผลต่ำกว่าหมวด", "ปันผลสูงกว่าหมวด"
+            )
         
         return comparison
@@ -0,0 +1,97 @@
+import json
+import os
+import threading
+import time
+
+# รหัสหุ้นที่ผู้ใช้ค้นเจอจาก Yahoo (นอกรายชื่อใน universe) และรหัสที่ตรวจแล้วไม่พบ
+# เก็บเป็นไฟล์ JSON ให้โหลดได้ทันทีตอนเปิดโปรแกรมโดยไม่ต้องตรวจกับ Yahoo ซ้ำ
+
+
+class SymbolRegistry:
+    def __init__(self, filename=os.path.join("cache", "symbols.json")):
+        self.filename = filename
+        self._lock = threading.RLock()
+        self._mtime = None
+        self._data = {'symbols': {}, 'failed': {}}
+        self._reload()
+
+    def _reload(self):
+        """โหลดไฟล์ใหม่ถ้ามี session อื่นเขียนทับไว้"""
+        try:
+            mtime = os.path.getmtime(self.filename)
+        except OSError:
+            return
+        if mtime == self._mtime:
+            return
+        try:
+            with open(self.filename, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            self._data = {
+                'symbols': dict(data.get('symbols', {})),
+                'failed': dict(data.get('failed', {})),
+            }
+            self._mtime = mtime
+        except (OSError, ValueError, AttributeError):
+            pass
+
+    def _save(self):
+        """บันทึกลงดิสก์แบบ atomic"""
+        directory = os.path.dirname(self.filename)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp = f"{self.filename}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump(self._data, f, ensure_ascii=False)
+            os.replace(tmp, self.filename)
+            self._mtime = os.path.getmtime(self.filename)
+        except OSError:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+
+    def symbols(self):
+        """{symbol: ชื่อที่แสดง} ของรหัสที่เคยตรวจพบ"""
+        with self._lock:
+            self._reload()
+            return {symbol: record['name'] for symbol, record in self._data['symbols'].items()}
+
+    def get(self, symbol):
+        """{'name', 'validated_at'} ของรหัสที่เคยตรวจพบ หรือ None"""
+        with self._lock:
+            self._reload()
+            record = self._data['symbols'].get(symbol)
+            return dict(record) if record else None
+
+    def add(self, symbol, name, validated_at=None):
+        """บันทึกรหัสที่ตรวจกับ Yahoo แล้วพบ (ลบออกจากรายการที่ไม่พบด้วย)"""
+        with self._lock:
+            self._reload()
+            self._data['symbols'][symbol] = {
+                'name': name,
+                'validated_at': time.time() if validated_at is None else validated_at,
+            }
+            self._data['failed'].pop(symbol, None)
+            self._save()
+
+    def failed_at(self, symbol):
+        """เวลาที่ตรวจรหัสนี้แล้วไม่พบครั้งล่าสุด หรือ None"""
+        with self._lock:
+            self._reload()
+            return self._data['failed'].get(symbol)
+
+    def record_failure(self, symbol, failed_at=None):
+        """บันทึกรหัสที่ตรวจกับ Yahoo แล้วไม่พบ"""
+        with self._lock:
+            self._reload()
+            self._data['failed'][symbol] = time.time() if failed_at is None else failed_at
+            self._save()
+
+    def forget(self, symbol):
+        """ลบรหัสออกจากทั้งสองรายการ"""
+        with self._lock:
+            self._reload()
+            removed = self._data['symbols'].pop(symbol, None) is not None
+            removed = self._data['failed'].pop(symbol, None) is not None or removed
+            if removed:
+                self._save()
+            return removed
@@ -0,0 +1,231 @@
+import csv
+import os
+import sys
+from html.parser import HTMLParser
+
+import requests
+
+# รายชื่อหุ้นที่สแกน (SET และ mai) พร้อมหมวดของแต่ละตัว
+# ไฟล์ที่แนบมากับโปรแกรมอยู่ที่ data/set_universe.csv (เฉพาะหุ้นหลักใน SET) ถ้ามีไฟล์ data/universe_local.csv
+# จะใช้ไฟล์นั้นแทน สร้างรายชื่อเต็มทั้ง SET และ mai (ประมาณ 800 ตัว) ได้ด้วย
+#   python universe.py [URL หรือไฟล์รายชื่อบริษัทจดทะเบียนที่ดาวน์โหลดจากเว็บตลาดหลักทรัพย์]
+# คอลัมน์: symbol (ไม่มี .BK), name, name_th, market (SET/mai), sector
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+BUNDLED_FILE = os.path.join(DATA_DIR, "set_universe.csv")
+LOCAL_FILE = os.path.join(DATA_DIR, "universe_local.csv")
+SUFFIX = '.BK'
+COLUMNS = ['symbol', 'name', 'name_th', 'market', 'sector']
+
+# รายชื่อบริษัทจดทะเบียนทั้งหมดของตลาดหลักทรัพย์ (ตาราง HTML ที่มีคอลัมน์ Symbol, Company, Market, Industry, Sector)
+SET_LISTED_URL = "https://www.set.or.th/dat/eod/listedcompany/static/listedCompanies_en_US.xls"
+
+# ชื่อหมวดภาษาไทย (ตรงกับไฟล์ที่แนบมา) ของรหัสหมวดธุรกิจ SET และรหัสกลุ่มอุตสาหกรรมของ mai
+SECTOR_NAMES = {
+    'AGRI': 'เกษตร', 'FOOD': 'อาหาร', 'FASHION': 'แฟชั่น', 'HOME': 'ของใช้ในครัวเรือน',
+    'PERSON': 'ของใช้ส่วนตัวและเวชภัณฑ์', 'BANK': 'ธนาคาร', 'FIN': 'การเงิน', 'INSUR': 'ประกันภัย',
+    'AUTO': 'ยานยนต์', 'IMM': 'เครื่องจักรและอุปกรณ์', 'PAPER': 'กระดาษ', 'PETRO': 'ปิโตรเคมี',
+    'PKG': 'บรรจุภัณฑ์', 'STEEL': 'เหล็ก', 'CONMAT': 'วัสดุก่อสร้าง', 'PROP': 'อสังหาฯ',
+    'PF&REIT': 'กองทุนอสังหาฯ และ REIT', 'CONS': 'รับเหมาก่อสร้าง', 'ENERG': 'พลังงาน',
+    'MINE': 'เหมืองแร่', 'COMM': 'ค้าปลีก', 'HELTH': 'การแพทย์', 'MEDIA': 'สื่อและบันเทิง',
+    'PROF': 'บริการเฉพาะกิจ', 'TOURISM': 'ท่องเที่ยว', 'TRANS': 'ขนส่ง', 'ETRON': 'อิเล็กทรอนิกส์',
+    'ICT': 'สื่อสาร',
+    'AGRO': 'เกษตรและอาหาร', 'CONSUMP': 'สินค้าอุปโภคบริโภค', 'FINCIAL': 'การเงิน',
+    'INDUS': 'สินค้าอุตสาหกรรม', 'PROPCON': 'อสังหาฯ', 'RESOURC': 'ทรัพยากร',
+    'SERVICE': 'บริการ', 'TECH': 'เทคโนโลยี',
+}
+
+
+def to_yahoo(symbol):
+    """แปลงรหัสหุ้นเป็นรูปแบบของ Yahoo (ต่อท้าย .BK)"""
+    symbol = symbol.upper().strip()
+    return symbol if symbol.endswith(SUFFIX) else f"{symbol}{SUFFIX}"
+
+
+class Universe:
+    """รายชื่อหุ้นทั้งตลาด โหลดจากไฟล์ CSV ครั้งเดียวแล้วเก็บไว้ในหน่วยความจำ"""
+
+    def __init__(self, filename=BUNDLED_FILE, local_filename=LOCAL_FILE):
+        self.filename = filename
+        self.local_filename = local_filename
+        self.source = None
+        self._rows = {}
+        self.load()
+
+    def load(self):
+        """โหลดรายชื่อ (ไฟล์ของผู้ใช้ก่อน ถ้าไม่มีหรืออ่านไม่ได้ใช้ไฟล์ที่แนบมา)"""
+        for filename in (self.local_filename, self.filename):
+            if not filename or not os.path.exists(filename):
+                continue
+            try:
+                rows = self._read(filename)
+            except (OSError, ValueError, csv.Error) as e:
+                print(f"Error loading universe {filename}: {e}")
+                continue
+            if rows:
+                self._rows = rows
+                self.source = filename
+                break
+        return self._rows
+
+    @staticmethod
+    def _read(filename):
+        rows = {}
+        with open(filename, 'r', encoding='utf-8-sig', newline='') as f:
+            for record in csv.DictReader(f):
+                ticker = (record.get('symbol') or '').upper().strip()
+                if not ticker:
+                    continue
+                if ticker.endswith(SUFFIX):
+                    ticker = ticker[:-len(SUFFIX)]
+                rows[to_yahoo(ticker)] = {
+                    'ticker': ticker,
+                    'name': (record.get('name') or '').strip() or ticker,
+                    'name_th': (record.get('name_th') or '').strip(),
+                    'market': (record.get('market') or 'SET').strip(),
+                    'sector': (record.get('sector') or '').strip() or 'อื่นๆ',
+                }
+        return rows
+
+    def __len__(self):
+        return len(self._rows)
+
+    def __contains__(self, symbol):
+        return to_yahoo(symbol) in self._rows
+
+    def get(self, symbol):
+        """ข้อมูลของหุ้น (ticker, name, name_th, market, sector) หรือ None ถ้าไม่อยู่ในรายชื่อ"""
+        return self._rows.get(to_yahoo(symbol))
+
+    def symbols(self, market=None):
+        """รหัสหุ้นแบบ Yahoo (.BK) ทั้งหมด หรือเฉพาะตลาด SET/mai"""
+        if market is None:
+            return list(self._rows)
+        market = market.lower()
+        return [symbol for symbol, row in self._rows.items() if row['market'].lower() == market]
+
+    def names(self):
+        """{รหัส .BK: ชื่อย่อ} รูปแบบเดียวกับ StockAnalyzer.thai_stocks"""
+        return {symbol: row['ticker'] for symbol, row in self._rows.items()}
+
+    def sectors(self):
+        """{หมวด: [รหัส .BK]} ตามลำดับในไฟล์"""
+        sectors = {}
+        for symbol, row in self._rows.items():
+            sectors.setdefault(row['sector'], []).append(symbol)
+        return sectors
+
+
+class _TableParser(HTMLParser):
+    """อ่านทุกแถวของตาราง HTML เป็น list ของข้อความในแต่ละช่อง"""
+
+    def __init__(self):
+        super().__init__()
+        self.rows = []
+        self._row = None
+        self._cell = None
+
+    def handle_starttag(self, tag, attrs):
+        if tag == 'tr':
+            self._row = []
+        elif tag in ('td', 'th') and self._row is not None:
+            self._cell = []
+
+    def handle_endtag(self, tag):
+        if tag in ('td', 'th') and self._row is not None and self._cell is not None:
+            self._row.append(' '.join(''.join(self._cell).split()))
+            self._cell = None
+        elif tag == 'tr' and self._row is not None:
+            self.rows.append(self._row)
+            self._row = None
+
+    def handle_data(self, data):
+        if self._cell is not None:
+            self._cell.append(data)
+
+
+def parse_listed_companies(text):
+    """แปลงตารางรายชื่อบริษัทจดทะเบียนของตลาดหลักทรัพย์เป็น list ของแถว (คอลัมน์ตาม COLUMNS)"""
+    parser = _TableParser()
+    parser.feed(text)
+
+    header = None
+    records = []
+    for row in parser.rows:
+        cells = [cell.strip() for cell in row]
+        if header is None:
+            lowered = [cell.lower() for cell in cells]
+            if 'symbol' in lowered and 'market' in lowered:
+                header = {name: lowered.index(name) for name in ('symbol', 'company', 'market', 'industry', 'sector') if name in lowered}
+            continue
+        if len(cells) <= header['symbol'] or not cells[header['symbol']]:
+            continue
+
+        def cell(name):
+            index = header.get(name)
+            return cells[index] if index is not None and index < len(cells) else ''
+
+        market = 'mai' if cell('market').lower() == 'mai' else 'SET'
+        # หุ้น mai ไม่มีหมวดธุรกิจ ใช้กลุ่มอุตสาหกรรมแทน
+        code = cell('sector') if cell('sector') and cell('sector') != '-' else cell('industry')
+        records.append({
+            'symbol': cell('symbol').upper(),
+            'name': cell('company'),
+            'name_th': '',
+            'market': market,
+            'sector': SECTOR_NAMES.get(code.upper(), code) or 'อื่นๆ',
+        })
+    if header is None:
+        raise ValueError("ไม่พบตารางที่มีคอลัมน์ Symbol และ Market")
+    return records
+
+
+def refresh(source=SET_LISTED_URL, filename=LOCAL_FILE, timeout=30):
+    """สร้างไฟล์รายชื่อเต็มจาก URL หรือไฟล์รายชื่อบริษัทจดทะเบียน คืนจำนวนหุ้นที่เขียน
+
+    ชื่อภาษาไทยและหมวดของหุ้นที่มีอยู่แล้วในไฟล์ที่แนบมาจะคงไว้ตามเดิม
+    """
+    if source.startswith(('http://', 'https://')):
+        response = requests.get(source, timeout=timeout, headers={'User-Agent': 'Mozilla/5.0'})
+        response.raise_for_status()
+        raw = response.content
+    else:
+        with open(source, 'rb') as f:
+            raw = f.read()
+    # ไฟล์ของตลาดหลักทรัพย์เคยมีทั้ง UTF-8 และ TIS-620
+    try:
+        text = raw.decode('utf-8')
+    except UnicodeDecodeError:
+        text = raw.decode('cp874', errors='replace')
+
+    records = parse_listed_companies(text)
+    if not records:
+        raise ValueError("ไม่พบรายชื่อหุ้นในไฟล์")
+
+    bundled = Universe(BUNDLED_FILE, local_filename=None)
+    for record in records:
+        known = bundled.get(record['symbol'])
+        if known:
+            record['name_th'] = known['name_th']
+            record['sector'] = known['sector']
+
+    directory = os.path.dirname(filename)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp = f"{filename}.{os.getpid()}.tmp"
+    try:
+        with open(tmp, 'w', encoding='utf-8', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=COLUMNS)
+            writer.writeheader()
+            writer.writerows(records)
+        os.replace(tmp, filename)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    return len(records)
+
+
+if __name__ == "__main__":
+    source = sys.argv[1] if len(sys.argv) > 1 else SET_LISTED_URL
+    count = refresh(source)
+    print(f"บันทึกรายชื่อ {count} หุ้นที่ {LOCAL_FILE}")